@@ -0,0 +1,211 @@
+# api/main.py
+#
+# API HTTP para integraciones (CRM / ERP): creación de solicitudes en lote,
+# consulta de progreso en lote y listado de documentos.
+#
+#   uvicorn api.main:app --host 0.0.0.0 --port 8000 --workers 4
+#
+# Autenticación: header X-API-Key (API_KEY en el entorno o `api_key` en secrets).
+
+import hmac
+import logging
+import os
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from database.db import SessionLocal, engine
+from database.crud.clientes import insert_client_requests_batch
+from database.crud.documents import get_progress_for_requests, get_uploaded_documents_map
+from services.sheets_writer import save_requests
+
+log = logging.getLogger("api")
+
+MAX_BATCH = 500
+
+app = FastAPI(title="Compliance Platform API", version="1.0")
+
+
+def _api_key() -> str | None:
+    try:
+        import streamlit as st
+        return st.secrets["api_key"]
+    except Exception:
+        return os.getenv("API_KEY")
+
+
+def require_api_key(x_api_key: str | None = Header(default=None)):
+    expected = _api_key()
+    if not expected:
+        raise HTTPException(status_code=503, detail="API_KEY no configurada en el servidor.")
+    if not x_api_key or not hmac.compare_digest(x_api_key, expected):
+        raise HTTPException(status_code=401, detail="API key inválida.")
+
+
+def get_session():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+# ==========================
+# 🔹 MODELOS
+# ==========================
+
+class ShippingLineIn(BaseModel):
+    pol: Optional[str] = None
+    pod: Optional[str] = None
+    product: Optional[str] = None
+    container_type: Optional[str] = None
+    shipper_bl: Optional[str] = None
+
+
+class RequestIn(BaseModel):
+    profile: str = Field(..., description="cliente | proveedor")
+    company_name: str = Field(..., min_length=1)
+    email: Optional[str] = None
+    trading: Optional[str] = None
+    country: Optional[str] = None
+    language: Optional[str] = None
+    reminder_frequency: Optional[str] = None
+    operation_type: Optional[str] = None
+    commodity: Optional[str] = None
+    requested_by: Optional[str] = None
+    user_email: Optional[str] = None
+    customs: list[str] = []
+    ports: dict[str, list[str]] = {}
+    shipping_lines: dict[str, ShippingLineIn] = {}
+
+
+class RequestBatchIn(BaseModel):
+    requests: list[RequestIn] = Field(..., min_length=1, max_length=MAX_BATCH)
+
+
+class ProgressBatchIn(BaseModel):
+    request_ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH)
+
+
+def _to_crud_item(r: RequestIn) -> dict:
+    return {
+        "profile_name": r.profile,
+        "company_name": r.company_name.strip(),
+        "email": r.email,
+        "trading": r.trading,
+        "location": r.country,
+        "language": r.language,
+        "reminder_frequency": r.reminder_frequency,
+        "operation_type": r.operation_type,
+        "commodity": r.commodity,
+        "requested_by": r.requested_by,
+        "user_email": r.user_email,
+        "customs_list": r.customs,
+        "ports_dict": r.ports,
+        "lines_data": {
+            name: {
+                "POL": line.pol,
+                "POD": line.pod,
+                "Producto": line.product,
+                "Tipo de Contenedor": line.container_type,
+                "Shipper en BL": line.shipper_bl,
+            }
+            for name, line in r.shipping_lines.items()
+        },
+    }
+
+
+def _to_sheet_row(request_id: int, r: RequestIn) -> dict:
+    return {
+        "request_id": request_id,
+        "tipo_solicitud": r.profile,
+        "company_name": r.company_name,
+        "email": r.email,
+        "trading": r.trading,
+        "location": r.country,
+        "language": r.language,
+        "reminder_frequency": r.reminder_frequency,
+        "requested_by": r.requested_by or "API",
+        "tipo_operacion": r.operation_type,
+        "commodity": r.commodity,
+        "aduana": f"Sí: {', '.join(r.customs)}" if r.customs else "No",
+        "puerto": (
+            "Sí: " + "; ".join(f"{p}: {', '.join(t)}" for p, t in r.ports.items())
+            if r.ports else "No"
+        ),
+        "linea_naviera": f"Sí: {', '.join(r.shipping_lines)}" if r.shipping_lines else "No",
+    }
+
+
+def _save_to_sheet(rows: list[dict]):
+    try:
+        save_requests(rows)
+    except Exception:
+        log.exception("No se pudieron registrar %d solicitud(es) en Sheets", len(rows))
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+# ==========================
+# 🔹 ENDPOINTS
+# ==========================
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.post("/v1/requests", status_code=201, dependencies=[Depends(require_api_key)])
+def create_requests(batch: RequestBatchIn, background: BackgroundTasks):
+    try:
+        # Conexión del pool del engine (DB_POOL_SIZE), no un psycopg2.connect por request
+        ids = insert_client_requests_batch([_to_crud_item(r) for r in batch.requests],
+                                           conn=engine.raw_connection())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # La hoja de Sheets es un registro secundario: no bloquea la respuesta
+    background.add_task(_save_to_sheet, [_to_sheet_row(i, r) for i, r in zip(ids, batch.requests)])
+    return {"ids": ids}
+
+
+def _progress_response(session, request_ids: list[int]):
+    progress = get_progress_for_requests(session, request_ids)
+    return {
+        "results": {
+            str(rid): {k: _jsonable(v) for k, v in data.items()}
+            for rid, data in progress.items()
+        },
+        "not_found": [rid for rid in request_ids if rid not in progress],
+    }
+
+
+@app.post("/v1/progress", dependencies=[Depends(require_api_key)])
+def progress_batch(body: ProgressBatchIn, session=Depends(get_session)):
+    return _progress_response(session, body.request_ids)
+
+
+@app.get("/v1/progress", dependencies=[Depends(require_api_key)])
+def progress_query(ids: str = Query(..., description="IDs separados por coma"), session=Depends(get_session)):
+    try:
+        request_ids = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids debe ser una lista de enteros separada por comas.")
+    if not request_ids or len(request_ids) > MAX_BATCH:
+        raise HTTPException(status_code=422, detail=f"Entre 1 y {MAX_BATCH} IDs.")
+    return _progress_response(session, request_ids)
+
+
+@app.get("/v1/requests/{request_id}/documents", dependencies=[Depends(require_api_key)])
+def list_documents(request_id: int, session=Depends(get_session)):
+    grouped = get_uploaded_documents_map(session, request_id)
+    documents = [
+        {k: _jsonable(v) for k, v in d.items()}
+        for docs in grouped.values()
+        for d in docs
+    ]
+    return {"request_id": request_id, "documents": documents}
@@ -1,7 +1,9 @@
 import streamlit as st
-from services.authentication import check_authentication
+from services.authentication import check_authentication, current_user
+from services import sql_profiler
 
 st.set_page_config(page_title="Compliance Platform", layout="wide")
+sql_profiler.start_rerun()
 
 def identity_role(email: str | None) -> str:
 
@@ -21,15 +23,15 @@ with col2:
 
 check_authentication()
 
-user_email = getattr(getattr(st, "user", None), "email", None)
-user_name = getattr(getattr(st, "user", None), "name", "Usuario")
+user_email = getattr(current_user(), "email", None)
+user_name = getattr(current_user(), "name", "Usuario")
 
 role = identity_role(user_email)
 is_admin = (role == "compliance")
 
 # Páginas visibles por rol
 pages_by_role: dict[str, list[str]] = {
-    "compliance": ["Home", "Solicitud de Creación", "Registro de Proveedores/ Clientes", "Progreso"],
+    "compliance": ["Home", "Solicitud de Creación", "Registro de Proveedores/ Clientes", "Progreso", "Reportes", "Antigüedad"],
     "other":      ["Home", "Solicitud de Creación", "Progreso"],
 }
 
@@ -49,3 +51,15 @@ elif page == "Registro de Proveedores/ Clientes":
 elif page == "Progreso":
     import views.progress as p
     p.show(current_user_email=user_email, is_admin=is_admin)
+
+elif page == "Reportes":
+    import views.reports as rep
+    rep.show()
+
+elif page == "Antigüedad":
+    import views.aging as ag
+    ag.show()
+
+# Perfil SQL del rerun (solo compliance, apagado por defecto)
+if is_admin:
+    sql_profiler.render_panel()
@@ -0,0 +1,359 @@
+# benchmarks/load.py
+#
+# Prueba de carga de punta a punta: N usuarios simultáneos (oficiales de compliance y
+# solicitantes) recorren las páginas de app.py con el API de pruebas de Streamlit
+# (streamlit.testing.v1.AppTest), contra el Postgres local y los backends falsos de Google.
+#
+#   python -m benchmarks.seed --requests 20000 --reset
+#   python -m benchmarks.load --officers 5 --requesters 20 --duration 300 --out load.json
+#
+# Reporta p50/p95/p99 de reruns y de guardados, por paso, y el pico de conexiones a la base.
+#
+# - El login se simula con auth_backend = "fake": el usuario va en session_state["fake_user"].
+# - AppTest no puede manejar st.file_uploader: la carga de archivos se hace por el mismo
+#   camino que usa el botón de guardar (staging + cola) y se mide aparte como "upload".
+# - Igual que benchmarks.run, usa --dsn y nunca los secrets de la app.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import psycopg2
+
+from benchmarks.seed import DEFAULT_DSN
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+OFFICER_EMAIL = "compliance@tradingsolutions.com"
+
+PAGE_REQUEST = "Solicitud de Creación"
+PAGE_UPLOAD = "Registro de Proveedores/ Clientes"
+PAGE_PROGRESS = "Progreso"
+
+# ==========================
+# 🔹 MÉTRICAS
+# ==========================
+
+class Recorder:
+    """Latencias por (tipo, paso) y errores, compartidas por todos los usuarios virtuales."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[tuple[str, str], list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.flows = 0
+
+    def add(self, kind: str, step: str, elapsed_ms: float):
+        with self._lock:
+            self.latencies[(kind, step)].append(elapsed_ms)
+
+    def error(self, step: str, exc: Exception | str):
+        with self._lock:
+            self.errors[f"{step}: {str(exc)[:120]}"] += 1
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+
+def _summary(values: list[float]) -> dict:
+    values = sorted(values)
+    if len(values) < 2:
+        p50 = p95 = p99 = values[0] if values else 0.0
+    else:
+        q = statistics.quantiles(values, n=100, method="inclusive")
+        p50, p95, p99 = q[49], q[94], q[98]
+    return {
+        "n": len(values),
+        "p50_ms": round(p50, 1),
+        "p95_ms": round(p95, 1),
+        "p99_ms": round(p99, 1),
+        "max_ms": round(values[-1], 1) if values else 0.0,
+    }
+
+
+class ConnectionSampler(threading.Thread):
+    """Muestrea pg_stat_activity para registrar el pico de conexiones a la base."""
+
+    def __init__(self, dsn: str, interval: float = 0.2):
+        super().__init__(name="db-connection-sampler", daemon=True)
+        self.dsn = dsn
+        self.interval = interval
+        self.peak_total = 0
+        self.peak_active = 0
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self):
+        conn = psycopg2.connect(dsn=self.dsn)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self._done.is_set():
+                    cur.execute("""
+                        SELECT COUNT(*), COUNT(*) FILTER (WHERE state = 'active')
+                        FROM pg_stat_activity
+                        WHERE datname = current_database() AND pid <> pg_backend_pid()
+                    """)
+                    total, active = cur.fetchone()
+                    self.samples.append(total)
+                    self.peak_total = max(self.peak_total, total)
+                    self.peak_active = max(self.peak_active, active)
+                    self._done.wait(self.interval)
+        finally:
+            conn.close()
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        return {
+            "peak_total": self.peak_total,
+            "peak_active": self.peak_active,
+            "mean_total": round(sum(self.samples) / len(self.samples), 1) if self.samples else 0.0,
+        }
+
+# ==========================
+# 🔹 USUARIO VIRTUAL
+# ==========================
+
+def _secrets(dsn: str) -> dict:
+    return {
+        "DATABASE_URL": dsn,
+        "auth_backend": "fake",
+        "google_backend": "memory",
+        "general": {"compliance_id": "load-test"},
+        "drive": {"providers_folder_id": "load-providers", "clients_folder_id": "load-clients"},
+    }
+
+
+def _by_label(widgets, label: str):
+    for w in widgets:
+        if w.label == label:
+            return w
+    return None
+
+
+class VirtualUser:
+    def __init__(self, user_id: int, role: str, dsn: str, sample: list, recorder: Recorder,
+                 rng: random.Random, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.role = role
+        self.sample = sample
+        self.recorder = recorder
+        self.rng = rng
+        self.email = OFFICER_EMAIL if role == "officer" else f"load.requester{user_id}@example.com"
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.at.secrets.update(_secrets(dsn))
+        self.at.session_state["fake_user"] = {"email": self.email, "name": f"Load {role} {user_id}"}
+
+    def _step(self, step: str, action, kind: str = "rerun"):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.recorder.error(step, e)
+            return False
+        self.recorder.add(kind, step, (time.perf_counter() - started) * 1000)
+        if self.at.exception:
+            self.recorder.error(step, self.at.exception[0].message)
+            return False
+        return True
+
+    def _goto(self, page: str) -> bool:
+        return self._step(f"page:{page}", lambda: self.at.sidebar.radio[0].set_value(page).run())
+
+    def _select(self, step: str, label: str, value) -> bool:
+        box = _by_label(self.at.selectbox, label)
+        if box is None or value not in box.options:
+            self.recorder.error(step, f"sin opción {value!r} en {label!r}")
+            return False
+        return self._step(step, lambda: box.set_value(value).run())
+
+    # ---- flujos ----
+
+    def start(self):
+        self._step("home", self.at.run)
+
+    def requester_flow(self):
+        company = f"Load Test {self.rng.randint(1, 10**6)} S.A.S."
+        if not self._goto(PAGE_REQUEST):
+            return
+        self.at.selectbox(key="tipo_solicitud").set_value("cliente")
+        self.at.text_input(key="correo_compania").input(self.email)
+        if not self._step("request:fill", lambda: self.at.text_input(key="nombre_compania").input(company).run()):
+            return
+        confirm = [c for c in self.at.checkbox if c.key == "confirmar_compania_similar"]
+        if confirm:
+            confirm[0].check()
+        if not self._step("request:save", lambda: self.at.button(key="guardar_general").click().run(), kind="save"):
+            return
+
+        # Un solicitante solo ve sus solicitudes: la recién creada
+        if self._goto(PAGE_PROGRESS) and self._select("progress:company", "Empresa", company):
+            self._select("progress:profile", "Perfil", "cliente")
+
+    def officer_flow(self):
+        row = self.rng.choice(self.sample)
+        if not self._goto(PAGE_UPLOAD):
+            return
+        if not (self._select("upload:company", "Nombre de la compañía", row["company_name"])
+                and self._select("upload:profile", "Perfil", row["profile_name"])):
+            return
+        box = _by_label(self.at.selectbox, "Selecciona la solicitud")
+        if box is not None and not self._step("upload:request", lambda: box.set_value(0).run()):
+            return
+
+        status_box = next((s for s in self.at.selectbox if (s.key or "").startswith("status_internal_")), None)
+        if status_box is None:
+            self.recorder.error("upload:status", "sin selector de estado interno")
+            return
+        request_id = int(status_box.key.rsplit("_", 1)[1])
+
+        self._step("upload:files", lambda: self._upload_files(request_id, row), kind="upload")
+
+        status_box.set_value(self.rng.choice(status_box.options))
+        if not self._step("upload:save", lambda: self.at.button(key=f"btn_guardar_{request_id}").click().run(),
+                          kind="save"):
+            return
+
+        if self._goto(PAGE_PROGRESS) and self._select("progress:company", "Empresa", row["company_name"]):
+            self._select("progress:profile", "Perfil", row["profile_name"])
+
+    def _upload_files(self, request_id: int, row: dict):
+        """Mismo camino que el guardado del formulario: staging + un trabajo por archivo."""
+        from database.db import SessionLocal
+        from database.crud.jobs import enqueue_job
+        from services.upload_sessions import stage_file
+
+        entity_type = "proveedor" if "proveedor" in row["profile_name"].lower() else "cliente"
+        with SessionLocal() as session:
+            for i in range(self.rng.randint(1, 3)):
+                content = b"%PDF-1.4\n% load test\n" + os.urandom(self.rng.randint(20, 200) * 1024)
+                file_name = f"load_{request_id}_{i}.pdf"
+                _, upload_key = stage_file(content, file_name, f"{entity_type}:{row['company_name'].strip()}")
+                enqueue_job(session, "upload_document", {
+                    "request_id": request_id, "doc_type_id": row["doc_type_id"], "file_name": file_name,
+                    "upload_key": upload_key, "company_name": row["company_name"], "entity_type": entity_type,
+                    "uploaded_by": self.email, "razon_social": None, "fecha_creacion": None,
+                }, request_id=request_id, created_by=self.email)
+            session.commit()
+
+    def run(self, deadline: float, think_seconds: float):
+        self.start()
+        while time.monotonic() < deadline:
+            if self.role == "officer":
+                self.officer_flow()
+            else:
+                self.requester_flow()
+            self.recorder.flow_done()
+            time.sleep(self.rng.uniform(0, think_seconds))
+
+# ==========================
+# 🔹 CORRIDA
+# ==========================
+
+def _load_sample(dsn: str, size: int = 500) -> list[dict]:
+    conn = psycopg2.connect(dsn=dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT r.company_name, p.name,
+                       (SELECT MIN(dt.id) FROM document_type dt WHERE dt.profile_id = r.profile_id)
+                FROM requests r
+                JOIN profiles p ON p.id = r.profile_id
+                WHERE r.company_name IS NOT NULL
+                ORDER BY random()
+                LIMIT %s
+            """, (size,))
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        raise SystemExit("La base no tiene solicitudes: ejecuta primero python -m benchmarks.seed")
+    return [{"company_name": c, "profile_name": p, "doc_type_id": d} for c, p, d in rows]
+
+
+def run(dsn: str, officers: int, requesters: int, duration: float, think_seconds: float,
+        ramp_seconds: float, timeout: float, seed_value: int) -> dict:
+    # Los módulos de la app leen la configuración del entorno si no hay secrets
+    os.environ["DATABASE_URL"] = dsn
+    os.environ["AUTH_BACKEND"] = "fake"
+    os.environ["GOOGLE_BACKEND"] = "memory"
+
+    rng = random.Random(seed_value)
+    sample = _load_sample(dsn)
+    recorder = Recorder()
+    sampler = ConnectionSampler(dsn)
+    sampler.start()
+
+    roles = ["officer"] * officers + ["requester"] * requesters
+    deadline = time.monotonic() + duration
+    threads = []
+    for i, role in enumerate(roles):
+        user = VirtualUser(i, role, dsn, sample, recorder, random.Random(rng.random()), timeout)
+        t = threading.Thread(target=user.run, args=(deadline, think_seconds), name=f"vu-{role}-{i}", daemon=True)
+        threads.append(t)
+        t.start()
+        if ramp_seconds and len(roles) > 1:
+            time.sleep(ramp_seconds / (len(roles) - 1))
+
+    for t in threads:
+        t.join()
+    connections = sampler.stop()
+
+    by_kind = defaultdict(list)
+    for (kind, _), values in recorder.latencies.items():
+        by_kind[kind].extend(values)
+
+    return {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "officers": officers,
+            "requesters": requesters,
+            "duration_seconds": duration,
+            "think_seconds": think_seconds,
+            "seed": seed_value,
+            "flows": recorder.flows,
+        },
+        "summary": {kind: _summary(values) for kind, values in sorted(by_kind.items())},
+        "steps": {f"{kind}:{step}": _summary(v) for (kind, step), v in sorted(recorder.latencies.items())},
+        "db_connections": connections,
+        "errors": dict(recorder.errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de las páginas de Streamlit")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", DEFAULT_DSN))
+    parser.add_argument("--officers", type=int, default=3, help="Usuarios de compliance simultáneos")
+    parser.add_argument("--requesters", type=int, default=10, help="Solicitantes simultáneos")
+    parser.add_argument("--duration", type=float, default=120, metavar="SEGUNDOS")
+    parser.add_argument("--think", type=float, default=2.0, metavar="SEGUNDOS",
+                        help="Pausa máxima (aleatoria) entre flujos de cada usuario")
+    parser.add_argument("--ramp", type=float, default=10.0, metavar="SEGUNDOS",
+                        help="Tiempo en el que se van sumando los usuarios")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout de cada rerun")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    report = run(args.dsn, args.officers, args.requesters, args.duration, args.think,
+                 args.ramp, args.timeout, args.seed)
+    payload = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
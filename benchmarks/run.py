@@ -0,0 +1,366 @@
+# benchmarks/run.py
+#
+# Mide latencia y número de queries de las funciones CRUD y de los caminos de datos
+# de las vistas, contra una base sembrada con benchmarks/seed.py.
+#
+#   python -m benchmarks.run --iterations 50 --out bench.json
+#
+# Usa su propio engine/conexión con --dsn (nunca los secrets de la app), para no
+# apuntar por accidente a producción.
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.seed import DEFAULT_DSN
+import database.crud.clientes as clientes
+import database.crud.documents as documents
+from database.crud.drive_sync import get_drive_issues_for_request
+from database.crud.digests import get_changes_by_requester
+from database.crud.search import search_requests
+from database.crud.reports import find_dossier_request_ids, get_dossiers, get_aging_summary, get_aging_details
+from services import cache
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+COUNTER = QueryCounter()
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        COUNTER.count += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        COUNTER.count += 1
+        return super().executemany(query, vars_list)
+
+
+class RollbackConnection(psycopg2.extensions.connection):
+    """
+    Conexión para los casos de clientes.py, que hacen commit propio: el commit no confirma
+    y al cerrar se deshace todo, para que la base sembrada no crezca entre corridas.
+    """
+
+    def commit(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.rollback()
+        super().close()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def _summary(latencies: list[float], queries: list[int]) -> dict:
+    lat = sorted(latencies)
+    return {
+        "n": len(lat),
+        "mean_ms": round(sum(lat) / len(lat), 3) if lat else 0.0,
+        "p50_ms": round(_percentile(lat, 50), 3),
+        "p95_ms": round(_percentile(lat, 95), 3),
+        "p99_ms": round(_percentile(lat, 99), 3),
+        "max_ms": round(lat[-1], 3) if lat else 0.0,
+        "queries_per_call": round(sum(queries) / len(queries), 2) if queries else 0.0,
+    }
+
+# ==========================
+# 🔹 CONTEXTO DE DATOS
+# ==========================
+
+class Sample:
+    """IDs/valores reales de la base sembrada para parametrizar cada llamada."""
+
+    def __init__(self, session, rng: random.Random, size: int = 500):
+        self.rng = rng
+        rows = session.execute(text("""
+            SELECT id, company_name, profile_id, user_email
+            FROM requests TABLESAMPLE SYSTEM (5)
+            LIMIT :n
+        """), {"n": size}).fetchall()
+        if not rows:
+            rows = session.execute(text(
+                "SELECT id, company_name, profile_id, user_email FROM requests LIMIT :n"
+            ), {"n": size}).fetchall()
+        if not rows:
+            raise SystemExit("La base no tiene solicitudes: ejecuta primero python -m benchmarks.seed")
+        self.requests = rows
+        self.profiles = session.execute(text("SELECT id, name FROM profiles")).fetchall()
+        self.status_ids = [r[0] for r in session.execute(text("SELECT id FROM status")).fetchall()]
+        self.port_rows = session.execute(text(
+            "SELECT id FROM port_registration TABLESAMPLE SYSTEM (5) LIMIT 200"
+        )).scalars().all()
+
+    def request(self):
+        return self.rng.choice(self.requests)
+
+    def status_id(self):
+        return self.rng.choice(self.status_ids)
+
+# ==========================
+# 🔹 CAMINOS DE LAS VISTAS
+# ==========================
+
+def progress_view_path(session, sample: Sample, as_admin: bool = True):
+    """
+    Mismas consultas que forms/view_progress.show_progress_view para una empresa/perfil,
+    en la primera carga (las secciones en vivo solo vuelven a consultar si la solicitud cambia).
+    """
+    req = sample.request()
+    email = None if as_admin else req.user_email
+    requests = documents.get_requests_for_progress(session, only_for_email=email)
+    profile_names = documents.get_profiles_list(session)
+    for name in profile_names:
+        documents.get_profile_id_by_name(session, name)
+
+    filtered = [r for r in requests if r["company_name"] == req.company_name and r["profile_id"] == req.profile_id]
+    # Resumen: un lote que además siembra las secciones (las de admin recargan con historial)
+    documents.get_progress_for_requests(session, [r["id"] for r in filtered])
+    if as_admin:
+        for r in filtered:
+            documents.get_progress_for_requests(session, [r["id"]])
+            documents.get_status_timeline(session, r["id"])
+
+
+def upload_form_path(session, sample: Sample):
+    """Mismas consultas que forms/upload_documents_form.forms hasta el botón de guardar."""
+    req = sample.request()
+    documents.get_all_company_names(session)
+    profiles = documents.get_profiles_list(session)
+    profile_name = next((p.name for p in sample.profiles if p.id == req.profile_id), profiles[0])
+    profile_id = documents.get_profile_id_by_name(session, profile_name)
+    documents.get_requests_by_company_and_profile(session, req.company_name, profile_id)
+
+    rid = req.id
+    documents.get_request_creation_date(session, rid)
+    documents.get_document_completeness(session, [rid])
+    get_drive_issues_for_request(session, rid)
+    documents.get_all_statuses(session)
+    for _ in range(3):  # bloque de registro interno: un mapa por documento interno
+        documents.get_uploaded_documents_map(session, rid)
+    documents.get_internal_status(session, rid)
+    documents.get_required_document_types(session, profile_id)
+    documents.get_uploaded_documents_map(session, rid)
+    documents.get_shipping_lines_status(session, rid)
+    documents.get_ports_status(session, rid)
+    documents.get_customs_status(session, rid)
+    documents.get_request_meta(session, rid)
+
+# ==========================
+# 🔹 CASOS
+# ==========================
+
+def _session_cases(sample: Sample) -> dict:
+    """Casos que reciben una Session. Las escrituras se deshacen (rollback) tras cada llamada."""
+    s = sample
+    return {
+        "documents.get_all_company_names": (False, lambda db: documents.get_all_company_names(db)),
+        "documents.get_profiles_list": (False, lambda db: documents.get_profiles_list(db)),
+        "documents.get_profile_id_by_name": (False, lambda db: documents.get_profile_id_by_name(db, s.rng.choice(s.profiles).name)),
+        "documents.get_requests_by_company_and_profile": (False, lambda db: (lambda r: documents.get_requests_by_company_and_profile(db, r.company_name, r.profile_id))(s.request())),
+        "documents.get_required_document_types": (False, lambda db: documents.get_required_document_types(db, s.request().profile_id)),
+        "documents.get_uploaded_documents_map": (False, lambda db: documents.get_uploaded_documents_map(db, s.request().id)),
+        "documents.upsert_uploaded_document": (True, lambda db: documents.upsert_uploaded_document(
+            db, s.request().id, 4, "bench.pdf", "https://drive.google.com/file/d/bench/view", "bench")),
+        "documents.get_request_meta": (False, lambda db: documents.get_request_meta(db, s.request().id)),
+        "documents.update_request_meta": (True, lambda db: documents.update_request_meta(db, s.request().id, "n", "c")),
+        "documents.get_all_statuses": (False, lambda db: documents.get_all_statuses(db)),
+        "documents.get_shipping_lines_status": (False, lambda db: documents.get_shipping_lines_status(db, s.request().id)),
+        "documents.get_ports_status": (False, lambda db: documents.get_ports_status(db, s.request().id)),
+        "documents.get_customs_status": (False, lambda db: documents.get_customs_status(db, s.request().id)),
+        "documents.record_status_event": (True, lambda db: documents.record_status_event(
+            db, "customs_registration", s.request().id, 0, None, s.status_id(), "bench")),
+        "documents.update_status": (True, lambda db: documents.update_status(
+            db, "port_registration", s.rng.choice(s.port_rows) if s.port_rows else 0, s.status_id(), "bench")),
+        "documents.upsert_status": (True, lambda db: documents.upsert_status(
+            db, "customs_registration", s.request().id, "SIAP", s.status_id(), changed_by="bench")),
+        "documents.get_status_timeline": (False, lambda db: documents.get_status_timeline(db, s.request().id)),
+        "documents.ensure_status_event_partitions": (True, lambda db: documents.ensure_status_event_partitions(db)),
+        "documents.get_internal_status": (False, lambda db: documents.get_internal_status(db, s.request().id)),
+        "documents.get_request_creation_date": (False, lambda db: documents.get_request_creation_date(db, s.request().id)),
+        "documents.get_comments_by_request": (False, lambda db: documents.get_comments_by_request(db, s.request().id)),
+        "documents.upsert_request_info": (True, lambda db: documents.upsert_request_info(db, s.request().id, "bench", "RS", None)),
+        "documents.get_razon_social_by_request": (False, lambda db: documents.get_razon_social_by_request(db, s.request().id)),
+        "documents.get_requests_for_progress": (False, lambda db: documents.get_requests_for_progress(db, s.request().user_email)),
+        "documents.get_requests_for_progress[admin]": (False, lambda db: documents.get_requests_for_progress(db)),
+        "documents.get_progress_for_requests": (False, lambda db: documents.get_progress_for_requests(
+            db, [s.request().id for _ in range(50)])),
+        "digests.get_changes_by_requester": (False, lambda db: get_changes_by_requester(
+            db, datetime.now() - timedelta(days=1), datetime.now())),
+        "documents.get_document_completeness": (False, lambda db: documents.get_document_completeness(
+            db, [s.request().id for _ in range(50)])),
+        "documents.get_document_completeness[all]": (False, lambda db: documents.get_document_completeness(db)),
+        "reports.find_dossier_request_ids": (False, lambda db: find_dossier_request_ids(db, trading="Colombia")),
+        "reports.get_dossiers": (False, lambda db: get_dossiers(db, [s.request().id for _ in range(200)])),
+        "reports.get_aging_summary": (False, lambda db: get_aging_summary(db, ["trading", "commercial", "block_type"])),
+        "reports.get_aging_details": (False, lambda db: get_aging_details(db, trading="Colombia")),
+        "search.search_requests": (False, lambda db: search_requests(db, s.request().company_name.split()[0])),
+        "search.search_requests[requester]": (False, lambda db: (lambda r: search_requests(
+            db, r.company_name.split()[0], only_for_email=r.user_email))(s.request())),
+        "path.show_progress_view[admin]": (False, lambda db: progress_view_path(db, s, as_admin=True)),
+        "path.show_progress_view[requester]": (False, lambda db: progress_view_path(db, s, as_admin=False)),
+        "path.upload_form": (False, lambda db: upload_form_path(db, s)),
+    }
+
+
+def _clientes_cases(sample: Sample) -> dict:
+    """Casos del camino psycopg2. Hacen commit propio: corren sobre RollbackConnection."""
+    s = sample
+    return {
+        "clientes.get_profile_id": lambda: clientes.get_profile_id(s.rng.choice(s.profiles).name),
+        "clientes.find_similar_companies": lambda: clientes.find_similar_companies(s.request().company_name.upper() + " S.A.S."),
+        "clientes.insert_client_request": lambda: clientes.insert_client_request(
+            profile_id=1, company_name="Bench S.A.S.", email="bench@example.com", trading="Colombia",
+            language="Español", reminder_frequency="Una vez por semana", user_email="bench@example.com"),
+        "clientes.insert_customs_registration": lambda: clientes.insert_customs_registration(s.request().id, ["SIAP"]),
+        "clientes.insert_port_registration": lambda: clientes.insert_port_registration(s.request().id, {"Cartagena": ["COMPAS"]}),
+        "clientes.insert_shipping_line_registration": lambda: clientes.insert_shipping_line_registration(s.request().id, {"ONE": {}}),
+        "clientes.insert_client_requests_batch": lambda: clientes.insert_client_requests_batch([
+            {"profile_name": "cliente", "company_name": f"Bench {i} S.A.S.", "reminder_frequency": "Una vez por semana",
+             "customs_list": ["SIAP"], "ports_dict": {"Cartagena": ["COMPAS"]}}
+            for i in range(100)
+        ]),
+    }
+
+
+def _uncovered(cases: dict) -> list[str]:
+    """Funciones públicas de los módulos CRUD sin caso de benchmark."""
+    covered = {name.split("[")[0] for name in cases}
+    missing = []
+    for module, prefix in ((documents, "documents"), (clientes, "clientes")):
+        for name, fn in inspect.getmembers(module, inspect.isfunction):
+            if fn.__module__ != module.__name__ or name.startswith("_") or name in ("get_connection", "notify_change", "notify_changes"):
+                continue
+            if name.endswith("_sql") or name == "detach_status_event_partitions":
+                continue
+            if f"{prefix}.{name}" not in covered:
+                missing.append(f"{prefix}.{name}")
+    return missing
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(dsn: str, iterations: int, warmup: int, only: str | None, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    engine = create_engine(dsn)
+    # Se mide la base, no la caché (y su listener usaría DATABASE_URL de la app)
+    cache.disable()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        COUNTER.count += 1
+
+    Session = sessionmaker(bind=engine, autoflush=False)
+    clientes.get_connection = lambda read_only=False: psycopg2.connect(
+        dsn=dsn, connection_factory=RollbackConnection, cursor_factory=CountingCursor)
+
+    results = {}
+    with Session() as setup_session:
+        sample = Sample(setup_session, rng)
+        population = {
+            t: setup_session.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar()
+            for t in ("requests", "registration", "customs_registration", "port_registration",
+                      "shipping_line_registration", "internal_registration", "comments")
+        }
+        server_version = setup_session.execute(text("SHOW server_version")).scalar()
+
+    session_cases = _session_cases(sample)
+    clientes_cases = _clientes_cases(sample)
+
+    for name, (writes, fn) in session_cases.items():
+        if only and only not in name:
+            continue
+        latencies, queries = [], []
+        with Session() as db:
+            for i in range(warmup + iterations):
+                COUNTER.count = 0
+                started = time.perf_counter()
+                fn(db)
+                elapsed = (time.perf_counter() - started) * 1000
+                n_queries = COUNTER.count
+                if writes:
+                    db.rollback()
+                if i >= warmup:
+                    latencies.append(elapsed)
+                    queries.append(n_queries)
+            db.rollback()
+        results[name] = _summary(latencies, queries)
+
+    for name, fn in clientes_cases.items():
+        if only and only not in name:
+            continue
+        latencies, queries = [], []
+        for i in range(warmup + iterations):
+            COUNTER.count = 0
+            started = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - started) * 1000
+            if i >= warmup:
+                latencies.append(elapsed)
+                queries.append(COUNTER.count)
+        results[name] = _summary(latencies, queries)
+
+    engine.dispose()
+    return {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "postgres": server_version,
+            "iterations": iterations,
+            "warmup": warmup,
+            "seed": seed_value,
+            "population": population,
+        },
+        "results": results,
+        "uncovered": _uncovered({**session_cases, **clientes_cases}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa de datos")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", DEFAULT_DSN))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Ejecutar solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    report = run(args.dsn, args.iterations, args.warmup, args.only, args.seed)
+    payload = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
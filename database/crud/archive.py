@@ -0,0 +1,159 @@
+# database/crud/archive.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.crud.documents import all_blocks_approved_sql, notify_change
+from services.cache import ANY_TABLE
+from database.replica import replica_read
+
+# Tablas hijas que se mueven junto con la solicitud (antes que `requests`, por las FKs)
+CHILD_TABLES = [
+    "registration",
+    "comments",
+    "customs_registration",
+    "port_registration",
+    "shipping_line_registration",
+    "internal_registration",
+]
+
+_columns_cache: dict[str, list[str]] = {}
+
+
+def _common_columns(session: Session, table: str) -> list[str]:
+    """Columnas presentes en public.<table> y en archive.<table> (tolera columnas nuevas)."""
+    if table not in _columns_cache:
+        rows = session.execute(
+            text("""
+                SELECT a.column_name
+                FROM information_schema.columns a
+                JOIN information_schema.columns p
+                  ON p.table_schema = 'public' AND p.table_name = a.table_name AND p.column_name = a.column_name
+                WHERE a.table_schema = 'archive' AND a.table_name = :t
+                ORDER BY p.ordinal_position
+            """),
+            {"t": table}
+        ).scalars().all()
+        _columns_cache[table] = list(rows)
+    return _columns_cache[table]
+
+# ==========================
+# 🔹 ARCHIVADO
+# ==========================
+
+def find_archivable_request_ids(session: Session, older_than_days: int, after_id: int = 0, limit: int = 200):
+    """
+    Solicitudes completamente aprobadas y más antiguas que `older_than_days`.
+    Sin created_at se usa la primera carga de documentos. Paginado por id (keyset)
+    y bloqueadas con SKIP LOCKED para que el lote se mueva sin competir con otros.
+    """
+    return session.execute(
+        text(f"""
+            SELECT r.id
+            FROM requests r
+            WHERE r.id > :after_id
+              AND COALESCE(
+                    r.created_at,
+                    (SELECT MIN(g.uploaded_at) FROM registration g WHERE g.request_id = r.id)
+                  ) < CURRENT_TIMESTAMP - make_interval(days => :days)
+              AND {all_blocks_approved_sql("r")}
+            ORDER BY r.id
+            LIMIT :limit
+            FOR UPDATE OF r SKIP LOCKED
+        """),
+        {"after_id": after_id, "days": older_than_days, "limit": limit}
+    ).scalars().all()
+
+
+def archive_requests(session: Session, request_ids: list[int]) -> dict:
+    """
+    Mueve las solicitudes y sus filas hijas a `archive.*` (DELETE ... RETURNING → INSERT).
+    Debe llamarse dentro de la transacción del lote; el commit lo hace quien llama.
+    """
+    moved = {}
+    if not request_ids:
+        return moved
+
+    params = {"ids": list(request_ids)}
+    for table in CHILD_TABLES + ["requests"]:
+        cols = ", ".join(_common_columns(session, table))
+        key = "id" if table == "requests" else "request_id"
+        result = session.execute(
+            text(f"""
+                WITH moved AS (
+                    DELETE FROM public.{table}
+                    WHERE {key} = ANY(:ids)
+                    RETURNING {cols}
+                )
+                INSERT INTO archive.{table} ({cols})
+                SELECT {cols} FROM moved
+            """),
+            params
+        )
+        moved[table] = result.rowcount
+
+    for request_id in request_ids:
+        notify_change(session, ANY_TABLE, request_id)
+    return moved
+
+# ==========================
+# 🔹 LECTURA DE ARCHIVADAS
+# ==========================
+
+@replica_read
+def get_archived_requests(session: Session, only_for_email: str | None = None):
+    rows = session.execute(
+        text("""
+            SELECT r.id, r.company_name, r.profile_id, p.name AS profile_name,
+                   r.created_at, r.user_email, r.archived_at
+            FROM archive.requests r
+            LEFT JOIN profiles p ON p.id = r.profile_id
+            WHERE (CAST(:email AS TEXT) IS NULL OR LOWER(r.user_email) = LOWER(:email))
+            ORDER BY r.company_name, r.id DESC
+        """),
+        {"email": only_for_email}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+@replica_read
+def get_archived_dossier(session: Session, request_id: int):
+    """Expediente completo de una solicitud archivada (bloques, documentos y comentarios)."""
+    params = {"rid": request_id}
+    request = session.execute(
+        text("SELECT * FROM archive.requests WHERE id = :rid"), params
+    ).mappings().one_or_none()
+    if not request:
+        return None
+
+    status_label = dict(session.execute(text("SELECT id, status FROM status")).fetchall())
+
+    def rows(sql):
+        return [dict(r) for r in session.execute(text(sql), params).mappings().all()]
+
+    internal = rows("SELECT status_id FROM archive.internal_registration WHERE request_id = :rid ORDER BY id LIMIT 1")
+    return {
+        "request": dict(request),
+        "internal_status": status_label.get(internal[0]["status_id"], "Sin estado") if internal else "Sin estado",
+        "documents": rows("""
+            SELECT r.file_name, r.drive_link, r.uploaded_at, r.uploaded_by, r.razon_social,
+                   r.fecha_creacion, dt.category AS doc_type
+            FROM archive.registration r
+            LEFT JOIN document_type dt ON dt.id = r.doc_type_id
+            WHERE r.request_id = :rid
+            ORDER BY r.uploaded_at
+        """),
+        "shipping_lines": [
+            {**r, "status": status_label.get(r["status_id"], "Sin estado")}
+            for r in rows("SELECT line_name, status_id FROM archive.shipping_line_registration WHERE request_id = :rid ORDER BY id")
+        ],
+        "ports": [
+            {**r, "status": status_label.get(r["status_id"], "Sin estado")}
+            for r in rows("SELECT port_name, terminal_name, status_id FROM archive.port_registration WHERE request_id = :rid ORDER BY port_name, id")
+        ],
+        "customs": [
+            {**r, "status": status_label.get(r["status_id"], "Sin estado")}
+            for r in rows("SELECT customs_name, status_id FROM archive.customs_registration WHERE request_id = :rid ORDER BY id")
+        ],
+        "comments": next(iter(rows("SELECT comments, notifications FROM archive.comments WHERE request_id = :rid")), None),
+    }
@@ -1,7 +1,18 @@
 import psycopg2
+from psycopg2.extras import execute_values
 import os
 
-def get_connection():
+from database.crud.reminders import reminder_interval
+from database.replica import get_replica_url, mark_recent_write, primary_required
+from services import cache, sql_profiler
+
+def get_connection(read_only: bool = False):
+    # 0. Lecturas: réplica si está configurada (salvo justo después de una escritura)
+    if read_only and not primary_required():
+        replica_url = get_replica_url()
+        if replica_url:
+            return psycopg2.connect(dsn=replica_url, cursor_factory=sql_profiler.cursor_factory())
+
     # 1. Intenta leer DATABASE_URL de Streamlit Cloud (secrets) o de las env vars locales
     try:
         import streamlit as st
@@ -12,10 +23,15 @@ def get_connection():
     if not url:
         raise ValueError("DATABASE_URL no está definido en secrets ni en el entorno.")
 
-    return psycopg2.connect(dsn=url)
+    return psycopg2.connect(dsn=url, cursor_factory=sql_profiler.cursor_factory())
+
+def notify_changes(cur, changes: list[tuple]):
+    """NOTIFY (tabla, request_id) dentro de la transacción del cursor; se entrega al hacer commit."""
+    payloads = [cache.payload(table, request_id) for table, request_id in changes]
+    cur.execute("SELECT pg_notify(%s, p) FROM unnest(%s::text[]) AS p", (cache.CHANNEL, payloads))
 
 def get_profile_id(profile_name):
-    conn = get_connection()
+    conn = get_connection(read_only=True)
     cur = conn.cursor()
     cur.execute("SELECT id FROM profiles WHERE name = %s", (profile_name.lower(),))
     result = cur.fetchone()
@@ -23,6 +39,51 @@ def get_profile_id(profile_name):
     conn.close()
     return result[0] if result else None
 
+def find_similar_companies(company_name: str, limit: int = 5, threshold: float = 0.45):
+    """
+    Compañías existentes parecidas a `company_name` (sin tildes, mayúsculas, puntuación
+    ni sufijos societarios), usando el índice GIN de trigramas sobre normalize_company_name.
+    Retorna [{company_name, requests, last_request_id, profiles, score}] de mayor a menor similitud.
+    """
+    if not company_name or len(company_name.strip()) < 3:
+        return []
+
+    conn = get_connection(read_only=True)
+    try:
+        cur = conn.cursor()
+        # `%` usa el índice con este umbral (solo para esta transacción)
+        cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(threshold),))
+        # normalize_company_name(%s) es IMMUTABLE: se evalúa al planear y el `%` usa el índice
+        cur.execute("""
+            SELECT r.company_name,
+                   COUNT(*) AS requests,
+                   MAX(r.id) AS last_request_id,
+                   string_agg(DISTINCT p.name, ', ') AS profiles,
+                   MAX(similarity(normalize_company_name(r.company_name), normalize_company_name(%s))) AS score
+            FROM requests r
+            LEFT JOIN profiles p ON p.id = r.profile_id
+            WHERE normalize_company_name(r.company_name) %% normalize_company_name(%s)
+            GROUP BY r.company_name
+            ORDER BY score DESC, requests DESC
+            LIMIT %s
+        """, (company_name, company_name, limit))
+        rows = cur.fetchall()
+        conn.rollback()
+        cur.close()
+    finally:
+        conn.close()
+
+    return [
+        {
+            "company_name": r[0],
+            "requests": r[1],
+            "last_request_id": r[2],
+            "profiles": r[3],
+            "score": float(r[4]),
+        }
+        for r in rows
+    ]
+
 def insert_client_request(
     profile_id: int,
     company_name: str = None,
@@ -61,9 +122,11 @@ def insert_client_request(
             has_customs,
             has_port,
             has_shipping_line,
-            user_email
+            user_email,
+            next_reminder_at
         )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                CURRENT_TIMESTAMP + CAST(%s AS INTERVAL))
         RETURNING id;
     """, (
         profile_id,
@@ -80,11 +143,15 @@ def insert_client_request(
         has_customs,
         has_port,
         has_shipping_line,
-        user_email
+        user_email,
+        reminder_interval(reminder_frequency)
     ))
 
     request_id = cur.fetchone()[0]
+    notify_changes(cur, [("requests", request_id)])
     conn.commit()
+    mark_recent_write()
+    cache.invalidate("requests", request_id)
     cur.close()
     conn.close()
 
@@ -101,7 +168,10 @@ def insert_customs_registration(request_id: int, customs_list: list):
             INSERT INTO customs_registration (request_id, customs_name)
             VALUES (%s, %s);
         """, (request_id, customs_name))
+    notify_changes(cur, [("customs_registration", request_id)])
     conn.commit()
+    mark_recent_write()
+    cache.invalidate("customs_registration", request_id)
     cur.close()
     conn.close()
 
@@ -124,7 +194,10 @@ def insert_port_registration(request_id: int, ports_dict: dict):
                     INSERT INTO port_registration (request_id, port_name, terminal_name)
                     VALUES (%s, %s, %s);
                 """, (request_id, port_name, terminal))
+    notify_changes(cur, [("port_registration", request_id)])
     conn.commit()
+    mark_recent_write()
+    cache.invalidate("port_registration", request_id)
     cur.close()
     conn.close()
 
@@ -149,7 +222,115 @@ def insert_shipping_line_registration(request_id: int, lines_data: dict):
             line_info.get("Tipo de Contenedor"),
             line_info.get("Shipper en BL")
         ))
+    notify_changes(cur, [("shipping_line_registration", request_id)])
     conn.commit()
+    mark_recent_write()
+    cache.invalidate("shipping_line_registration", request_id)
     cur.close()
     conn.close()
 
+
+
+def insert_client_requests_batch(items: list[dict], conn=None) -> list[int]:
+    """
+    Crea varias solicitudes (con aduanas, puertos y líneas navieras) en una sola
+    conexión y una sola transacción. Cada item usa las mismas llaves que
+    insert_client_request más `profile_name`, `customs_list`, `ports_dict` y `lines_data`.
+    `conn`: conexión DBAPI a usar (p. ej. engine.raw_connection(), del pool); se cierra
+    al terminar, lo que en una conexión del pool la devuelve al pool.
+    Retorna los IDs en el mismo orden de `items`.
+    """
+    if not items:
+        if conn is not None:
+            conn.close()
+        return []
+
+    conn = conn or get_connection()
+    try:
+        cur = conn.cursor()
+
+        cur.execute("SELECT id, name FROM profiles")
+        profiles = {name.lower(): pid for pid, name in cur.fetchall()}
+
+        request_rows = []
+        for item in items:
+            profile_id = item.get("profile_id") or profiles.get((item.get("profile_name") or "").lower())
+            if not profile_id:
+                raise ValueError(f"Perfil inválido: {item.get('profile_name')!r}")
+            request_rows.append((
+                profile_id,
+                item.get("requested_by"),
+                item.get("company_name"),
+                item.get("trading"),
+                item.get("location"),
+                item.get("language"),
+                item.get("email"),
+                item.get("reminder_frequency"),
+                item.get("operation_type"),
+                item.get("commodity"),
+                item.get("customs_req"),
+                bool(item.get("customs_list")) or bool(item.get("has_customs")),
+                bool(item.get("ports_dict")) or bool(item.get("has_port")),
+                bool(item.get("lines_data")) or bool(item.get("has_shipping_line")),
+                item.get("user_email"),
+                reminder_interval(item.get("reminder_frequency")),
+            ))
+
+        # INSERT multi-VALUES (por páginas): RETURNING devuelve los IDs en el orden de VALUES
+        returned = execute_values(cur, """
+            INSERT INTO requests (
+                profile_id, commercial, company_name, trading, country, language, email,
+                reminder_frequency, operation_type, commodity, customs_req, has_customs,
+                has_port, has_shipping_line, user_email, next_reminder_at
+            )
+            VALUES %s
+            RETURNING id
+        """, request_rows,
+            template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, "
+                     "CURRENT_TIMESTAMP + CAST(%s AS INTERVAL))",
+            fetch=True)
+        request_ids = [r[0] for r in returned]
+
+        customs_rows, port_rows, line_rows = [], [], []
+        for request_id, item in zip(request_ids, items):
+            for customs_name in item.get("customs_list") or []:
+                customs_rows.append((request_id, customs_name))
+            for port_name, terminals in (item.get("ports_dict") or {}).items():
+                for terminal in (terminals or [None]):
+                    port_rows.append((request_id, port_name, terminal))
+            for line_name, line_info in (item.get("lines_data") or {}).items():
+                line_info = line_info or {}
+                line_rows.append((
+                    request_id, line_name, line_info.get("POL"), line_info.get("POD"),
+                    line_info.get("Producto"), line_info.get("Tipo de Contenedor"),
+                    line_info.get("Shipper en BL"),
+                ))
+
+        if customs_rows:
+            execute_values(cur, "INSERT INTO customs_registration (request_id, customs_name) VALUES %s", customs_rows)
+        if port_rows:
+            execute_values(cur, "INSERT INTO port_registration (request_id, port_name, terminal_name) VALUES %s", port_rows)
+        if line_rows:
+            execute_values(cur, """
+                INSERT INTO shipping_line_registration
+                (request_id, line_name, pol, pod, product, container_type, shipper_bl)
+                VALUES %s
+            """, line_rows)
+
+        changes = [("requests", rid) for rid in request_ids]
+        changes += [("customs_registration", r[0]) for r in customs_rows]
+        changes += [("port_registration", r[0]) for r in port_rows]
+        changes += [("shipping_line_registration", r[0]) for r in line_rows]
+        changes = list(dict.fromkeys(changes))
+        notify_changes(cur, changes)
+
+        conn.commit()
+        mark_recent_write()
+        cache.invalidate_many(changes)
+        cur.close()
+        return request_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,160 @@
+# database/crud/digests.py
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+STATUS_TABLE_LABELS = {
+    "internal_registration": "Registro interno",
+    "customs_registration": "Aduana",
+    "port_registration": "Puerto",
+    "shipping_line_registration": "Línea naviera",
+}
+
+# ==========================
+# 🔹 MARCA DE AGUA
+# ==========================
+
+def get_last_run(session: Session, job_name: str, first_run_at: datetime) -> datetime:
+    """
+    Marca de la última corrida, bloqueada (FOR UPDATE) hasta el commit. En la primera
+    corrida se crea con `first_run_at`: sin fila no habría nada que bloquear y dos
+    workers enviarían los mismos resúmenes.
+    """
+    session.execute(
+        text("""
+            INSERT INTO digest_state (job_name, last_run_at)
+            VALUES (:j, :t)
+            ON CONFLICT (job_name) DO NOTHING
+        """),
+        {"j": job_name, "t": first_run_at}
+    )
+    return session.execute(
+        text("SELECT last_run_at FROM digest_state WHERE job_name = :j FOR UPDATE"),
+        {"j": job_name}
+    ).scalar()
+
+
+def save_last_run(session: Session, job_name: str, last_run_at: datetime):
+    session.execute(
+        text("""
+            INSERT INTO digest_state (job_name, last_run_at)
+            VALUES (:j, :t)
+            ON CONFLICT (job_name) DO UPDATE SET last_run_at = EXCLUDED.last_run_at
+        """),
+        {"j": job_name, "t": last_run_at}
+    )
+
+def get_horizon(session: Session, lag: timedelta) -> datetime:
+    """
+    Hasta dónde cubrir: changed_at/uploaded_at son la hora de INICIO de la transacción
+    que escribió, así que lo más reciente puede aparecer después con una hora anterior.
+    """
+    return session.execute(
+        text("SELECT LOCALTIMESTAMP - make_interval(secs => :lag)"),
+        {"lag": lag.total_seconds()}
+    ).scalar()
+
+
+def get_retries(session: Session, job_name: str) -> dict:
+    """{email: {"since_at", "attempts"}} de los resúmenes que quedaron sin enviar."""
+    rows = session.execute(
+        text("SELECT user_email, since_at, attempts FROM digest_retries WHERE job_name = :j FOR UPDATE"),
+        {"j": job_name}
+    ).mappings().all()
+    return {r["user_email"]: {"since_at": r["since_at"], "attempts": r["attempts"]} for r in rows}
+
+
+def save_retry(session: Session, job_name: str, email: str, since_at: datetime, error: str):
+    """Conserva el inicio más antiguo: el próximo resumen cubre todo lo que no llegó."""
+    session.execute(
+        text("""
+            INSERT INTO digest_retries (job_name, user_email, since_at, last_error)
+            VALUES (:j, :e, :s, :err)
+            ON CONFLICT (job_name, user_email) DO UPDATE
+            SET since_at = LEAST(digest_retries.since_at, EXCLUDED.since_at),
+                attempts = digest_retries.attempts + 1,
+                last_error = EXCLUDED.last_error
+        """),
+        {"j": job_name, "e": email, "s": since_at, "err": error}
+    )
+
+
+def delete_retry(session: Session, job_name: str, email: str):
+    session.execute(
+        text("DELETE FROM digest_retries WHERE job_name = :j AND user_email = :e"),
+        {"j": job_name, "e": email}
+    )
+
+# ==========================
+# 🔹 CAMBIOS POR SOLICITANTE
+# ==========================
+
+def get_changes_by_requester(session: Session, since: datetime, until: datetime,
+                             emails: list[str] | None = None) -> dict:
+    """
+    Cambios de estado y documentos nuevos en (since, until], agrupados por requests.user_email
+    (en minúsculas). Con `emails`, solo los de esos solicitantes.
+    Dos consultas por rango (status_events y registration), sin recorrer solicitud por solicitud.
+    """
+    params = {"since": since, "until": until, "emails": [e.lower() for e in emails] if emails else None}
+    digests: dict[str, dict] = {}
+
+    def bucket(email: str, request_id: int, company_name: str):
+        person = digests.setdefault(email.lower(), {})
+        return person.setdefault(request_id, {
+            "company_name": company_name,
+            "status_changes": [],
+            "documents": [],
+        })
+
+    status_rows = session.execute(
+        text("""
+            SELECT r.user_email, r.id AS request_id, r.company_name,
+                   e.table_name, e.entity_name, e.terminal_name,
+                   so.status AS old_status, sn.status AS new_status, e.changed_at
+            FROM status_events e
+            JOIN requests r ON r.id = e.request_id
+            LEFT JOIN status so ON so.id = e.old_status_id
+            LEFT JOIN status sn ON sn.id = e.new_status_id
+            WHERE e.changed_at > :since AND e.changed_at <= :until
+              AND r.user_email IS NOT NULL
+              AND (CAST(:emails AS TEXT[]) IS NULL OR LOWER(r.user_email) = ANY(:emails))
+            ORDER BY r.user_email, r.id, e.changed_at
+        """),
+        params
+    ).mappings().all()
+    for row in status_rows:
+        bucket(row["user_email"], row["request_id"], row["company_name"])["status_changes"].append({
+            "block": STATUS_TABLE_LABELS.get(row["table_name"], row["table_name"]),
+            "entity_name": row["entity_name"],
+            "terminal_name": row["terminal_name"],
+            "old_status": row["old_status"],
+            "new_status": row["new_status"],
+            "changed_at": row["changed_at"],
+        })
+
+    doc_rows = session.execute(
+        text("""
+            SELECT r.user_email, r.id AS request_id, r.company_name,
+                   g.file_name, dt.category AS doc_type, g.uploaded_at
+            FROM registration g
+            JOIN requests r ON r.id = g.request_id
+            LEFT JOIN document_type dt ON dt.id = g.doc_type_id
+            WHERE g.uploaded_at > :since AND g.uploaded_at <= :until
+              AND g.drive_link IS NOT NULL
+              AND r.user_email IS NOT NULL
+              AND (CAST(:emails AS TEXT[]) IS NULL OR LOWER(r.user_email) = ANY(:emails))
+            ORDER BY r.user_email, r.id, g.uploaded_at
+        """),
+        params
+    ).mappings().all()
+    for row in doc_rows:
+        bucket(row["user_email"], row["request_id"], row["company_name"])["documents"].append({
+            "file_name": row["file_name"],
+            "doc_type": row["doc_type"],
+            "uploaded_at": row["uploaded_at"],
+        })
+
+    return digests
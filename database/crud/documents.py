@@ -2,25 +2,58 @@
 
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import time
 from datetime import datetime
 from typing import Optional
 
+from database.replica import replica_read
+from services import cache
+from services.cache import cached
+
+# Tablas por solicitud que alimentan las vistas de progreso y carga
+PROGRESS_TABLES = (
+    "requests", "registration", "internal_registration", "shipping_line_registration",
+    "port_registration", "customs_registration", "comments",
+)
+
+# ==========================
+# 🔹 INVALIDACIÓN DE CACHÉ
+# ==========================
+
+def notify_change(session: Session, table_name: str, request_id: Optional[int] = None):
+    """
+    NOTIFY en la misma transacción (se entrega al resto de procesos solo si hay commit)
+    y registro para invalidar la caché local en el after_commit de la sesión.
+    """
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": cache.CHANNEL, "payload": cache.payload(table_name, request_id)}
+    )
+    session.info.setdefault("cache_invalidations", set()).add((table_name, request_id))
+
 # ==========================
 # 🔹 EMPRESAS Y PERFILES
 # ==========================
 
+@cached(tables=("requests",))
+@replica_read
 def get_all_company_names(session: Session):
     rows = session.execute(
         text("SELECT DISTINCT company_name FROM requests ORDER BY company_name ASC")
     ).fetchall()
     return [r[0] for r in rows if r[0]]
 
+@cached(tables=("profiles",))
+@replica_read
 def get_profiles_list(session: Session):
     rows = session.execute(
         text("SELECT name FROM profiles ORDER BY name ASC")
     ).fetchall()
     return [r[0] for r in rows if r[0]]
 
+@cached(tables=("profiles",))
+@replica_read
 def get_profile_id_by_name(session: Session, profile_name: str):
     return session.execute(
         text("SELECT id FROM profiles WHERE name = :n"),
@@ -31,6 +64,7 @@ def get_profile_id_by_name(session: Session, profile_name: str):
 # 🔹 SOLICITUDES EXISTENTES
 # ==========================
 
+@replica_read
 def get_requests_by_company_and_profile(session: Session, company_name: str, profile_id: int, limit: int = 20):
     rows = session.execute(
         text("""
@@ -48,6 +82,8 @@ def get_requests_by_company_and_profile(session: Session, company_name: str, pro
 # 🔹 TIPOS DE DOCUMENTOS
 # ==========================
 
+@cached(tables=("document_type",))
+@replica_read
 def get_required_document_types(session: Session, profile_id: int):
     """
     Devuelve los tipos de documentos (category) requeridos para un perfil.
@@ -61,12 +97,105 @@ def get_required_document_types(session: Session, profile_id: int):
         """),
         {"pid": profile_id}
     ).mappings().all()
-    return rows
+    return [dict(r) for r in rows]
+
+# Tipos de documento del bloque "Registro interno" por perfil (1 = cliente, 2 = proveedor)
+INTERNAL_DOC_TYPES = {
+    1: {"empresa": 6, "vinculacion": 7, "seguridad": 8},
+    2: {"empresa": 9, "vinculacion": 10, "seguridad": 11},
+}
+
+# Documentos que solo se exigen si la solicitud tiene el bloque correspondiente
+# (mismas palabras clave que asocian documento y bloque en el formulario de carga)
+BLOCK_DOC_KEYWORDS = {
+    "has_customs": "aduaner",
+    "has_port": "puerto",
+    "has_shipping_line": "naviera",
+}
+
+
+def _completeness_sql(ids_filter: str) -> str:
+    internal_values = ", ".join(
+        f"({pid}, {doc_id})" for pid, docs in INTERNAL_DOC_TYPES.items() for doc_id in docs.values()
+    )
+    block_conditions = "\n              AND ".join(
+        f"(LOWER(dt.category) NOT LIKE '%{kw}%' OR q.{flag})" for flag, kw in BLOCK_DOC_KEYWORDS.items()
+    )
+    return f"""
+        WITH q AS (
+            SELECT r.id, r.profile_id,
+                   r.has_customs OR EXISTS (SELECT 1 FROM customs_registration c WHERE c.request_id = r.id) AS has_customs,
+                   r.has_port OR EXISTS (SELECT 1 FROM port_registration p WHERE p.request_id = r.id) AS has_port,
+                   r.has_shipping_line OR EXISTS (SELECT 1 FROM shipping_line_registration l WHERE l.request_id = r.id) AS has_shipping_line
+            FROM requests r
+            WHERE {ids_filter}
+        ),
+        required AS (
+            SELECT q.id AS request_id, dt.id AS doc_type_id, dt.category
+            FROM q
+            JOIN document_type dt ON dt.profile_id = q.profile_id
+            WHERE {block_conditions}
+            UNION
+            SELECT q.id, it.doc_type_id, COALESCE(dt.category, 'Documento ' || it.doc_type_id)
+            FROM q
+            JOIN (VALUES {internal_values}) AS it (profile_id, doc_type_id) ON it.profile_id = q.profile_id
+            LEFT JOIN document_type dt ON dt.id = it.doc_type_id
+        ),
+        uploaded AS (
+            SELECT DISTINCT g.request_id, g.doc_type_id
+            FROM registration g
+            JOIN q ON q.id = g.request_id
+            WHERE g.drive_link IS NOT NULL
+        )
+        SELECT q.id AS request_id,
+               COUNT(rq.doc_type_id) AS required,
+               COUNT(u.doc_type_id) AS uploaded,
+               COALESCE(
+                   array_agg(rq.category ORDER BY rq.category) FILTER (WHERE rq.doc_type_id IS NOT NULL AND u.doc_type_id IS NULL),
+                   '{{}}'
+               ) AS missing
+        FROM q
+        LEFT JOIN required rq ON rq.request_id = q.id
+        LEFT JOIN uploaded u ON u.request_id = rq.request_id AND u.doc_type_id = rq.doc_type_id
+        GROUP BY q.id
+    """
+
+
+def _completeness_row(r) -> dict:
+    return {
+        "required": r.required,
+        "uploaded": r.uploaded,
+        "percent": round(100 * r.uploaded / r.required) if r.required else 100,
+        "missing": list(r.missing),
+    }
+
+
+@cached(tables=("document_type",), request_tables=("requests", "registration", "customs_registration",
+                                                   "port_registration", "shipping_line_registration"),
+        request_arg="request_ids")
+@replica_read
+def get_document_completeness(session: Session, request_ids: list[int] | None = None):
+    """
+    Documentos requeridos vs. cargados para muchas solicitudes en una sola consulta
+    (todas si request_ids es None). Requeridos = tipos del perfil (los de aduana / puerto /
+    naviera solo si la solicitud tiene ese bloque) + los internos de INTERNAL_DOC_TYPES.
+    Retorna {request_id: {"required", "uploaded", "percent", "missing": [categorías]}}.
+    """
+    if request_ids is None:
+        rows = session.execute(text(_completeness_sql("TRUE"))).fetchall()
+    else:
+        ids = list({int(i) for i in request_ids})
+        if not ids:
+            return {}
+        rows = session.execute(text(_completeness_sql("r.id = ANY(:ids)")), {"ids": ids}).fetchall()
+    return {r.request_id: _completeness_row(r) for r in rows}
 
 # ==========================
 # 🔹 DOCUMENTOS SUBIDOS
 # ==========================
 
+@cached(request_tables=("registration",))
+@replica_read
 def get_uploaded_documents_map(session: Session, request_id: int):
     rows = session.execute(
         text("""
@@ -104,8 +233,11 @@ def upsert_uploaded_document(session: Session, request_id: int, document_type_id
             "fecha_creacion": fecha_creacion
         }
     )
+    notify_change(session, "registration", request_id)
 
 
+@cached(request_tables=("comments",))
+@replica_read
 def get_request_meta(session: Session, request_id: int):
     row = session.execute(
         text("""
@@ -147,12 +279,47 @@ def update_request_meta(session: Session, request_id: int, notifications: str, c
             """),
             {"rid": request_id, "notifications": notifications, "comments": comments}
         )
+    notify_change(session, "comments", request_id)
+
+# Estados que cuentan como "aprobado" (comparación en minúsculas)
+APPROVED_STATUS_PATTERN = "aprobad%"
+
+
+def all_blocks_approved_sql(alias: str = "r") -> str:
+    """
+    Condición SQL: la solicitud `{alias}.id` tiene el registro interno aprobado
+    y ninguna aduana / puerto / línea naviera pendiente.
+    """
+    approved = f"SELECT id FROM status WHERE LOWER(status) LIKE '{APPROVED_STATUS_PATTERN}'"
+    return f"""(
+        EXISTS (
+            SELECT 1 FROM internal_registration ir
+            WHERE ir.request_id = {alias}.id AND ir.status_id IN ({approved})
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM customs_registration cr
+            WHERE cr.request_id = {alias}.id AND cr.status_id NOT IN ({approved})
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM port_registration pr
+            WHERE pr.request_id = {alias}.id AND pr.status_id NOT IN ({approved})
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM shipping_line_registration sr
+            WHERE sr.request_id = {alias}.id AND sr.status_id NOT IN ({approved})
+        )
+    )"""
 
+
+@cached(tables=("status",))
+@replica_read
 def get_all_statuses(session):
     rows = session.execute(text("SELECT id, status FROM status ORDER BY id")).fetchall()
     return {r[1]: r[0] for r in rows}
 
 
+@cached(request_tables=("shipping_line_registration",))
+@replica_read
 def get_shipping_lines_status(session, request_id):
     return session.execute(text("""
         SELECT id, line_name, status_id
@@ -160,6 +327,8 @@ def get_shipping_lines_status(session, request_id):
         WHERE request_id = :req
     """), {"req": request_id}).fetchall()
 
+@cached(request_tables=("port_registration",))
+@replica_read
 def get_ports_status(session, request_id):
     return session.execute(text("""
         SELECT id, port_name, terminal_name, status_id
@@ -167,6 +336,8 @@ def get_ports_status(session, request_id):
         WHERE request_id = :req
     """), {"req": request_id}).fetchall()
 
+@cached(request_tables=("customs_registration",))
+@replica_read
 def get_customs_status(session, request_id):
     return session.execute(text("""
         SELECT id, customs_name, status_id
@@ -175,101 +346,235 @@ def get_customs_status(session, request_id):
     """), {"req": request_id}).fetchall()
 
 
-def update_status(session, table_name: str, record_id: int, status_id: int):
+STATUS_TABLES = {
+    "shipping_line_registration": ("line_name", None),
+    "port_registration": ("port_name", "terminal_name"),
+    "customs_registration": ("customs_name", None),
+    "internal_registration": ("internal_label", None),
+}
+
+
+def record_status_event(session, table_name: str, request_id: int, record_id: int,
+                        old_status_id: Optional[int], new_status_id: int,
+                        entity_name: Optional[str] = None, terminal_name: Optional[str] = None,
+                        changed_by: Optional[str] = None):
+    """Agrega una fila al historial (misma transacción que el cambio de estado)."""
     session.execute(
-        text(f"UPDATE {table_name} SET status_id = :st WHERE id = :rid"),
-        {"st": status_id, "rid": record_id}
+        text("""
+            INSERT INTO status_events (
+                request_id, table_name, record_id, entity_name, terminal_name,
+                old_status_id, new_status_id, changed_by
+            )
+            VALUES (
+                :request_id, :table_name, :record_id, :entity_name, :terminal_name,
+                :old_status_id, :new_status_id, :changed_by
+            )
+        """),
+        {
+            "request_id": request_id,
+            "table_name": table_name,
+            "record_id": record_id,
+            "entity_name": entity_name,
+            "terminal_name": terminal_name,
+            "old_status_id": old_status_id,
+            "new_status_id": new_status_id,
+            "changed_by": changed_by,
+        }
     )
+    notify_change(session, "status_events", request_id)
 
-def upsert_status(session, table_name: str, request_id: int, entity_name: str, status_id: int, terminal_name: Optional[str] = None):
-    valid_tables = {
-        "shipping_line_registration": ("line_name", None),
-        "port_registration": ("port_name", "terminal_name"),
-        "customs_registration": ("customs_name", None),
-        "internal_registration": ("internal_label", None),
-    }
 
-    if table_name not in valid_tables:
+def update_status(session, table_name: str, record_id: int, status_id: int, changed_by: Optional[str] = None):
+    if table_name not in STATUS_TABLES:
+        raise ValueError(f"Invalid table name: {table_name}")
+
+    row = session.execute(
+        text(f"""
+            UPDATE {table_name} t
+            SET status_id = :st
+            FROM (SELECT id, status_id AS old_status_id FROM {table_name} WHERE id = :rid FOR UPDATE) old
+            WHERE t.id = old.id
+            RETURNING t.request_id, old.old_status_id
+        """),
+        {"st": status_id, "rid": record_id}
+    ).fetchone()
+
+    if row:
+        notify_change(session, table_name, row.request_id)
+    if row and row.old_status_id != status_id:
+        record_status_event(
+            session, table_name, row.request_id, record_id,
+            row.old_status_id, status_id, changed_by=changed_by
+        )
+
+def upsert_status(session, table_name: str, request_id: int, entity_name: str, status_id: int,
+                  terminal_name: Optional[str] = None, changed_by: Optional[str] = None):
+    if table_name not in STATUS_TABLES:
         raise ValueError(f"Invalid table name: {table_name}")
 
-    name_field, terminal_field = valid_tables[table_name]
+    name_field, terminal_field = STATUS_TABLES[table_name]
     params = {
         "request_id": request_id,
         "name": entity_name.strip() if entity_name else "",
         "status_id": status_id,
     }
 
+    where = f"request_id = :request_id AND {name_field} = :name"
+    insert_cols = f"request_id, {name_field}, status_id"
+    insert_vals = ":request_id, :name, :status_id"
+
     if terminal_field:
-        if terminal_field:
-            terminal_clean = terminal_name.strip() if terminal_name else None
-            params["terminal_name"] = terminal_clean
-
-            existing = session.execute(
-                text(f"""
-                    SELECT id FROM {table_name}
-                    WHERE request_id = :request_id
-                    AND {name_field} = :name
-                    AND (
-                            ({terminal_field} IS NULL AND :terminal_name IS NULL)
-                        OR {terminal_field} = :terminal_name
-                        OR (COALESCE({terminal_field}, '') = COALESCE(:terminal_name, ''))
-                    )
-                """),
-                params
-            ).fetchone()
-
-            if existing:
-                session.execute(
-                    text(f"UPDATE {table_name} SET status_id = :status_id WHERE id = :id"),
-                    {"status_id": status_id, "id": existing[0]},
-                )
-            else:
-                session.execute(
-                    text(f"""
-                        INSERT INTO {table_name} (request_id, {name_field}, {terminal_field}, status_id)
-                        VALUES (:request_id, :name, :terminal_name, :status_id)
-                    """),
-                    params
-                )
+        params["terminal_name"] = terminal_name.strip() if terminal_name else None
+        where += f" AND COALESCE({terminal_field}, '') = COALESCE(:terminal_name, '')"
+        insert_cols += f", {terminal_field}"
+        insert_vals += ", :terminal_name"
 
-        if existing:
-            session.execute(
-                text(f"UPDATE {table_name} SET status_id = :status_id WHERE id = :id"),
-                {"status_id": status_id, "id": existing[0]},
-            )
-        else:
-            session.execute(
-                text(f"""
-                    INSERT INTO {table_name} (request_id, {name_field}, {terminal_field}, status_id)
-                    VALUES (:request_id, :name, :terminal_name, :status_id)
-                """),
-                params
-            )
+    existing = session.execute(
+        text(f"SELECT id, status_id FROM {table_name} WHERE {where} FOR UPDATE"),
+        params
+    ).fetchone()
 
+    if existing:
+        record_id, old_status_id = existing[0], existing[1]
+        if old_status_id == status_id:
+            return
+        session.execute(
+            text(f"UPDATE {table_name} SET status_id = :status_id WHERE id = :id"),
+            {"status_id": status_id, "id": record_id},
+        )
     else:
-        existing = session.execute(
-            text(f"""
-                SELECT id FROM {table_name}
-                WHERE request_id = :request_id
-                AND {name_field} = :name
-            """),
+        old_status_id = None
+        record_id = session.execute(
+            text(f"INSERT INTO {table_name} ({insert_cols}) VALUES ({insert_vals}) RETURNING id"),
             params
-        ).fetchone()
+        ).scalar()
+
+    notify_change(session, table_name, request_id)
+    record_status_event(
+        session, table_name, request_id, record_id, old_status_id, status_id,
+        entity_name=params["name"], terminal_name=params.get("terminal_name"),
+        changed_by=changed_by
+    )
+
+# ==========================
+# 🔹 HISTORIAL DE ESTADOS
+# ==========================
+
+@cached(tables=("status",), request_tables=("status_events",))
+@replica_read
+def get_status_timeline(session, request_id: int):
+    """Cambios de estado de una solicitud, del más antiguo al más reciente (idx_status_events_request)."""
+    rows = session.execute(
+        text("""
+            SELECT
+                e.changed_at,
+                e.table_name,
+                e.entity_name,
+                e.terminal_name,
+                so.status AS old_status,
+                sn.status AS new_status,
+                e.changed_by
+            FROM status_events e
+            LEFT JOIN status so ON so.id = e.old_status_id
+            LEFT JOIN status sn ON sn.id = e.new_status_id
+            WHERE e.request_id = :rid
+            ORDER BY e.changed_at, e.id
+        """),
+        {"rid": request_id}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def ensure_status_event_partitions(session, months_ahead: int = 2):
+    """
+    Crea las particiones mensuales del mes actual y los `months_ahead` siguientes, más las
+    de cualquier mes que haya caído en la partición DEFAULT (mantenimiento atrasado):
+    create_status_events_partition mueve esas filas a su partición.
+    """
+    return session.execute(
+        text("""
+            SELECT create_status_events_partition(month)
+            FROM (
+                SELECT (date_trunc('month', CURRENT_DATE) + make_interval(months => m))::date AS month
+                FROM generate_series(0, :ahead) AS m
+                UNION
+                SELECT DISTINCT date_trunc('month', changed_at)::date
+                FROM status_events_default
+            ) months
+            ORDER BY month
+        """),
+        {"ahead": months_ahead}
+    ).scalars().all()
 
-        if existing:
-            session.execute(
-                text(f"UPDATE {table_name} SET status_id = :status_id WHERE id = :id"),
-                {"status_id": status_id, "id": existing[0]},
-            )
-        else:
-            session.execute(
-                text(f"""
-                    INSERT INTO {table_name} (request_id, {name_field}, status_id)
-                    VALUES (:request_id, :name, :status_id)
-                """),
-                params
-            )
 
+def detach_status_event_partitions(conn, older_than_months: int, lock_timeout_ms: int = 2000,
+                                   lock_retries: int = 5):
+    """
+    Desprende (DETACH) las particiones mensuales completamente anteriores al corte.
+    Las tablas quedan intactas para respaldo o DROP.
+
+    `conn` es una conexión en AUTOCOMMIT: cada partición es su propia sentencia, sin
+    dejar bloqueos sobre status_events abiertos hasta un commit.
+    - Sin partición DEFAULT: DETACH ... CONCURRENTLY (PG14+), no bloquea escrituras.
+    - Con DEFAULT (Postgres no permite CONCURRENTLY): DETACH normal con lock_timeout
+      corto y reintentos; el ACCESS EXCLUSIVE dura lo que el cambio de catálogo y no
+      queda en cola detrás de transacciones largas frenando los INSERT de estados.
+    - Un CONCURRENTLY interrumpido deja la partición "detach pending": se termina con FINALIZE.
+    """
+    has_default = conn.execute(
+        text("""
+            SELECT pt.partdefid <> 0
+            FROM pg_partitioned_table pt
+            JOIN pg_class p ON p.oid = pt.partrelid
+            WHERE p.relname = 'status_events'
+        """)
+    ).scalar()
+    rows = conn.execute(
+        text("""
+            SELECT c.relname, i.inhdetachpending
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'status_events'
+              AND c.relname ~ '^status_events_[0-9]{4}_[0-9]{2}$'
+              AND to_date(substring(c.relname from '[0-9]{4}_[0-9]{2}$'), 'YYYY_MM')
+                  < date_trunc('month', CURRENT_DATE) - make_interval(months => :months)
+            ORDER BY c.relname
+        """),
+        {"months": older_than_months}
+    ).all()
+
+    detached = []
+    for name, pending in rows:
+        if pending:
+            sql = f'ALTER TABLE status_events DETACH PARTITION "{name}" FINALIZE'
+        elif has_default:
+            sql = f'ALTER TABLE status_events DETACH PARTITION "{name}"'
+        else:
+            sql = f'ALTER TABLE status_events DETACH PARTITION "{name}" CONCURRENTLY'
+        _execute_with_lock_retries(conn, sql, lock_timeout_ms, lock_retries)
+        detached.append(name)
+    return detached
+
+
+def _execute_with_lock_retries(conn, sql: str, lock_timeout_ms: int, retries: int):
+    """Ejecuta `sql` (autocommit) rindiéndose ante bloqueos tras lock_timeout y reintentando."""
+    conn.execute(text(f"SET lock_timeout = {int(lock_timeout_ms)}"))
+    try:
+        for attempt in range(retries + 1):
+            try:
+                conn.execute(text(sql))
+                return
+            except OperationalError as e:
+                # 55P03 = lock_not_available
+                if getattr(e.orig, "pgcode", None) != "55P03" or attempt == retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+    finally:
+        conn.execute(text("RESET lock_timeout"))
+
+@cached(request_tables=("internal_registration",))
+@replica_read
 def get_internal_status(session, request_id):
     row = session.execute(
         text("SELECT status_id FROM internal_registration WHERE request_id = :rid"),
@@ -277,6 +582,8 @@ def get_internal_status(session, request_id):
     ).fetchone()
     return row[0] if row else None
 
+@cached(request_tables=("registration",))
+@replica_read
 def get_request_creation_date(session, request_id: int):
     row = session.execute(
         text("SELECT fecha_creacion FROM registration WHERE request_id = :rid LIMIT 1"),
@@ -284,6 +591,8 @@ def get_request_creation_date(session, request_id: int):
     ).fetchone()
     return row[0] if row else None
 
+@cached(request_tables=("comments",))
+@replica_read
 def get_comments_by_request(session, request_id: int):
     result = session.execute(
         text("""
@@ -344,7 +653,10 @@ def upsert_request_info(
             """),
             params
         )
+    notify_change(session, "registration", request_id)
 
+@cached(request_tables=("registration",))
+@replica_read
 def get_razon_social_by_request(session, request_id: int):
     result = session.execute(
         text("""
@@ -366,6 +678,8 @@ def get_razon_social_by_request(session, request_id: int):
 
     return None
 
+@cached(tables=("requests",))
+@replica_read
 def get_requests_for_progress(session, only_for_email: str | None = None):
     sql = text("""
         SELECT
@@ -389,3 +703,107 @@ def get_requests_for_progress(session, only_for_email: str | None = None):
         }
         for r in rows
     ]
+
+# ==========================
+# 🔹 PROGRESO EN LOTE
+# ==========================
+
+@cached(tables=("status", "profiles", "document_type"), request_tables=PROGRESS_TABLES, request_arg="request_ids")
+@replica_read
+def get_progress_for_requests(session, request_ids: list[int]):
+    """
+    Progreso de varias solicitudes con un número fijo de consultas (una por tabla),
+    en lugar de 6-7 consultas por solicitud.
+    Retorna {request_id: {...}} solo para los IDs que existen.
+    """
+    ids = list({int(i) for i in request_ids})
+    if not ids:
+        return {}
+    params = {"ids": ids}
+
+    status_names = {v: k for k, v in get_all_statuses(session).items()}
+
+    def status_label(status_id):
+        return status_names.get(status_id, "Sin estado") if status_id else "Sin estado"
+
+    progress = {}
+    rows = session.execute(text("""
+        SELECT r.id, r.company_name, r.profile_id, p.name AS profile_name, r.created_at, r.user_email
+        FROM requests r
+        LEFT JOIN profiles p ON p.id = r.profile_id
+        WHERE r.id = ANY(:ids)
+    """), params).mappings().all()
+    for r in rows:
+        progress[r["id"]] = {
+            **dict(r),
+            "razon_social": None,
+            "fecha_creacion": None,
+            "internal_status": "Sin estado",
+            "shipping_lines": [],
+            "ports": [],
+            "customs": [],
+            "comments": None,
+            "notifications": None,
+            "completeness": None,
+        }
+
+    for r in session.execute(text("""
+        SELECT DISTINCT ON (request_id) request_id, razon_social, fecha_creacion
+        FROM registration
+        WHERE request_id = ANY(:ids)
+        ORDER BY request_id, id
+    """), params):
+        progress[r.request_id]["razon_social"] = r.razon_social
+        progress[r.request_id]["fecha_creacion"] = r.fecha_creacion
+
+    for r in session.execute(text("""
+        SELECT DISTINCT ON (request_id) request_id, status_id
+        FROM internal_registration
+        WHERE request_id = ANY(:ids)
+        ORDER BY request_id, id
+    """), params):
+        progress[r.request_id]["internal_status"] = status_label(r.status_id)
+
+    for r in session.execute(text("""
+        SELECT request_id, id, line_name, status_id
+        FROM shipping_line_registration
+        WHERE request_id = ANY(:ids)
+        ORDER BY request_id, id
+    """), params):
+        progress[r.request_id]["shipping_lines"].append(
+            {"id": r.id, "line_name": r.line_name, "status_id": r.status_id, "status": status_label(r.status_id)}
+        )
+
+    for r in session.execute(text("""
+        SELECT request_id, id, port_name, terminal_name, status_id
+        FROM port_registration
+        WHERE request_id = ANY(:ids)
+        ORDER BY request_id, port_name, id
+    """), params):
+        progress[r.request_id]["ports"].append({
+            "id": r.id, "port_name": r.port_name, "terminal_name": r.terminal_name,
+            "status_id": r.status_id, "status": status_label(r.status_id),
+        })
+
+    for r in session.execute(text("""
+        SELECT request_id, id, customs_name, status_id
+        FROM customs_registration
+        WHERE request_id = ANY(:ids)
+        ORDER BY request_id, id
+    """), params):
+        progress[r.request_id]["customs"].append(
+            {"id": r.id, "customs_name": r.customs_name, "status_id": r.status_id, "status": status_label(r.status_id)}
+        )
+
+    for r in session.execute(text("""
+        SELECT request_id, comments, notifications
+        FROM comments
+        WHERE request_id = ANY(:ids)
+    """), params):
+        progress[r.request_id]["comments"] = r.comments
+        progress[r.request_id]["notifications"] = r.notifications
+
+    for r in session.execute(text(_completeness_sql("r.id = ANY(:ids)")), params):
+        progress[r.request_id]["completeness"] = _completeness_row(r)
+
+    return progress
@@ -0,0 +1,183 @@
+# database/crud/drive_sync.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.replica import replica_read
+
+# ID del archivo dentro de un drive_link (misma expresión que el índice en init_db.sql)
+DRIVE_LINK_FILE_ID_SQL = "substring({col} from '/d/([^/?]+)')"
+
+# ==========================
+# 🔹 ESTADO DEL SYNC
+# ==========================
+
+def get_sync_state(session: Session, sync_key: str):
+    return session.execute(
+        text("SELECT page_token, full_sync_at FROM drive_sync_state WHERE sync_key = :k"),
+        {"k": sync_key}
+    ).mappings().one_or_none()
+
+
+def save_sync_token(session: Session, sync_key: str, page_token: str, full_sync: bool = False):
+    session.execute(
+        text("""
+            INSERT INTO drive_sync_state (sync_key, page_token, full_sync_at, updated_at)
+            VALUES (:k, :t, CASE WHEN :full THEN CURRENT_TIMESTAMP END, CURRENT_TIMESTAMP)
+            ON CONFLICT (sync_key) DO UPDATE
+            SET page_token = EXCLUDED.page_token,
+                full_sync_at = COALESCE(EXCLUDED.full_sync_at, drive_sync_state.full_sync_at),
+                updated_at = CURRENT_TIMESTAMP
+        """),
+        {"k": sync_key, "t": page_token, "full": full_sync}
+    )
+
+# ==========================
+# 🔹 METADATA DE ARCHIVOS
+# ==========================
+
+def get_folder_index(session: Session):
+    """{folder_id: (company_folder_id, entity_type)} de todas las carpetas conocidas."""
+    rows = session.execute(
+        text("""
+            SELECT file_id, company_folder_id, entity_type
+            FROM drive_files
+            WHERE mime_type = 'application/vnd.google-apps.folder'
+        """)
+    ).fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+
+def upsert_drive_files(session: Session, files: list[dict]):
+    """
+    Inserta/actualiza metadata de archivos.
+    Cada dict: file_id, name, mime_type, parent_id, company_folder_id, entity_type,
+    web_view_link, modified_time.
+    """
+    if not files:
+        return
+    session.execute(
+        text("""
+            INSERT INTO drive_files (
+                file_id, name, mime_type, parent_id, company_folder_id,
+                entity_type, web_view_link, modified_time, synced_at
+            )
+            VALUES (
+                :file_id, :name, :mime_type, :parent_id, :company_folder_id,
+                :entity_type, :web_view_link, :modified_time, CURRENT_TIMESTAMP
+            )
+            ON CONFLICT (file_id) DO UPDATE
+            SET name = EXCLUDED.name,
+                mime_type = EXCLUDED.mime_type,
+                parent_id = EXCLUDED.parent_id,
+                company_folder_id = EXCLUDED.company_folder_id,
+                entity_type = EXCLUDED.entity_type,
+                web_view_link = EXCLUDED.web_view_link,
+                modified_time = EXCLUDED.modified_time,
+                synced_at = CURRENT_TIMESTAMP
+        """),
+        files
+    )
+
+
+def delete_drive_subtrees(session: Session, file_ids: list[str]):
+    """Borra los archivos indicados y todo lo que cuelgue de ellos (carpetas movidas/eliminadas)."""
+    if not file_ids:
+        return
+    session.execute(
+        text("""
+            WITH RECURSIVE sub AS (
+                SELECT file_id FROM drive_files WHERE file_id = ANY(:ids)
+                UNION
+                SELECT f.file_id FROM drive_files f JOIN sub ON f.parent_id = sub.file_id
+            )
+            DELETE FROM drive_files WHERE file_id IN (SELECT file_id FROM sub)
+        """),
+        {"ids": list(file_ids)}
+    )
+
+
+def clear_drive_files(session: Session, entity_type: str):
+    session.execute(
+        text("DELETE FROM drive_files WHERE entity_type = :et"),
+        {"et": entity_type}
+    )
+
+# ==========================
+# 🔹 INCONSISTENCIAS POR SOLICITUD
+# ==========================
+
+# La carpeta de la empresa de la solicitud, si el sync la conoce (misma regla que find_or_create_folder)
+COMPANY_FOLDER_JOIN_SQL = """
+    JOIN profiles p ON p.id = rq.profile_id
+    JOIN drive_files cf
+      ON cf.file_id = cf.company_folder_id
+     AND cf.name = TRIM(rq.company_name)
+     AND cf.entity_type = CASE WHEN LOWER(p.name) LIKE '%proveedor%' THEN 'proveedor' ELSE 'cliente' END
+"""
+
+# Sin un listado completo terminado, drive_files está vacía o incompleta: no se reporta nada
+FULL_SYNC_DONE_SQL = "EXISTS (SELECT 1 FROM drive_sync_state WHERE full_sync_at IS NOT NULL)"
+
+
+@replica_read
+def get_broken_drive_links(session: Session, request_id: int | None = None):
+    """
+    Documentos registrados cuyo archivo ya no está (borrado o movido fuera) en Drive.
+    Solo cuenta si el sync ya completó un listado y conoce la carpeta de la empresa.
+    """
+    file_id_expr = DRIVE_LINK_FILE_ID_SQL.format(col="r.drive_link")
+    rows = session.execute(
+        text(f"""
+            SELECT r.id, r.request_id, r.doc_type_id, r.file_name, r.drive_link
+            FROM registration r
+            JOIN requests rq ON rq.id = r.request_id
+            {COMPANY_FOLDER_JOIN_SQL}
+            WHERE r.drive_link IS NOT NULL
+              AND {FULL_SYNC_DONE_SQL}
+              AND (CAST(:rid AS INTEGER) IS NULL OR r.request_id = :rid)
+              AND NOT EXISTS (
+                    SELECT 1 FROM drive_files f
+                    WHERE f.file_id = {file_id_expr}
+              )
+            ORDER BY r.request_id, r.id
+        """),
+        {"rid": request_id}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+@replica_read
+def get_unregistered_drive_files(session: Session, request_id: int | None = None):
+    """
+    Archivos que están en la carpeta de la empresa en Drive pero que ninguna
+    fila de `registration` referencia (subidos directamente a Drive).
+    """
+    file_id_expr = DRIVE_LINK_FILE_ID_SQL.format(col="reg.drive_link")
+    rows = session.execute(
+        text(f"""
+            SELECT rq.id AS request_id, f.file_id, f.name, f.web_view_link, f.modified_time
+            FROM requests rq
+            {COMPANY_FOLDER_JOIN_SQL}
+            JOIN drive_files f
+              ON f.company_folder_id = cf.file_id
+             AND f.mime_type <> 'application/vnd.google-apps.folder'
+            WHERE {FULL_SYNC_DONE_SQL}
+              AND (CAST(:rid AS INTEGER) IS NULL OR rq.id = :rid)
+              AND NOT EXISTS (
+                    SELECT 1 FROM registration reg
+                    WHERE {file_id_expr} = f.file_id
+              )
+            ORDER BY rq.id, f.name
+        """),
+        {"rid": request_id}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+@replica_read
+def get_drive_issues_for_request(session: Session, request_id: int):
+    return {
+        "broken_links": get_broken_drive_links(session, request_id),
+        "unregistered_files": get_unregistered_drive_files(session, request_id),
+    }
@@ -0,0 +1,129 @@
+# database/crud/exports.py
+
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.replica import replica_read
+
+# Tabla -> columna de marca de tiempo usada como marca de agua (junto con id)
+EXPORT_TABLES = {
+    "requests": "updated_at",
+    "registration": "updated_at",
+    "comments": "updated_at",
+    "internal_registration": "updated_at",
+    "customs_registration": "updated_at",
+    "port_registration": "updated_at",
+    "shipping_line_registration": "updated_at",
+    "status_events": "changed_at",
+}
+
+# Columnas que no se exportan (derivadas o sin sentido fuera de la base)
+SKIPPED_TYPES = {"tsvector"}
+
+# ==========================
+# 🔹 MARCA DE AGUA
+# ==========================
+
+def get_watermark(session: Session, table: str):
+    """(last_ts, last_id) exportados o None. Bloquea la fila: una sola exportación por tabla a la vez."""
+    row = session.execute(
+        text("SELECT last_ts, last_id FROM export_watermarks WHERE table_name = :t FOR UPDATE"),
+        {"t": table}
+    ).fetchone()
+    return (row.last_ts, row.last_id) if row else None
+
+
+def save_watermark(session: Session, table: str, last_ts: datetime, last_id: int, rows: int):
+    session.execute(
+        text("""
+            INSERT INTO export_watermarks (table_name, last_ts, last_id, rows_exported)
+            VALUES (:t, :ts, :id, :rows)
+            ON CONFLICT (table_name) DO UPDATE
+            SET last_ts = EXCLUDED.last_ts,
+                last_id = EXCLUDED.last_id,
+                rows_exported = export_watermarks.rows_exported + EXCLUDED.rows_exported,
+                updated_at = CURRENT_TIMESTAMP
+        """),
+        {"t": table, "ts": last_ts, "id": last_id, "rows": rows}
+    )
+
+
+def get_watermarks(session: Session):
+    rows = session.execute(
+        text("SELECT table_name, last_ts, last_id, rows_exported, updated_at FROM export_watermarks ORDER BY table_name")
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+# ==========================
+# 🔹 LECTURA INCREMENTAL
+# ==========================
+
+@replica_read
+def get_export_columns(session: Session, table: str):
+    """[(columna, tipo)] de public.<table> en orden, sin los tipos de SKIPPED_TYPES."""
+    rows = session.execute(
+        text("""
+            SELECT column_name, udt_name
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = :t
+            ORDER BY ordinal_position
+        """),
+        {"t": table}
+    ).fetchall()
+    return [(r.column_name, r.udt_name) for r in rows if r.udt_name not in SKIPPED_TYPES]
+
+
+def get_export_horizon(session: Session, lag_seconds: float) -> datetime:
+    """
+    Hasta dónde es seguro exportar. Las marcas de tiempo (updated_at vía CURRENT_TIMESTAMP,
+    changed_at) son la hora de *inicio* de la transacción: una transacción abierta puede
+    confirmar más tarde filas con una marca anterior a la hora actual. Por eso el horizonte
+    es el inicio de la transacción abierta más antigua (o la hora actual si no hay), menos
+    `lag_seconds` de margen.
+    Va al primario (las transacciones abiertas solo se ven ahí) y el usuario de la base
+    necesita pg_read_all_stats para ver xact_start de sesiones de otros roles.
+    No se filtra por backend_xid: una transacción que todavía no escribió puede escribir
+    después con su hora de inicio.
+    """
+    return session.execute(
+        text("""
+            SELECT LEAST(
+                       LOCALTIMESTAMP,
+                       (SELECT CAST(MIN(a.xact_start) AS TIMESTAMP)
+                        FROM pg_stat_activity a
+                        WHERE a.xact_start IS NOT NULL
+                          AND a.backend_type = 'client backend'
+                          AND a.pid <> pg_backend_pid())
+                   ) - make_interval(secs => :lag)
+        """),
+        {"lag": lag_seconds}
+    ).scalar()
+
+
+def fetch_changed_rows(session: Session, table: str, columns: list[str], since_ts: datetime | None,
+                       since_id: int, until_ts: datetime, limit: int):
+    """
+    Filas de `table` con (ts, id) > (since_ts, since_id) y ts < until_ts, en orden de keyset.
+    `until_ts` sale de get_export_horizon: ninguna transacción abierta al calcularlo puede
+    confirmar filas detrás de la marca de agua. Se lee del primario, igual que el horizonte
+    (en una réplica atrasada podrían faltar filas ya confirmadas antes de `until_ts`).
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Tabla no exportable: {table}")
+    ts = EXPORT_TABLES[table]
+    cols = ", ".join(f'"{c}"' for c in columns)
+    # Sin la condición en la primera corrida (un OR con parámetro impediría usar el índice)
+    after = f"({ts}, id) > (:since_ts, :since_id) AND" if since_ts is not None else ""
+    rows = session.execute(
+        text(f"""
+            SELECT {cols}
+            FROM {table}
+            WHERE {after} {ts} < :until_ts
+            ORDER BY {ts}, id
+            LIMIT :limit
+        """),
+        {"since_ts": since_ts, "since_id": since_id, "until_ts": until_ts, "limit": limit}
+    ).mappings().all()
+    return [dict(r) for r in rows]
@@ -0,0 +1,210 @@
+# database/crud/jobs.py
+
+import json
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.replica import replica_read
+
+JOB_STATUSES = ("queued", "running", "done", "dead")
+
+# ==========================
+# 🔹 ENCOLAR
+# ==========================
+
+def enqueue_job(session: Session, job_type: str, payload: dict, request_id: int | None = None,
+                max_attempts: int = 5, created_by: str | None = None) -> int:
+    """Encola un trabajo. Queda visible para los workers cuando se hace commit de la transacción."""
+    return session.execute(
+        text("""
+            INSERT INTO job_queue (job_type, payload, request_id, max_attempts, created_by)
+            VALUES (:job_type, CAST(:payload AS JSONB), :request_id, :max_attempts, :created_by)
+            RETURNING id
+        """),
+        {
+            "job_type": job_type,
+            "payload": json.dumps(payload, default=str),
+            "request_id": request_id,
+            "max_attempts": max_attempts,
+            "created_by": created_by,
+        }
+    ).scalar()
+
+# ==========================
+# 🔹 WORKERS
+# ==========================
+
+def claim_jobs(session: Session, worker_id: str, limit: int = 1, job_types: list[str] | None = None):
+    """
+    Toma hasta `limit` trabajos listos y los marca `running`. SKIP LOCKED: varios workers
+    reclaman en paralelo sin esperarse ni tomar el mismo trabajo.
+    """
+    rows = session.execute(
+        text("""
+            UPDATE job_queue j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_by = :worker,
+                locked_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT id
+                FROM job_queue
+                WHERE status = 'queued'
+                  AND run_after <= CURRENT_TIMESTAMP
+                  AND (CAST(:types AS TEXT[]) IS NULL OR job_type = ANY(CAST(:types AS TEXT[])))
+                ORDER BY run_after, id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            ) c
+            WHERE j.id = c.id
+            RETURNING j.id, j.job_type, j.payload, j.request_id, j.attempts, j.max_attempts, j.created_by, j.locked_by
+        """),
+        {"worker": worker_id, "limit": limit, "types": list(job_types) if job_types else None}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+# Solo quien tiene el trabajo lo actualiza: (locked_by, attempts) identifica el claim.
+# Si requeue_stale_jobs lo devolvió a la cola y otro worker lo tomó, el primero ya no es dueño.
+OWNER_SQL = "status = 'running' AND locked_by = :worker AND attempts = :attempt"
+
+
+def _owner_params(job: dict) -> dict:
+    return {"id": job["id"], "worker": job["locked_by"], "attempt": job["attempts"]}
+
+
+def touch_job(session: Session, job: dict) -> bool:
+    """Heartbeat de un trabajo largo: evita que requeue_stale_jobs lo dé por muerto. False si ya no es nuestro."""
+    result = session.execute(
+        text(f"UPDATE job_queue SET locked_at = CURRENT_TIMESTAMP WHERE id = :id AND {OWNER_SQL}"),
+        _owner_params(job)
+    )
+    return result.rowcount == 1
+
+
+def complete_job(session: Session, job: dict) -> bool:
+    """Marca el trabajo `done`. False si se perdió la propiedad: quien llama debe hacer rollback."""
+    result = session.execute(
+        text(f"""
+            UPDATE job_queue
+            SET status = 'done', last_error = NULL, locked_by = NULL,
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id AND {OWNER_SQL}
+        """),
+        _owner_params(job)
+    )
+    return result.rowcount == 1
+
+
+def fail_job(session: Session, job: dict, error: str, retry_in_seconds: float, permanent: bool = False) -> str | None:
+    """
+    Registra un fallo: vuelve a `queued` con run_after en el futuro, o pasa a `dead`
+    si agotó sus intentos (o el error es permanente). Retorna el nuevo estado, o None
+    si el trabajo ya no es de este worker (no se toca).
+    """
+    return session.execute(
+        text(f"""
+            UPDATE job_queue
+            SET status = CASE WHEN :permanent OR attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                run_after = CURRENT_TIMESTAMP + make_interval(secs => :delay),
+                last_error = :error,
+                locked_by = NULL,
+                finished_at = CASE WHEN :permanent OR attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id AND {OWNER_SQL}
+            RETURNING status
+        """),
+        {**_owner_params(job), "error": error[:4000], "delay": retry_in_seconds, "permanent": permanent}
+    ).scalar()
+
+
+def upload_key_in_use(session: Session, upload_key: str, exclude_job_id: int) -> bool:
+    """¿Otro trabajo pendiente (queued | running) usa el mismo archivo en staging?"""
+    return bool(session.execute(
+        text("""
+            SELECT EXISTS (
+                SELECT 1 FROM job_queue
+                WHERE status IN ('queued', 'running')
+                  AND payload->>'upload_key' = :key
+                  AND id <> :id
+            )
+        """),
+        {"key": upload_key, "id": exclude_job_id}
+    ).scalar())
+
+
+def requeue_stale_jobs(session: Session, older_than_minutes: int) -> int:
+    """Trabajos `running` de un worker que murió (sin terminar en el plazo): vuelven a la cola."""
+    result = session.execute(
+        text("""
+            UPDATE job_queue
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                last_error = COALESCE(last_error, 'El worker no terminó el trabajo (timeout)'),
+                locked_by = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running'
+              AND locked_at < CURRENT_TIMESTAMP - make_interval(mins => :minutes)
+        """),
+        {"minutes": older_than_minutes}
+    )
+    return result.rowcount
+
+
+def retry_dead_job(session: Session, job_id: int):
+    """Saca un trabajo del dead-letter y le da una nueva ronda de intentos."""
+    session.execute(
+        text("""
+            UPDATE job_queue
+            SET status = 'queued', attempts = 0, run_after = CURRENT_TIMESTAMP,
+                finished_at = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id AND status = 'dead'
+        """),
+        {"id": job_id}
+    )
+
+def purge_finished_jobs(session: Session, older_than_days: int) -> int:
+    result = session.execute(
+        text("""
+            DELETE FROM job_queue
+            WHERE status = 'done'
+              AND finished_at < CURRENT_TIMESTAMP - make_interval(days => :days)
+        """),
+        {"days": older_than_days}
+    )
+    return result.rowcount
+
+# ==========================
+# 🔹 CONSULTA (UI)
+# ==========================
+
+def get_jobs_for_request(session: Session, request_id: int, job_type: str | None = None, limit: int = 50):
+    """
+    Trabajos de la solicitud, más recientes primero, con el avance de la subida a Drive
+    (upload_sessions) cuando el trabajo es de documentos. Se lee del primario: el
+    estado cambia cada pocos segundos.
+    """
+    rows = session.execute(
+        text("""
+            SELECT j.id, j.job_type, j.status, j.attempts, j.max_attempts, j.last_error,
+                   j.created_at, j.finished_at, j.payload->>'file_name' AS file_name,
+                   u.bytes_sent, u.total_bytes
+            FROM job_queue j
+            LEFT JOIN upload_sessions u ON u.upload_key = j.payload->>'upload_key'
+            WHERE j.request_id = :rid
+              AND (CAST(:job_type AS TEXT) IS NULL OR j.job_type = :job_type)
+            ORDER BY j.id DESC
+            LIMIT :limit
+        """),
+        {"rid": request_id, "job_type": job_type, "limit": limit}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+@replica_read
+def get_queue_stats(session: Session):
+    rows = session.execute(
+        text("SELECT job_type, status, COUNT(*) FROM job_queue GROUP BY job_type, status ORDER BY 1, 2")
+    ).fetchall()
+    return [{"job_type": r[0], "status": r[1], "count": r[2]} for r in rows]
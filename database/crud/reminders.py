@@ -0,0 +1,138 @@
+# database/crud/reminders.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.crud.documents import all_blocks_approved_sql
+
+# Frecuencias del formulario de solicitud -> intervalo entre recordatorios
+REMINDER_INTERVALS = {
+    "Una vez por semana": "7 days",
+    "Dos veces por semana": "84 hours",
+    "Tres veces por semana": "56 hours",
+}
+DEFAULT_REMINDER_INTERVAL = "7 days"
+
+
+def reminder_interval(reminder_frequency: str | None) -> str | None:
+    if not reminder_frequency:
+        return None
+    return REMINDER_INTERVALS.get(reminder_frequency, DEFAULT_REMINDER_INTERVAL)
+
+
+def _interval_case_sql(col: str = "reminder_frequency") -> str:
+    whens = " ".join(
+        f"WHEN '{freq}' THEN INTERVAL '{interval}'" for freq, interval in REMINDER_INTERVALS.items()
+    )
+    return f"(CASE {col} {whens} ELSE INTERVAL '{DEFAULT_REMINDER_INTERVAL}' END)"
+
+# ==========================
+# 🔹 PROGRAMACIÓN
+# ==========================
+
+def backfill_reminder_schedule(session: Session) -> int:
+    """Programa el primer recordatorio de solicitudes abiertas que nunca lo tuvieron."""
+    result = session.execute(
+        text(f"""
+            UPDATE requests r
+            SET next_reminder_at = CURRENT_TIMESTAMP + {_interval_case_sql("r.reminder_frequency")}
+            WHERE r.next_reminder_at IS NULL
+              AND r.reminders_stopped_at IS NULL
+              AND r.reminder_frequency IS NOT NULL
+              AND NOT {all_blocks_approved_sql("r")}
+        """)
+    )
+    return result.rowcount
+
+
+def claim_due_reminders(session: Session, limit: int = 100, lease_minutes: int = 30):
+    """
+    Toma las solicitudes cuyo recordatorio ya venció y les corre next_reminder_at
+    `lease_minutes` hacia adelante (lease): hacer commit enseguida y enviar fuera de la
+    transacción. Si el worker muere antes de registrar el resultado, el recordatorio
+    vuelve a vencer al terminar el lease.
+    FOR NO KEY UPDATE no choca con el FOR KEY SHARE de las FK de registration, customs,
+    ports y shipping_lines. Usa el índice parcial idx_requests_next_reminder.
+    """
+    rows = session.execute(
+        text(f"""
+            UPDATE requests r
+            SET next_reminder_at = CURRENT_TIMESTAMP + make_interval(mins => :lease)
+            WHERE r.id IN (
+                SELECT d.id
+                FROM requests d
+                WHERE d.next_reminder_at IS NOT NULL
+                  AND d.next_reminder_at <= CURRENT_TIMESTAMP
+                ORDER BY d.next_reminder_at
+                LIMIT :limit
+                FOR NO KEY UPDATE SKIP LOCKED
+            )
+            RETURNING
+                r.id,
+                r.company_name,
+                r.email,
+                r.language,
+                r.reminder_frequency,
+                {all_blocks_approved_sql("r")} AS all_approved
+        """),
+        {"limit": limit, "lease": lease_minutes}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def mark_reminder_sent(session: Session, request_ids: list[int]):
+    if not request_ids:
+        return
+    session.execute(
+        text(f"""
+            UPDATE requests
+            SET last_reminder_at = CURRENT_TIMESTAMP,
+                next_reminder_at = CURRENT_TIMESTAMP + {_interval_case_sql()},
+                reminder_failures = 0
+            WHERE id = ANY(:ids)
+        """),
+        {"ids": list(request_ids)}
+    )
+
+
+def mark_reminder_failed(session: Session, request_ids: list[int], base_minutes: int, cap_minutes: int,
+                         max_failures: int):
+    """
+    Aplaza el recordatorio con backoff exponencial (base * 2^fallas, hasta `cap_minutes`)
+    para que un correo que siempre falla no ocupe la cabeza de la cola. Al llegar a
+    `max_failures` se detienen sus recordatorios.
+    """
+    if not request_ids:
+        return
+    session.execute(
+        text("""
+            UPDATE requests
+            SET reminder_failures = reminder_failures + 1,
+                next_reminder_at = CASE
+                    WHEN reminder_failures + 1 >= :max_failures THEN NULL
+                    ELSE CURRENT_TIMESTAMP + make_interval(
+                        mins => CAST(LEAST(:cap, :base * POWER(2, reminder_failures)) AS INTEGER)
+                    )
+                END,
+                reminders_stopped_at = CASE
+                    WHEN reminder_failures + 1 >= :max_failures THEN CURRENT_TIMESTAMP
+                    ELSE reminders_stopped_at
+                END
+            WHERE id = ANY(:ids)
+        """),
+        {"ids": list(request_ids), "base": base_minutes, "cap": cap_minutes, "max_failures": max_failures}
+    )
+
+
+def stop_reminders(session: Session, request_ids: list[int]):
+    if not request_ids:
+        return
+    session.execute(
+        text("""
+            UPDATE requests
+            SET next_reminder_at = NULL,
+                reminders_stopped_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(:ids)
+        """),
+        {"ids": list(request_ids)}
+    )
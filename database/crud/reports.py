@@ -0,0 +1,218 @@
+# database/crud/reports.py
+
+from datetime import date
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.crud.documents import get_progress_for_requests, APPROVED_STATUS_PATTERN
+from database.replica import replica_read
+
+# ==========================
+# 🔹 FILTROS
+# ==========================
+
+@replica_read
+def get_tradings(session: Session):
+    rows = session.execute(
+        text("SELECT DISTINCT trading FROM requests WHERE trading IS NOT NULL ORDER BY trading")
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+@replica_read
+def find_dossier_request_ids(session: Session, trading: str | None = None, profile_id: int | None = None,
+                             date_from: date | None = None, date_to: date | None = None):
+    """IDs de solicitudes para un paquete de auditoría (trading, perfil y rango de fechas, todos opcionales)."""
+    return session.execute(
+        text("""
+            SELECT r.id
+            FROM requests r
+            WHERE (CAST(:trading AS TEXT) IS NULL OR r.trading = :trading)
+              AND (CAST(:profile_id AS INTEGER) IS NULL OR r.profile_id = :profile_id)
+              AND (CAST(:date_from AS DATE) IS NULL OR r.created_at >= :date_from)
+              AND (CAST(:date_to AS DATE) IS NULL OR r.created_at < CAST(:date_to AS DATE) + 1)
+            ORDER BY r.company_name, r.id
+        """),
+        {"trading": trading, "profile_id": profile_id, "date_from": date_from, "date_to": date_to}
+    ).scalars().all()
+
+# ==========================
+# 🔹 EXPEDIENTES EN LOTE
+# ==========================
+
+@replica_read
+def get_dossiers(session: Session, request_ids: list[int]):
+    """
+    Datos de los expedientes (una página PDF por solicitud) para un lote de IDs:
+    el progreso en lote + datos comerciales + documentos con enlace, con un número fijo de consultas.
+    Retorna una lista en el orden de `request_ids` (solo los que existen).
+    """
+    ids = list(dict.fromkeys(int(i) for i in request_ids))
+    if not ids:
+        return []
+    params = {"ids": ids}
+
+    # Lotes de un solo uso: sin pasar por la caché para no llenarla
+    progress = get_progress_for_requests.uncached(session, ids)
+
+    extra = {
+        r.id: dict(r._mapping)
+        for r in session.execute(text("""
+            SELECT id, trading, commercial, country, email, language
+            FROM requests
+            WHERE id = ANY(:ids)
+        """), params)
+    }
+
+    documents: dict[int, list] = {}
+    for r in session.execute(text("""
+        SELECT g.request_id, dt.category AS doc_type, g.file_name, g.drive_link, g.uploaded_at, g.uploaded_by
+        FROM registration g
+        LEFT JOIN document_type dt ON dt.id = g.doc_type_id
+        WHERE g.request_id = ANY(:ids) AND g.drive_link IS NOT NULL
+        ORDER BY g.request_id, dt.category, g.uploaded_at
+    """), params).mappings():
+        documents.setdefault(r["request_id"], []).append({k: v for k, v in r.items() if k != "request_id"})
+
+    return [
+        {**progress[rid], **extra.get(rid, {}), "documents": documents.get(rid, [])}
+        for rid in ids
+        if rid in progress
+    ]
+
+# ==========================
+# 🔹 ANTIGÜEDAD (AGING)
+# ==========================
+
+# Bloques abiertos: cualquier bloque no aprobado (o sin estado)
+BLOCK_TABLES = {
+    "internal_registration": ("Registro interno", "b.internal_label"),
+    "customs_registration": ("Aduana", "b.customs_name"),
+    "port_registration": ("Puerto", "b.port_name || COALESCE(' / ' || b.terminal_name, '')"),
+    "shipping_line_registration": ("Línea naviera", "b.line_name"),
+}
+
+# (etiqueta, desde_días, hasta_días) — el último tramo no tiene límite
+AGE_BUCKETS = [
+    ("0-7 días", 0, 8),
+    ("8-15 días", 8, 16),
+    ("16-30 días", 16, 31),
+    ("31-60 días", 31, 61),
+    ("61-90 días", 61, 91),
+    ("> 90 días", 91, None),
+]
+
+AGING_GROUPS = {
+    "trading": "trading",
+    "commercial": "commercial",
+    "block_type": "block_type",
+}
+
+
+def _aging_sql() -> str:
+    """
+    Una fila por bloque abierto con los días en su estado actual (desde el último evento
+    de status_events; sin eventos, desde la creación de la solicitud) y los días de la solicitud.
+    Una solicitud sin registro interno cuenta como bloque interno abierto.
+    """
+    blocks = "\n            UNION ALL\n".join(
+        f"""            SELECT '{table}' AS block_table, '{label}' AS block_type, b.id AS record_id,
+                   b.request_id, {entity} AS entity_name,
+                   b.status_id
+            FROM {table} b"""
+        for table, (label, entity) in BLOCK_TABLES.items()
+    )
+    return f"""
+        WITH approved AS (
+            SELECT id FROM status WHERE LOWER(status) LIKE '{APPROVED_STATUS_PATTERN}'
+        ),
+        blocks AS (
+{blocks}
+            UNION ALL
+            SELECT 'internal_registration', 'Registro interno', NULL, r.id, NULL, NULL
+            FROM requests r
+            WHERE NOT EXISTS (SELECT 1 FROM internal_registration ir WHERE ir.request_id = r.id)
+        ),
+        aged AS (
+            SELECT b.block_table, b.block_type, b.record_id, b.request_id, b.entity_name,
+                   COALESCE(s.status, 'Sin estado') AS status,
+                   r.company_name,
+                   COALESCE(r.trading, '—') AS trading,
+                   COALESCE(r.commercial, '—') AS commercial,
+                   r.created_at,
+                   -- Sin eventos y con created_at de relleno: la antigüedad real es mayor o igual
+                   (ev.changed_at IS NULL AND r.created_at_estimated) AS age_estimated,
+                   COALESCE(ev.changed_at, r.created_at) AS state_since,
+                   CAST(FLOOR(EXTRACT(EPOCH FROM LOCALTIMESTAMP - COALESCE(ev.changed_at, r.created_at)) / 86400) AS INTEGER) AS days_in_state,
+                   CAST(FLOOR(EXTRACT(EPOCH FROM LOCALTIMESTAMP - r.created_at) / 86400) AS INTEGER) AS request_days
+            FROM blocks b
+            JOIN requests r ON r.id = b.request_id
+            LEFT JOIN status s ON s.id = b.status_id
+            LEFT JOIN LATERAL (
+                SELECT e.changed_at
+                FROM status_events e
+                WHERE e.table_name = b.block_table AND e.record_id = b.record_id
+                ORDER BY e.changed_at DESC
+                LIMIT 1
+            ) ev ON b.record_id IS NOT NULL
+            WHERE b.status_id IS NULL OR b.status_id NOT IN (SELECT id FROM approved)
+        )
+    """
+
+
+def _bucket_condition(lower: int, upper: int | None) -> str:
+    cond = f"days_in_state >= {int(lower)}"
+    return cond if upper is None else f"{cond} AND days_in_state < {int(upper)}"
+
+
+@replica_read
+def get_aging_summary(session: Session, group_by: list[str] = ("trading", "block_type")):
+    """
+    Bloques abiertos por tramo de antigüedad, agrupados por `group_by`
+    (trading, commercial y/o block_type). Ordenado por el bloque más antiguo.
+    """
+    cols = [AGING_GROUPS[g] for g in group_by if g in AGING_GROUPS]
+    buckets = ",\n                   ".join(
+        f'COUNT(*) FILTER (WHERE {_bucket_condition(lo, hi)}) AS "{label}"' for label, lo, hi in AGE_BUCKETS
+    )
+    select_cols = "".join(f"{c}, " for c in cols)
+    group_clause = f"GROUP BY {', '.join(cols)}" if cols else ""
+    rows = session.execute(text(f"""
+        {_aging_sql()}
+        SELECT {select_cols}
+               COUNT(DISTINCT request_id) AS requests,
+               COUNT(*) AS blocks,
+               {buckets},
+               MAX(days_in_state) AS max_days
+        FROM aged
+        {group_clause}
+        ORDER BY max_days DESC NULLS LAST
+    """)).mappings().all()
+    return [dict(r) for r in rows]
+
+
+@replica_read
+def get_aging_details(session: Session, trading: str | None = None, commercial: str | None = None,
+                      block_type: str | None = None, bucket: str | None = None, limit: int = 500):
+    """Bloques abiertos (drill-down hasta la solicitud), los más antiguos primero."""
+    bucket_filter = ""
+    if bucket:
+        lower, upper = next((lo, hi) for label, lo, hi in AGE_BUCKETS if label == bucket)
+        bucket_filter = f"AND {_bucket_condition(lower, upper)}"
+    rows = session.execute(
+        text(f"""
+            {_aging_sql()}
+            SELECT request_id, company_name, trading, commercial, block_type, entity_name, status,
+                   state_since, days_in_state, created_at, request_days, age_estimated
+            FROM aged
+            WHERE (CAST(:trading AS TEXT) IS NULL OR trading = :trading)
+              AND (CAST(:commercial AS TEXT) IS NULL OR commercial = :commercial)
+              AND (CAST(:block_type AS TEXT) IS NULL OR block_type = :block_type)
+              {bucket_filter}
+            ORDER BY days_in_state DESC, request_id
+            LIMIT :limit
+        """),
+        {"trading": trading, "commercial": commercial, "block_type": block_type, "limit": limit}
+    ).mappings().all()
+    return [dict(r) for r in rows]
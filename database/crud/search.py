@@ -0,0 +1,65 @@
+# database/crud/search.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from database.replica import replica_read
+
+PAGE_SIZE = 20
+
+# Texto libre → tsquery con prefijos ("acme carta" → 'acme':* & 'carta':*), para que la
+# búsqueda funcione mientras se escribe. Los lexemas salen del mismo parser `simple` que
+# arma el índice: un correo queda como un solo lexema, igual que en request_search.
+TSQUERY_SQL = """to_tsquery('simple', (
+    SELECT string_agg(quote_literal(t.lexeme) || ':*', ' & ')
+    FROM unnest(to_tsvector('simple', search_text(:query))) AS t
+))"""
+
+
+@replica_read
+def search_requests(session: Session, query: str, only_for_email: str | None = None,
+                    page: int = 1, page_size: int = PAGE_SIZE):
+    """
+    Busca en el índice request_search (nombre, razón social, correos, commodity, aduanas,
+    puertos, navieras y comentarios). Retorna (resultados de la página, total), ordenados por relevancia.
+    """
+    if not (query or "").strip():
+        return [], 0
+
+    rows = session.execute(
+        text(f"""
+            WITH q AS (
+                SELECT {TSQUERY_SQL} AS query
+            ),
+            hits AS (
+                SELECT s.request_id, s.content, ts_rank_cd(s.document, q.query) AS rank,
+                       COUNT(*) OVER () AS total
+                FROM request_search s
+                CROSS JOIN q
+                JOIN requests r ON r.id = s.request_id
+                WHERE q.query IS NOT NULL
+                  AND s.document @@ q.query
+                  AND (CAST(:email AS TEXT) IS NULL OR LOWER(r.user_email) = LOWER(:email))
+                ORDER BY rank DESC, s.request_id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT h.request_id, r.company_name, r.profile_id, p.name AS profile_name, r.trading,
+                   r.created_at, h.rank, h.total,
+                   ts_headline('simple', h.content, q.query,
+                               'MaxWords=20, MinWords=8, MaxFragments=2, StartSel=**, StopSel=**') AS snippet
+            FROM hits h
+            CROSS JOIN q
+            JOIN requests r ON r.id = h.request_id
+            LEFT JOIN profiles p ON p.id = r.profile_id
+            ORDER BY h.rank DESC, h.request_id DESC
+        """),
+        {
+            "query": query,
+            "email": only_for_email,
+            "limit": page_size,
+            "offset": max(page - 1, 0) * page_size,
+        }
+    ).mappings().all()
+
+    total = rows[0]["total"] if rows else 0
+    return [{k: v for k, v in r.items() if k != "total"} for r in rows], total
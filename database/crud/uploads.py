@@ -0,0 +1,95 @@
+# database/crud/uploads.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+# ==========================
+# 🔹 SESIONES DE SUBIDA
+# ==========================
+
+def get_or_create_upload_session(session: Session, upload_key: str, folder_id: str, file_name: str,
+                                 staged_path: str, total_bytes: int):
+    """Devuelve la sesión de subida de `upload_key` (creándola si no existe)."""
+    row = session.execute(
+        text("""
+            INSERT INTO upload_sessions (upload_key, folder_id, file_name, staged_path, total_bytes)
+            VALUES (:key, :folder_id, :file_name, :staged_path, :total_bytes)
+            ON CONFLICT (upload_key) DO UPDATE
+            SET staged_path = EXCLUDED.staged_path,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING id, status, resumable_uri, bytes_sent, total_bytes, drive_link
+        """),
+        {
+            "key": upload_key,
+            "folder_id": folder_id,
+            "file_name": file_name,
+            "staged_path": staged_path,
+            "total_bytes": total_bytes,
+        }
+    ).mappings().one()
+    return dict(row)
+
+
+def save_upload_progress(session: Session, upload_id: int, resumable_uri: str | None, bytes_sent: int):
+    session.execute(
+        text("""
+            UPDATE upload_sessions
+            SET resumable_uri = :uri,
+                bytes_sent = :sent,
+                status = 'uploading',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id
+        """),
+        {"id": upload_id, "uri": resumable_uri, "sent": bytes_sent}
+    )
+
+
+def finish_upload_session(session: Session, upload_id: int, drive_link: str):
+    session.execute(
+        text("""
+            UPDATE upload_sessions
+            SET status = 'done',
+                bytes_sent = total_bytes,
+                drive_link = :link,
+                resumable_uri = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id
+        """),
+        {"id": upload_id, "link": drive_link}
+    )
+
+
+def get_stale_upload_sessions(session: Session, older_than_hours: int):
+    """Subidas sin avance reciente (para limpiar archivos en staging)."""
+    rows = session.execute(
+        text("""
+            SELECT id, upload_key, staged_path, status
+            FROM upload_sessions
+            WHERE updated_at < CURRENT_TIMESTAMP - make_interval(hours => :hours)
+            ORDER BY id
+        """),
+        {"hours": older_than_hours}
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def delete_upload_sessions(session: Session, upload_ids: list[int]):
+    if not upload_ids:
+        return
+    session.execute(
+        text("DELETE FROM upload_sessions WHERE id = ANY(:ids)"),
+        {"ids": list(upload_ids)}
+    )
+
+
+def get_upload_session(session: Session, upload_key: str):
+    """Sesión de subida de `upload_key` o None (sin crearla)."""
+    row = session.execute(
+        text("""
+            SELECT id, status, resumable_uri, bytes_sent, total_bytes, drive_link
+            FROM upload_sessions
+            WHERE upload_key = :key
+        """),
+        {"key": upload_key}
+    ).mappings().first()
+    return dict(row) if row else None
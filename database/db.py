@@ -1,8 +1,10 @@
 # database/db.py
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from services import cache, sql_profiler
+from database.replica import get_replica_url, mark_recent_write, primary_required
 
 try:
     import streamlit as st
@@ -15,6 +17,56 @@ except Exception:
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL no está definida. Revisa tus secretos o tu archivo .env")
 
-engine = create_engine(DATABASE_URL)
+READ_REPLICA_URL = get_replica_url()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+
+def _make_engine(url: str):
+    eng = create_engine(
+        url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_pre_ping=True,
+    )
+    sql_profiler.install(eng)
+    return eng
+
+
+engine = _make_engine(DATABASE_URL)
+read_engine = _make_engine(READ_REPLICA_URL) if READ_REPLICA_URL else None
+
+
+class RoutingSession(Session):
+    """
+    Envía a la réplica las sentencias ejecutadas dentro de funciones @replica_read,
+    salvo que esta transacción ya haya tocado el primario o el usuario acabe de guardar.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            read_engine is not None
+            and self.info.get("replica_read")
+            and not self.info.get("primary_pinned")
+            and not primary_required()
+        ):
+            return read_engine
+        self.info["primary_pinned"] = True
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session):
+    if session.info.pop("primary_pinned", False) and read_engine is not None:
+        mark_recent_write()
+    # El resto de procesos se entera por NOTIFY; este invalida sin esperar al listener
+    pending = session.info.pop("cache_invalidations", None)
+    if pending:
+        cache.invalidate_many(pending)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("primary_pinned", None)
+    session.info.pop("cache_invalidations", None)
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
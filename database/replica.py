@@ -0,0 +1,65 @@
+# database/replica.py
+#
+# Ruteo de lecturas a la réplica (READ_REPLICA_URL, opcional).
+# Las funciones CRUD de solo lectura se marcan con @replica_read; todo lo demás va al primario.
+# Tras una escritura, la sesión de Streamlit lee del primario durante
+# READ_YOUR_WRITES_SECONDS para no mostrar datos atrasados por el lag de replicación.
+
+import functools
+import os
+import threading
+import time
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "30"))
+
+_STATE_KEY = "_db_primary_until"
+_local = threading.local()
+
+
+def get_replica_url() -> str | None:
+    try:
+        import streamlit as st
+        return st.secrets["READ_REPLICA_URL"]
+    except Exception:
+        return os.getenv("READ_REPLICA_URL") or None
+
+
+def _session_state():
+    """st.session_state si estamos dentro de un rerun de Streamlit; si no, None."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is None:
+            return None
+        import streamlit as st
+        return st.session_state
+    except Exception:
+        return None
+
+
+def mark_recent_write():
+    """Fija el primario para las lecturas de este usuario durante la ventana de read-your-writes."""
+    until = time.monotonic() + READ_YOUR_WRITES_SECONDS
+    state = _session_state()
+    if state is not None:
+        state[_STATE_KEY] = until
+    else:
+        _local.primary_until = until
+
+
+def primary_required() -> bool:
+    state = _session_state()
+    until = state.get(_STATE_KEY) if state is not None else getattr(_local, "primary_until", None)
+    return bool(until and time.monotonic() < until)
+
+
+def replica_read(fn):
+    """Marca una función CRUD `fn(session, ...)` como de solo lectura (elegible para la réplica)."""
+    @functools.wraps(fn)
+    def wrapper(session, *args, **kwargs):
+        info = session.info
+        info["replica_read"] = info.get("replica_read", 0) + 1
+        try:
+            return fn(session, *args, **kwargs)
+        finally:
+            info["replica_read"] -= 1
+    return wrapper
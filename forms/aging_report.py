@@ -0,0 +1,91 @@
+import streamlit as st
+import pandas as pd
+from database.db import SessionLocal
+from database.crud.reports import get_aging_summary, get_aging_details, AGE_BUCKETS
+
+GROUP_LABELS = {
+    "trading": "Trading",
+    "commercial": "Comercial",
+    "block_type": "Bloque",
+}
+
+# ==========================
+#   ANTIGÜEDAD DE PENDIENTES
+# ==========================
+
+def show_aging_report():
+    st.title("⏳ Antigüedad de pendientes")
+    st.caption("Bloques abiertos (no aprobados) por tiempo en su estado actual.")
+
+    group_by = st.multiselect(
+        "Agrupar por",
+        list(GROUP_LABELS),
+        default=["trading", "block_type"],
+        format_func=GROUP_LABELS.get,
+        key="aging_group_by",
+    )
+
+    session = SessionLocal()
+    try:
+        summary = get_aging_summary(session, group_by)
+        if not summary:
+            st.success("No hay bloques abiertos.")
+            return
+
+        frame = pd.DataFrame(summary).rename(columns={
+            **GROUP_LABELS,
+            "requests": "Solicitudes",
+            "blocks": "Bloques",
+            "max_days": "Máx. días",
+        })
+        st.dataframe(frame, hide_index=True, use_container_width=True)
+
+        # ---- Drill-down hasta la solicitud ----
+        st.markdown("---")
+        st.subheader("🔍 Detalle")
+        filters = {}
+        cols = st.columns(len(group_by) + 1)
+        for col, key in zip(cols, group_by):
+            with col:
+                values = sorted({r[key] for r in summary})
+                filters[key] = st.selectbox(GROUP_LABELS[key], values, index=None, placeholder="Todos",
+                                            key=f"aging_filter_{key}")
+        with cols[-1]:
+            bucket = st.selectbox("Antigüedad", [label for label, _, _ in AGE_BUCKETS], index=None,
+                                  placeholder="Todas", key="aging_filter_bucket")
+
+        details = get_aging_details(session, bucket=bucket, **filters)
+    finally:
+        session.close()
+
+    if not details:
+        st.info("No hay bloques abiertos con estos filtros.")
+        return
+
+    st.dataframe(
+        pd.DataFrame(details),
+        hide_index=True,
+        use_container_width=True,
+        column_order=[
+            "request_id", "company_name", "trading", "commercial", "block_type", "entity_name",
+            "status", "days_in_state", "state_since", "request_days", "age_estimated",
+        ],
+        column_config={
+            "request_id": st.column_config.NumberColumn("ID", format="%d"),
+            "company_name": "Compañía",
+            "trading": "Trading",
+            "commercial": "Comercial",
+            "block_type": "Bloque",
+            "entity_name": "Detalle",
+            "status": "Estado",
+            "days_in_state": st.column_config.NumberColumn("Días en el estado"),
+            "state_since": st.column_config.DatetimeColumn("Desde", format="YYYY-MM-DD"),
+            "request_days": st.column_config.NumberColumn("Días de la solicitud"),
+            "age_estimated": st.column_config.CheckboxColumn("Fecha estimada"),
+        },
+    )
+    if any(d["age_estimated"] for d in details):
+        st.caption("Fecha estimada: solicitud antigua sin fecha de creación registrada; "
+                   "se toma la fecha más antigua conocida, así que lleva al menos ese tiempo abierta.")
+    if len(details) >= 500:
+        st.caption("Se muestran los 500 bloques más antiguos.")
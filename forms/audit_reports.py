@@ -0,0 +1,71 @@
+import io
+from datetime import date
+
+import streamlit as st
+from database.db import SessionLocal
+from database.crud.documents import get_profiles_list, get_profile_id_by_name
+from database.crud.reports import get_tradings, find_dossier_request_ids
+from services.dossiers import build_dossier_pack
+
+# ==========================
+#   EXPEDIENTES PARA AUDITORÍA
+# ==========================
+
+def show_audit_reports():
+    st.title("📑 Expedientes para auditoría")
+    st.caption("Una página por socio comercial: razón social, fechas, estados por bloque, documentos y comentarios.")
+
+    session = SessionLocal()
+    try:
+        tradings = get_tradings(session)
+        profile_names = get_profiles_list(session) or []
+
+        col1, col2 = st.columns(2)
+        with col1:
+            trading = st.selectbox("Trading", tradings, index=None, placeholder="Todos")
+        with col2:
+            profile_name = st.selectbox("Perfil", profile_names, index=None, placeholder="Todos")
+
+        col3, col4 = st.columns(2)
+        with col3:
+            date_range = st.date_input("Fecha de la solicitud", value=(), max_value=date.today())
+        with col4:
+            fmt_label = st.radio("Formato", ["ZIP (un PDF por solicitud)", "PDF único"], horizontal=True)
+
+        profile_id = get_profile_id_by_name(session, profile_name) if profile_name else None
+        date_from = date_range[0] if len(date_range) > 0 else None
+        date_to = date_range[1] if len(date_range) > 1 else date_from
+
+        total = len(find_dossier_request_ids(session, trading, profile_id, date_from, date_to))
+    finally:
+        session.close()
+
+    st.write(f"**{total}** solicitud(es) con estos filtros.")
+    fmt = "zip" if fmt_label.startswith("ZIP") else "pdf"
+
+    if st.button("Generar expedientes", type="primary", disabled=total == 0):
+        bar = st.progress(0.0, text="Generando expedientes...")
+
+        def on_progress(done, count):
+            bar.progress(done / count if count else 1.0, text=f"Generando expedientes... {done} de {count}")
+
+        out = io.BytesIO()
+        with st.spinner("Renderizando..."):
+            count = build_dossier_pack(
+                out, fmt,
+                trading=trading, profile_id=profile_id, date_from=date_from, date_to=date_to,
+                on_progress=on_progress,
+            )
+        bar.empty()
+        suffix = "_".join(str(x) for x in (trading, profile_name, date_from, date_to) if x) or "todos"
+        st.session_state["audit_pack"] = {
+            "data": out.getvalue(),
+            "file_name": f"expedientes_{suffix}.{fmt}".replace(" ", "_"),
+            "mime": "application/zip" if fmt == "zip" else "application/pdf",
+            "count": count,
+        }
+
+    pack = st.session_state.get("audit_pack")
+    if pack:
+        st.success(f"{pack['count']} expediente(s) listos.")
+        st.download_button("⬇️ Descargar", pack["data"], file_name=pack["file_name"], mime=pack["mime"])
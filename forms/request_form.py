@@ -5,9 +5,11 @@ from database.crud.clientes import (
     insert_customs_registration,
     insert_port_registration,
     insert_shipping_line_registration,
-    get_profile_id
+    get_profile_id,
+    find_similar_companies
 )
 from services.sheets_writer import save_request
+from services.authentication import current_user
 
 # EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 TERMINALES = {
@@ -129,12 +131,40 @@ def forms():
         tipo_proveedor = st.selectbox("Tipo de Proveedor", ["Logístico", "No Logístico"], key="tipo_proveedor")
 
 
+    # -------- Posibles duplicados --------
+    similar_companies = find_similar_companies(company_name) if company_name else []
+    confirmed_new_company = True
+    if similar_companies:
+        st.warning("⚠️ Ya existen compañías con un nombre parecido. Revisa antes de crear una nueva solicitud:")
+        for i, c in enumerate(similar_companies):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(
+                    f"- **{c['company_name']}** · {c['profiles'] or '—'} · "
+                    f"{c['requests']} solicitud(es), última ID {c['last_request_id']} · "
+                    f"similitud {c['score']:.0%}"
+                )
+            with col2:
+                if c["company_name"] != company_name:
+                    st.button(
+                        "Usar este nombre",
+                        key=f"usar_nombre_{i}",
+                        on_click=lambda name=c["company_name"]: st.session_state.update(nombre_compania=name)
+                    )
+        confirmed_new_company = st.checkbox(
+            "Confirmo que la solicitud es para esta compañía (no es un duplicado accidental)",
+            key="confirmar_compania_similar"
+        )
+
     # -------- Botón de guardado (sin st.form) --------
     if st.button("Guardar", key="guardar_general"):
         # Validaciones mínimas
         if not company_name:
             st.error("❌ Debes ingresar el nombre de la compañía.")
             return
+        if not confirmed_new_company:
+            st.error("❌ Hay compañías con nombre parecido: usa el nombre existente o confirma que deseas continuar.")
+            return
         # if email and not EMAIL_RE.match(email):
         #     st.error("❌ El correo electrónico no parece válido.")
         #     return
@@ -158,7 +188,7 @@ def forms():
             has_shipping_line=linea_naviera,
             requested_by=requested_by,
             requested_by_type=requested_by_type,
-            user_email= st.user.email
+            user_email= current_user().email
         )
 
         if aduana and tipo_aduana:
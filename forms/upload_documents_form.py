@@ -1,6 +1,5 @@
 # form_documents_existing.py
 
-import os
 import unicodedata
 import streamlit as st
 from datetime import datetime, timezone
@@ -9,9 +8,12 @@ from typing import Optional
 from sqlalchemy import text
 from database.db import SessionLocal
 from database.crud.documents import *
+from database.crud.drive_sync import get_drive_issues_for_request
+from database.crud.jobs import enqueue_job, get_jobs_for_request, retry_dead_job
 
-# Google Drive utils
-from services.google_drive_utils import init_drive, find_or_create_folder, upload_to_drive
+# Subidas en segundo plano (workers.queue_worker)
+from services.upload_sessions import stage_file
+from services.authentication import current_user
 
 CO_TZ = ZoneInfo("America/Bogota")
 
@@ -99,68 +101,309 @@ def render_status_controls(session, request_id):
 
     return status_map
 
-def forms():
-    st.subheader("📎 Carga de documentos")
+JOB_STATUS_LABELS = {
+    "queued": "⏳ En cola",
+    "running": "🔄 Subiendo",
+    "done": "✅ Listo",
+    "dead": "❌ Falló",
+}
+
 
+@st.fragment(run_every=3)
+def render_upload_jobs(request_id: int):
+    """Estado por archivo de las subidas en cola (se refresca solo, sin re-ejecutar el formulario)."""
     session = SessionLocal()
+    try:
+        jobs = get_jobs_for_request(session, request_id, job_type="upload_document", limit=20)
+        if not jobs:
+            return
+
+        st.markdown("#### 📤 Subidas de documentos")
+        for job in jobs:
+            col1, col2 = st.columns([4, 2])
+            with col1:
+                label = JOB_STATUS_LABELS.get(job["status"], job["status"])
+                st.markdown(f"**{job['file_name']}** · {label}")
+                if job["status"] == "running" and job["total_bytes"]:
+                    st.progress(min(job["bytes_sent"] / job["total_bytes"], 1.0))
+                elif job["status"] == "queued" and job["attempts"]:
+                    st.caption(f"Reintento {job['attempts']} de {job['max_attempts']}: {job['last_error'] or ''}")
+                elif job["status"] == "dead":
+                    st.caption(f"Tras {job['attempts']} intento(s): {job['last_error'] or ''}")
+            with col2:
+                if job["status"] == "dead" and st.button("Reintentar", key=f"retry_job_{job['id']}"):
+                    retry_dead_job(session, job["id"])
+                    session.commit()
+                    st.rerun(scope="fragment")
+    finally:
+        session.close()
+
+# ==========================
+# 🧩 FRAGMENTOS DEL FORMULARIO
+# ==========================
+# Cada bloque se re-ejecuta solo al interactuar con sus propios widgets. Reciben
+# datos ya cargados (no la sesión: un fragmento puede re-ejecutarse con ella cerrada).
+
+INTERNAL_DOCS = {
+    "Documentos de la empresa": "empresa",
+    "Documentos de vinculación": "vinculacion",
+    "Verificación de seguridad": "seguridad",
+}
 
+
+def _is_internal_doc(doc_name: str) -> bool:
+    return any(keyword in doc_name.lower() for keyword in ["empresa", "vinculación", "vinculacion", "seguridad"])
+
+
+def _render_uploaded(docs: list):
+    if docs:
+        for d in docs:
+            fecha = (
+                _to_colombia_tz(d["uploaded_at"]).strftime("%Y-%m-%d %H:%M")
+                if d.get("uploaded_at") else "sin fecha"
+            )
+            st.markdown(f"- [{d['file_name']}]({d['drive_link']}) • _{d['uploaded_by']}, {fecha}_")
+    else:
+        st.caption("No cargado aún")
+
+
+def _status_index(status_labels: list, status_map: dict, status_id) -> int:
+    for i, label in enumerate(status_labels):
+        if status_map[label] == status_id:
+            return i
+    return 0
+
+
+@st.fragment
+def render_request_picker():
+    """
+    Compañía / perfil / solicitud. Elegir compañía o perfil solo re-ejecuta este bloque;
+    cuando la solicitud elegida cambia, se re-ejecuta la página para cargarla.
+    """
+    session = SessionLocal()
     try:
-        # ====================================
-        # 🔹 SELECCIÓN DE COMPAÑÍA Y PERFIL
-        # ====================================
-        companies = get_all_company_names(session)
-        profiles = get_profiles_list(session)
+        selection = _pick_request(session)
+    finally:
+        session.close()
+
+    if st.session_state.get("upload_selection") != selection:
+        st.session_state["upload_selection"] = selection
+        st.rerun()
+
+
+def _pick_request(session) -> dict | None:
+    # ====================================
+    # 🔹 SELECCIÓN DE COMPAÑÍA Y PERFIL
+    # ====================================
+    companies = get_all_company_names(session)
+    profiles = get_profiles_list(session)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        company_name = st.selectbox(
+            "Nombre de la compañía",
+            companies,
+            index=None if companies else None,
+            placeholder="Selecciona la compañía..."
+        )
+    with col2:
+        profile_name = st.selectbox(
+            "Perfil",
+            profiles,
+            index=None if profiles else None,
+            placeholder="Selecciona el perfil..."
+        )
 
-        col1, col2 = st.columns(2)
+    if not company_name or not profile_name:
+        st.info("Selecciona una compañía y un perfil para continuar.")
+        return None
+
+    profile_id = get_profile_id_by_name(session, profile_name)
+    if not profile_id:
+        st.error("❌ El perfil seleccionado no existe.")
+        return None
+
+    # ====================================
+    # 🔹 SELECCIÓN DE SOLICITUD
+    # ====================================
+    requests = get_requests_by_company_and_profile(session, company_name, profile_id)
+    if not requests:
+        st.warning("No hay solicitudes para esta compañía y perfil.")
+        return None
+
+    options = [f"ID {r['id']}" for r in requests]
+    idx = 0
+    if len(options) > 1:
+        idx = st.selectbox(
+            "Selecciona la solicitud",
+            list(range(len(options))),
+            format_func=lambda i: options[i],
+            index=None,
+            placeholder="Selecciona una solicitud..."
+        )
+        if idx is None:
+            st.info("Selecciona una solicitud para continuar.")
+            return None
+
+    selected_request = requests[idx if len(options) > 1 else 0]
+    return {
+        "request_id": selected_request["id"],
+        "company_name": company_name,
+        "profile_name": profile_name,
+        "profile_id": profile_id,
+    }
+
+
+@st.fragment
+def render_internal_block(request_id: int, profile_id: int, status_labels: list, status_map: dict,
+                          current_internal_status, uploaded_map: dict):
+    # ====================================
+    # 🗂️ BLOQUE REGISTRO INTERNO
+    # ====================================
+    st.markdown("### Registro interno")
+
+    doc_type_lookup = INTERNAL_DOC_TYPES[1] if profile_id == 1 else INTERNAL_DOC_TYPES[2]
+    for label, key_suffix in INTERNAL_DOCS.items():
+        col1, col2 = st.columns([3, 3])
         with col1:
-            company_name = st.selectbox(
-                "Nombre de la compañía",
-                companies,
-                index=None if companies else None,
-                placeholder="Selecciona la compañía..."
-            )
+            st.markdown(f"**{label}**")
         with col2:
-            profile_name = st.selectbox(
-                "Perfil",
-                profiles,
-                index=None if profiles else None,
-                placeholder="Selecciona el perfil..."
+            # Mostrar archivos existentes (si ya fueron cargados)
+            _render_uploaded(uploaded_map.get(doc_type_lookup[key_suffix], []))
+
+            st.file_uploader(
+                label="Subir archivo",
+                type=["pdf"],
+                key=f"uploader_internal_{key_suffix}_{request_id}",
+                accept_multiple_files=True
             )
 
-        if not company_name or not profile_name:
-            st.info("Selecciona una compañía y un perfil para continuar.")
-            return
+    st.markdown("")
+    st.markdown("**Estatus general del registro interno:**")
+    st.selectbox(
+        "Estado del Registro Interno",
+        status_labels,
+        index=_status_index(status_labels, status_map, current_internal_status) if current_internal_status else 0,
+        key=f"status_internal_{request_id}"
+    )
 
-        profile_id = get_profile_id_by_name(session, profile_name)
-        if not profile_id:
-            st.error("❌ El perfil seleccionado no existe.")
-            return
+    st.markdown("---")
 
-        # ====================================
-        # 🔹 SELECCIÓN DE SOLICITUD
-        # ====================================
-        requests = get_requests_by_company_and_profile(session, company_name, profile_id)
-        if not requests:
-            st.warning("No hay solicitudes para esta compañía y perfil.")
-            return
 
-        options = [f"ID {r['id']}" for r in requests]
-        idx = 0
-        if len(options) > 1:
-            idx = st.selectbox(
-                "Selecciona la solicitud",
-                list(range(len(options))),
-                format_func=lambda i: options[i],
-                index=None,
-                placeholder="Selecciona una solicitud..."
-            )
-            if idx is None:
-                st.info("Selecciona una solicitud para continuar.")
-                return
+@st.fragment
+def render_doc_type_block(request_id: int, doc: dict, already: list, customs, ports, lines,
+                          status_labels: list, status_map: dict):
+    # ====================================
+    # ⚓ BLOQUE ADUANAS / PUERTOS / NAVIERAS
+    # ====================================
+    doc_id = doc["id"]
+    doc_name = doc["name"]
+
+    st.markdown(f"#### {doc_name}")
+
+    # ---- uploader único ----
+    st.file_uploader(
+        label="Subir documento",
+        type=["pdf"],
+        key=f"uploader_{request_id}_{doc_id}",
+        accept_multiple_files=True
+    )
 
-        selected_request = requests[idx if len(options) > 1 else 0]
-        request_id = selected_request["id"]
+    # Mostrar archivos existentes
+    _render_uploaded(already)
+
+    # ---- Estados asociados según tipo ----
+    with st.expander("Estados asociados", expanded=True):
+        if "aduanero" in doc_name.lower() and customs:
+            for c in customs:
+                col1, col2 = st.columns([3, 2])
+                with col1:
+                    st.write(f"**{c.customs_name}**")
+                with col2:
+                    st.selectbox(
+                        "Estado",
+                        status_labels,
+                        index=_status_index(status_labels, status_map, c.status_id) if c.status_id else 0,
+                        key=f"status_customs_{c.customs_name}"
+                    )
+
+        # 🔹 Puertos y terminales
+        elif "puerto" in doc_name.lower() and ports:
+            grouped_ports = {}
+            for p in ports:
+                grouped_ports.setdefault(p.port_name, []).append(p)
+            for port, terminals in grouped_ports.items():
+                for term in terminals:
+                    name = f"{port} / {term.terminal_name or '(sin terminal)'}"
+                    col1, col2 = st.columns([3, 2])
+                    with col1:
+                        st.write(f"**{name}**")
+                    with col2:
+                        st.selectbox(
+                            "Estado",
+                            status_labels,
+                            index=(term.status_id - 1) if term.status_id else 0,
+                            key=f"status_port_{term.id}"
+                        )
+
+        # 🔹 Líneas navieras
+        elif "naviera" in doc_name.lower() and lines:
+            for line in lines:
+                col1, col2 = st.columns([3, 2])
+                with col1:
+                    st.write(f"**{line.line_name}**")
+                with col2:
+                    st.selectbox(
+                        "Estado",
+                        status_labels,
+                        index=(line.status_id - 1) if line.status_id else 0,
+                        key=f"status_line_{line.id}"
+                    )
+
+        else:
+            st.caption("Sin estados asociados a este tipo de documento.")
+
+    st.markdown("---")
+
+
+@st.fragment
+def render_comments_block(request_id: int, meta: dict):
+    # ====================================
+    # 🧭 SEGUIMIENTO Y COMENTARIOS
+    # ====================================
+    st.subheader("Seguimiento y comentarios")
+
+    st.text_area(
+        "Seguimiento de notificación",
+        value=(meta.get("notification_followup") or "").strip(),
+        height=150,
+        key=f"seguimiento_{request_id}"
+    )
+
+    st.text_area(
+        "Comentarios generales",
+        value=(meta.get("general_comments") or "").strip(),
+        height=150,
+        key=f"comentarios_{request_id}"
+    )
+
+
+def forms():
+    st.subheader("📎 Carga de documentos")
 
+    render_request_picker()
+    selection = st.session_state.get("upload_selection")
+    if not selection:
+        return
+
+    request_id = selection["request_id"]
+    company_name = selection["company_name"]
+    profile_name = selection["profile_name"]
+    profile_id = selection["profile_id"]
+
+    session = SessionLocal()
+
+    try:
         # ====================================
         # 🔹 DATOS BASE
         # ====================================
@@ -186,235 +429,81 @@ def forms():
                 key=fecha_key
             )
 
-        status_map = get_all_statuses(session)
-        status_labels = list(status_map.keys())
-        uploaded_buffers = {}
-
         # ====================================
-        # 🗂️ BLOQUE REGISTRO INTERNO
+        # 📊 COMPLETITUD DOCUMENTAL
         # ====================================
-        st.markdown("### Registro interno")
-
-        internal_docs = {
-            "Documentos de la empresa": "empresa",
-            "Documentos de vinculación": "vinculacion",
-            "Verificación de seguridad": "seguridad"
-        }
-
-        for label, key_suffix in internal_docs.items():
-            col1, col2 = st.columns([3, 3])
-            with col1:
-                st.markdown(f"**{label}**")
-            with col2:
-                # Mostrar archivos existentes (si ya fueron cargados)
-                doc_type_lookup = {
-                    "empresa": 6 if profile_id == 1 else 9,
-                    "vinculacion": 7 if profile_id == 1 else 10,
-                    "seguridad": 8 if profile_id == 1 else 11
-                }
-
-                doc_type_id = doc_type_lookup[key_suffix]
-                already_internal = get_uploaded_documents_map(session, request_id).get(doc_type_id, [])
-
-                if already_internal:
-                    for d in already_internal:
-                        fecha = (
-                            _to_colombia_tz(d["uploaded_at"]).strftime("%Y-%m-%d %H:%M")
-                            if d.get("uploaded_at") else "sin fecha"
-                        )
-                        st.markdown(f"- [{d['file_name']}]({d['drive_link']}) • _{d['uploaded_by']}, {fecha}_")
-                else:
-                    st.caption("No cargado aún")
-
-                uploaded_buffers[f"internal_{key_suffix}"] = st.file_uploader(
-                    label="Subir archivo",
-                    type=["pdf"],
-                    key=f"uploader_internal_{key_suffix}_{request_id}",
-                    accept_multiple_files=True
-                )
-
-        st.markdown("")
-        st.markdown("**Estatus general del registro interno:**")
-        current_internal_status = get_internal_status(session, request_id)
-        default_index = 0
-        if current_internal_status:
-            # Busca el índice del estado actual dentro de la lista
-            for i, label in enumerate(status_labels):
-                if status_map[label] == current_internal_status:
-                    default_index = i
-                    break
-        
-        internal_status_label = st.selectbox(
-            "Estado del Registro Interno",
-            status_labels,
-            index=default_index,
-            key=f"status_internal_{request_id}"
-        )
-
-
-        st.markdown("---")
+        completeness = get_document_completeness(session, [request_id]).get(request_id)
+        if completeness:
+            st.progress(
+                completeness["percent"] / 100,
+                text=f"📎 Documentos cargados: {completeness['uploaded']} de {completeness['required']} "
+                     f"({completeness['percent']}%)"
+            )
+            if completeness["missing"]:
+                st.caption("Faltan: " + ", ".join(completeness["missing"]))
 
         # ====================================
-        # ⚓ BLOQUE ADUANAS / PUERTOS / NAVIERAS
+        # ⚠️ INCONSISTENCIAS CON DRIVE (sync)
         # ====================================
-        required_docs = get_required_document_types(session, profile_id)
+        drive_issues = get_drive_issues_for_request(session, request_id)
+        if drive_issues["broken_links"] or drive_issues["unregistered_files"]:
+            with st.expander("⚠️ Inconsistencias con Google Drive", expanded=False):
+                for d in drive_issues["broken_links"]:
+                    st.markdown(f"- 🔗❌ **{d['file_name']}**: el archivo ya no está en la carpeta de Drive")
+                for f in drive_issues["unregistered_files"]:
+                    st.markdown(f"- 📄❔ [{f['name']}]({f['web_view_link']}): está en Drive pero no registrado")
+
+        status_map = get_all_statuses(session)
+        status_labels = list(status_map.keys())
         uploaded_map = get_uploaded_documents_map(session, request_id)
+        required_docs = get_required_document_types(session, profile_id)
         lines = get_shipping_lines_status(session, request_id)
         ports = get_ports_status(session, request_id)
         customs = get_customs_status(session, request_id)
+        meta = get_request_meta(session, request_id) or {}
 
-        for doc in required_docs:
-            doc_id = doc["id"]
-            doc_name = doc["name"]
+        # Cada bloque es un fragmento: cambiar un estado o agregar un archivo re-ejecuta
+        # solo ese bloque. Los valores quedan en session_state (por key) y los lee el guardado.
+        render_internal_block(
+            request_id, profile_id, status_labels, status_map,
+            get_internal_status(session, request_id), uploaded_map
+        )
 
-            if any(keyword in doc_name.lower() for keyword in ["empresa", "vinculación", "vinculacion", "seguridad"]):
+        # Tipo de documento -> key de su uploader
+        uploader_keys = {
+            f"internal_{key_suffix}": f"uploader_internal_{key_suffix}_{request_id}"
+            for key_suffix in INTERNAL_DOCS.values()
+        }
+        for doc in required_docs:
+            if _is_internal_doc(doc["name"]):
                 continue
-
-            already = uploaded_map.get(doc_id, [])
-
-            st.markdown(f"#### {doc_name}")
-
-            # ---- uploader único ----
-            uploaded_buffers[doc_id] = st.file_uploader(
-                label="Subir documento",
-                type=["pdf"],
-                key=f"uploader_{request_id}_{doc_id}",
-                accept_multiple_files=True
+            uploader_keys[doc["id"]] = f"uploader_{request_id}_{doc['id']}"
+            render_doc_type_block(
+                request_id, doc, uploaded_map.get(doc["id"], []),
+                customs, ports, lines, status_labels, status_map
             )
 
-            # Mostrar archivos existentes
-            if already:
-                for d in already:
-                    fecha = (
-                        _to_colombia_tz(d["uploaded_at"]).strftime("%Y-%m-%d %H:%M")
-                        if d.get("uploaded_at") else "sin fecha"
-                    )
-                    st.markdown(f"- [{d['file_name']}]({d['drive_link']}) • _{d['uploaded_by']}, {fecha}_")
-            else:
-                st.caption("No cargado aún")
-
-            # ---- Estados asociados según tipo ----
-            with st.expander("Estados asociados", expanded=True):
-                if "aduanero" in doc_name.lower() and customs:
-                    for c in customs:
-                        col1, col2 = st.columns([3, 2])
-                        with col1:
-                            st.write(f"**{c.customs_name}**")
-                        with col2:
-                            # Calcula el índice del estado actual
-                            current_index = 0
-                            if c.status_id:
-                                for i, label in enumerate(status_labels):
-                                    if status_map[label] == c.status_id:
-                                        current_index = i
-                                        break
-
-                            st.selectbox(
-                                "Estado",
-                                status_labels,
-                                index=current_index,
-                                key=f"status_customs_{c.customs_name}"
-                            )
-
-
-                # 🔹 Puertos y terminales
-                elif "puerto" in doc_name.lower() and ports:
-                    grouped_ports = {}
-                    for p in ports:
-                        grouped_ports.setdefault(p.port_name, []).append(p)
-                    for port, terminals in grouped_ports.items():
-                        for term in terminals:
-                            name = f"{port} / {term.terminal_name or '(sin terminal)'}"
-                            col1, col2 = st.columns([3, 2])
-                            with col1:
-                                st.write(f"**{name}**")
-                            with col2:
-                                st.selectbox(
-                                    "Estado",
-                                    status_labels,
-                                    index=(term.status_id - 1) if term.status_id else 0,
-                                    key=f"status_port_{term.id}"
-                                )
-
-                # 🔹 Líneas navieras
-                elif "naviera" in doc_name.lower() and lines:
-                    for line in lines:
-                        col1, col2 = st.columns([3, 2])
-                        with col1:
-                            st.write(f"**{line.line_name}**")
-                        with col2:
-                            st.selectbox(
-                                "Estado",
-                                status_labels,
-                                index=(line.status_id - 1) if line.status_id else 0,
-                                key=f"status_line_{line.id}"
-                            )
-
-                else:
-                    st.caption("Sin estados asociados a este tipo de documento.")
-
-            st.markdown("---")
-
-        # ====================================
-        # 🧭 SEGUIMIENTO Y COMENTARIOS
-        # ====================================
-        st.subheader("Seguimiento y comentarios")
-
-        meta = get_request_meta(session, request_id) or {}
-        notif_default = (meta.get("notification_followup") or "").strip()
-        comments_default = (meta.get("general_comments") or "").strip()
-
-        seguimiento_text = st.text_area(
-            "Seguimiento de notificación",
-            value=notif_default,
-            height=150
-        )
-
-        comentarios_text = st.text_area(
-            "Comentarios generales",
-            value=comments_default,
-            height=150
-        )
+        render_comments_block(request_id, meta)
 
         # ====================================
         # 💾 GUARDAR TODO
         # ====================================
         if st.button("Guardar documentos y estados", key=f"btn_guardar_{request_id}"):
             with st.spinner("Guardando cambios..."):
-                import tempfile
                 try:
-                    service = init_drive()
-                    shared_drive_id = st.secrets["drive"].get("shared_drive_id")
-                    parent_folder_id = st.secrets["drive"].get("parent_folder_id")
-
-                    CLIENTS_FOLDER_ID = st.secrets["drive"].get("clients_folder_id")
-                    PROVIDERS_FOLDER_ID = st.secrets["drive"].get("providers_folder_id")
-
                     # Detectar tipo de entidad según perfil
                     entity_type = "proveedor" if "proveedor" in profile_name.lower() else "cliente"
 
-                    # Seleccionar carpeta base según tipo
-                    base_folder_id = CLIENTS_FOLDER_ID if entity_type == "cliente" else PROVIDERS_FOLDER_ID
-
-                    # Crear (o buscar) la subcarpeta específica
-                    folder_id = find_or_create_folder(
-                        service,
-                        company_name,           # Nombre de la empresa
-                        entity_type=entity_type,
-                        base_folder_id=base_folder_id
-                    )
-
-
                     # 🔹 Mapeo de tipos de documento internos según perfil
-                    internal_doc_type_map = {
-                        1: {"empresa": 6, "vinculacion": 7, "seguridad": 8},
-                        2: {"empresa": 9, "vinculacion": 10, "seguridad": 11}
-                    }
+                    internal_doc_type_map = INTERNAL_DOC_TYPES
 
                     changes = 0
 
-                    # === Subida de todos los documentos (incluido Registro Interno) ===
-                    for key, files in uploaded_buffers.items():
+                    # === Documentos (incluido Registro Interno): staging + cola ===
+                    # La búsqueda de carpeta, la subida a Drive y el registro los hace un
+                    # worker; si el usuario sale de la página, el trabajo sigue.
+                    for key, widget_key in uploader_keys.items():
+                        files = st.session_state.get(widget_key)
                         if not files:
                             continue
 
@@ -428,13 +517,6 @@ def forms():
 
                             safe_name = sanitize_filename(file.name)
 
-                            # 📂 Crear archivo temporal seguro
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{safe_name}") as tmp_file:
-                                tmp_path = tmp_file.name
-                                tmp_file.write(file.getbuffer())
-
-                            drive_link = upload_to_drive(service, folder_id, tmp_path, safe_name)
-
                             # 🔸 Determinar tipo de documento
                             doc_type_id = None
                             if isinstance(key, str) and key.startswith("internal_"):
@@ -443,27 +525,33 @@ def forms():
                             elif isinstance(key, int):
                                 doc_type_id = key
                             else:
-                                st.warning(f"⚠️ Clave inesperada en uploaded_buffers: {key} (tipo {type(key).__name__})")
-                                os.remove(tmp_path)
+                                st.warning(f"⚠️ Clave inesperada en uploader_keys: {key} (tipo {type(key).__name__})")
                                 continue
 
                             if not doc_type_id:
                                 st.warning(f"⚠️ No se encontró un ID válido de tipo de documento para {key}")
-                                os.remove(tmp_path)
                                 continue
 
-                            upsert_uploaded_document(
+                            _, upload_key = stage_file(
+                                bytes(file.getbuffer()), safe_name, f"{entity_type}:{company_name.strip()}"
+                            )
+                            enqueue_job(
                                 session,
-                                request_id,
-                                doc_type_id,
-                                safe_name,
-                                drive_link,
-                                st.user.name,
-                                razon_social,
-                                fecha_creacion
+                                "upload_document",
+                                {
+                                    "request_id": request_id,
+                                    "doc_type_id": doc_type_id,
+                                    "file_name": safe_name,
+                                    "upload_key": upload_key,
+                                    "company_name": company_name,
+                                    "entity_type": entity_type,
+                                    "uploaded_by": current_user().name,
+                                    "razon_social": razon_social,
+                                    "fecha_creacion": fecha_creacion.isoformat() if fecha_creacion else None,
+                                },
+                                request_id=request_id,
+                                created_by=current_user().email,
                             )
-
-                            os.remove(tmp_path)
                             changes += 1
                     
                     razon_social_val = st.session_state.get(f"razon_social_{request_id}", "").strip()
@@ -471,13 +559,17 @@ def forms():
                     upsert_request_info(
                         session,
                         request_id,
-                        st.user.name,
+                        current_user().name,
                         razon_social_val,
                         fecha_creacion_val
                     )
 
                     # === Guardar estatus de Registro Interno ===
-                    upsert_status(session, "internal_registration", request_id, "Registro interno", status_map[internal_status_label])
+                    upsert_status(
+                        session, "internal_registration", request_id, "Registro interno",
+                        status_map[st.session_state[f"status_internal_{request_id}"]],
+                        changed_by=current_user().email
+                    )
 
                     # === Guardar estados asociados ===
                     for key, value in st.session_state.items():
@@ -490,7 +582,8 @@ def forms():
                                     "shipping_line_registration",
                                     request_id,
                                     line_data.line_name, 
-                                    status_map[value]
+                                    status_map[value],
+                                    changed_by=current_user().email
                                 )
 
                         elif key.startswith("status_port_"):
@@ -503,22 +596,35 @@ def forms():
                                     request_id,
                                     port_data.port_name,
                                     status_map[value],
-                                    port_data.terminal_name
+                                    port_data.terminal_name,
+                                    changed_by=current_user().email
                                 )
 
                         elif key.startswith("status_customs_"):
                             name = key.replace("status_customs_", "")
-                            upsert_status(session, "customs_registration", request_id, name, status_map[value])
+                            upsert_status(
+                                session, "customs_registration", request_id, name,
+                                status_map[value], changed_by=current_user().email
+                            )
 
                     # === Guardar comentarios ===
-                    update_request_meta(session, request_id, seguimiento_text, comentarios_text)
+                    update_request_meta(
+                        session, request_id,
+                        st.session_state.get(f"seguimiento_{request_id}", ""),
+                        st.session_state.get(f"comentarios_{request_id}", "")
+                    )
 
                     session.commit()
-                    st.success(f"✅ Cambios guardados correctamente. {changes} documento(s) nuevo(s) agregado(s).")
+                    st.success(
+                        f"✅ Cambios guardados correctamente. {changes} documento(s) en cola de subida "
+                        "(puedes salir de la página; el avance se ve abajo)."
+                    )
 
                 except Exception as e:
                     session.rollback()
                     st.error(f"❌ Error al guardar: {e}")
 
+        render_upload_jobs(request_id)
+
     finally:
         session.close()
\ No newline at end of file
@@ -1,21 +1,339 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 from database.db import SessionLocal
 from database.crud.documents import (
-    get_all_company_names,
     get_profiles_list,
     get_profile_id_by_name,
-    get_requests_by_company_and_profile,
-    get_internal_status,
-    get_shipping_lines_status,
-    get_ports_status,
-    get_customs_status,
-    get_all_statuses,
-    get_comments_by_request,
-    get_razon_social_by_request,
-    get_requests_for_progress
+    get_requests_for_progress,
+    get_progress_for_requests,
+    get_status_timeline,
+    APPROVED_STATUS_PATTERN
 )
+from database.crud.archive import get_archived_requests, get_archived_dossier
+from database.crud.search import search_requests, PAGE_SIZE as SEARCH_PAGE_SIZE
+from services import cache
+
+# Cada cuánto revisa cada sección si su solicitud cambió (solo compara una versión en memoria)
+LIVE_REFRESH_SECONDS = float(os.getenv("PROGRESS_REFRESH_SECONDS", "5"))
+# Sin listener de caché no hay versiones confiables: se recarga con esta frecuencia
+FALLBACK_RELOAD_SECONDS = float(os.getenv("PROGRESS_FALLBACK_RELOAD_SECONDS", "60"))
+
+# ==========================
+#   SOLICITUDES ARCHIVADAS
+# ==========================
+
+def show_archived_view(session, email_filter: str | None):
+    """Expedientes movidos a archive.* (solo bajo demanda)."""
+    archived = get_archived_requests(session, only_for_email=email_filter)
+    if not archived:
+        st.info("No hay solicitudes archivadas.")
+        return
+
+    options = {
+        f"{r['company_name']} · {r['profile_name'] or '—'} · ID {r['id']}": r["id"]
+        for r in archived
+    }
+    label = st.selectbox(
+        "Solicitud archivada",
+        list(options),
+        index=None,
+        placeholder="Selecciona una solicitud archivada..."
+    )
+    if not label:
+        return
+
+    dossier = get_archived_dossier(session, options[label])
+    if not dossier:
+        st.warning("La solicitud ya no está en el archivo.")
+        return
+
+    req = dossier["request"]
+    st.markdown(f"---\n### Solicitud {req['company_name']} (archivada)")
+    archived_at = req.get("archived_at")
+    st.caption(f"Archivada el {archived_at.strftime('%Y-%m-%d') if archived_at else '—'}")
+    st.write(f"**Registro Interno:** {dossier['internal_status']}")
+
+    if dossier["shipping_lines"]:
+        with st.expander("🚢 Líneas Navieras", expanded=True):
+            for l in dossier["shipping_lines"]:
+                st.write(f"- {l['line_name']}: **{l['status']}**")
+    if dossier["ports"]:
+        with st.expander("⚓ Puertos y Terminales", expanded=True):
+            for p in dossier["ports"]:
+                terminal_label = f" ({p['terminal_name']})" if p["terminal_name"] else ""
+                st.write(f"- {p['port_name']}{terminal_label}: **{p['status']}**")
+    if dossier["customs"]:
+        with st.expander("🧾 Aduanas", expanded=True):
+            for c in dossier["customs"]:
+                st.write(f"- {c['customs_name']}: **{c['status']}**")
+    if dossier["documents"]:
+        with st.expander("📎 Documentos", expanded=False):
+            for d in dossier["documents"]:
+                if d["drive_link"]:
+                    st.markdown(f"- {d['doc_type'] or '—'}: [{d['file_name']}]({d['drive_link']})")
+
+    comments = dossier["comments"]
+    st.markdown("#### 🗒️ Comentarios y Seguimiento")
+    if comments:
+        st.write(f"**Comentarios:** {comments['comments'] or '—'}")
+        st.write(f"**Seguimiento / Notificaciones:** {comments['notifications'] or '—'}")
+    else:
+        st.caption("Sin comentarios registrados para esta solicitud.")
+
+# ==========================
+#   TABLAS (DataFrames)
+# ==========================
+
+APPROVED_PREFIX = APPROVED_STATUS_PATTERN.rstrip("%")
+
+BLOCKS = {
+    "shipping_lines": ("🚢 Líneas Navieras", {"line_name": "Línea naviera", "status": "Estado"}),
+    "ports": ("⚓ Puertos y Terminales", {"port_name": "Puerto", "terminal_name": "Terminal", "status": "Estado"}),
+    "customs": ("🧾 Aduanas", {"customs_name": "Aduana", "status": "Estado"}),
+}
+
+
+def _block_frame(rows: list[dict], columns: dict) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=list(columns)).rename(columns=columns)
+    return df.fillna("—")
+
+
+def _summary_frame(progress: dict) -> pd.DataFrame:
+    """Una fila por solicitud: datos base + aprobados/total por bloque."""
+    base = pd.DataFrame(
+        [
+            {
+                "ID": rid,
+                "Razón social": d["razon_social"] or "—",
+                "Fecha de creación": d["fecha_creacion"],
+                "Registro interno": d["internal_status"],
+                "Documentos (%)": (d["completeness"] or {}).get("percent"),
+            }
+            for rid, d in progress.items()
+        ],
+        columns=["ID", "Razón social", "Fecha de creación", "Registro interno", "Documentos (%)"],
+    )
+
+    entries = pd.DataFrame(
+        [
+            {"ID": rid, "block": block, "status": e["status"]}
+            for rid, d in progress.items()
+            for block in BLOCKS
+            for e in d[block]
+        ],
+        columns=["ID", "block", "status"],
+    )
+    summary = base.set_index("ID")
+    if entries.empty:
+        grid = pd.DataFrame(index=summary.index)
+    else:
+        entries["approved"] = entries["status"].str.lower().str.startswith(APPROVED_PREFIX)
+        counts = entries.groupby(["ID", "block"])["approved"].agg(["sum", "count"])
+        grid = (counts["sum"].astype(int).astype(str) + "/" + counts["count"].astype(str)).unstack("block")
+
+    for block, (label, _) in BLOCKS.items():
+        title = f"{label.split(' ', 1)[1]} (aprobadas)"
+        summary[title] = grid[block].reindex(summary.index).fillna("—") if block in grid.columns else "—"
+    return summary.reset_index().sort_values("ID", ascending=False)
+
+# ==========================
+#   SECCIÓN EN VIVO POR SOLICITUD
+# ==========================
+
+def _snapshot_key(request_id: int) -> str:
+    return f"_progress_live_{request_id}"
+
+
+def _new_snapshot(request_id: int, version: tuple, data: dict | None, timeline: list | None) -> dict:
+    return {
+        "version": version,
+        "fetched_at": time.monotonic(),
+        "settling": cache.settling(request_id),
+        "data": data,
+        "timeline": timeline,
+    }
+
+
+def _load_request_snapshot(request_id: int, is_admin: bool) -> dict:
+    # Versión antes de leer: si algo cambia durante la lectura, el próximo ciclo vuelve a cargar
+    version = cache.request_version(request_id)
+    session = SessionLocal()
+    try:
+        data = get_progress_for_requests(session, [request_id]).get(request_id)
+        timeline = get_status_timeline(session, request_id) if is_admin else None
+    finally:
+        session.close()
+    return _new_snapshot(request_id, version, data, timeline)
+
+
+def _snapshot_is_stale(snap: dict | None, request_id: int, is_admin: bool = False) -> bool:
+    if snap is None or snap["version"] != cache.request_version(request_id):
+        return True
+    if snap["settling"]:
+        # Leído justo después de un cambio (posible lag de la réplica): se relee al asentarse
+        return True
+    if is_admin and snap["timeline"] is None:
+        # Sembrado por el resumen (sin historial)
+        return True
+    return not cache.is_live() and time.monotonic() - snap["fetched_at"] > FALLBACK_RELOAD_SECONDS
+
+
+def _render_request(data: dict, timeline: list | None, is_admin: bool):
+    st.markdown(f"---\n### Solicitud {data['company_name']} · ID {data['id']}")
+
+    fecha_creacion = data["fecha_creacion"]
+    st.markdown(
+        f"**Razón Social:** {data['razon_social'] or '—'} · "
+        f"**Fecha de Creación:** {fecha_creacion.strftime('%Y-%m-%d') if fecha_creacion else '—'} · "
+        f"**Registro Interno:** {data['internal_status']}"
+    )
+
+    completeness = data["completeness"]
+    if completeness:
+        st.progress(
+            completeness["percent"] / 100,
+            text=f"📎 Documentos: {completeness['uploaded']} de {completeness['required']} ({completeness['percent']}%)"
+        )
+        if completeness["missing"]:
+            st.caption("Faltan: " + ", ".join(completeness["missing"]))
+
+    # Una tabla por bloque (un solo delta por bloque, ordenable)
+    for block, (label, columns) in BLOCKS.items():
+        if data[block]:
+            with st.expander(f"{label} ({len(data[block])})", expanded=True):
+                st.dataframe(_block_frame(data[block], columns), use_container_width=True, hide_index=True)
+
+    # === Historial de estados (solo compliance)
+    if is_admin:
+        with st.expander("🕓 Historial de estados", expanded=False):
+            if timeline:
+                st.dataframe(pd.DataFrame(timeline), use_container_width=True, hide_index=True)
+            else:
+                st.caption("Sin cambios de estado registrados.")
+
+    st.markdown("#### 🗒️ Comentarios y Seguimiento")
+    if data["comments"] is not None or data["notifications"] is not None:
+        st.markdown(
+            f"**Comentarios:**\n\n{data['comments'] or '—'}\n\n"
+            f"**Seguimiento / Notificaciones:**\n\n{data['notifications'] or '—'}"
+        )
+    else:
+        st.caption("Sin comentarios registrados para esta solicitud.")
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_request_section(request_id: int, is_admin: bool):
+    """
+    Se re-ejecuta sola cada LIVE_REFRESH_SECONDS, pero solo consulta la base cuando la
+    versión en memoria de la solicitud cambió (NOTIFY de otro proceso o de este).
+    """
+    key = _snapshot_key(request_id)
+    snap = st.session_state.get(key)
+    if _snapshot_is_stale(snap, request_id, is_admin):
+        snap = _load_request_snapshot(request_id, is_admin)
+        st.session_state[key] = snap
+
+    if not snap["data"]:
+        st.warning(f"La solicitud {request_id} ya no está disponible (¿archivada?).")
+        return
+    _render_request(snap["data"], snap["timeline"], is_admin)
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_summary(request_ids: list[int]):
+    """
+    Grilla resumen de todas las solicitudes en pantalla. Se recarga (una consulta por lote)
+    solo si alguna cambió, y deja sembradas las secciones para que no vuelvan a consultar.
+    """
+    key = "_progress_live_summary"
+    snap = st.session_state.get(key)
+    stale = (
+        snap is None
+        or snap["ids"] != request_ids
+        or any(snap["versions"][rid] != cache.request_version(rid) for rid in request_ids)
+        or snap["settling"]
+        or (not cache.is_live() and time.monotonic() - snap["fetched_at"] > FALLBACK_RELOAD_SECONDS)
+    )
+    if stale:
+        versions = {rid: cache.request_version(rid) for rid in request_ids}
+        session = SessionLocal()
+        try:
+            progress = get_progress_for_requests(session, request_ids)
+        finally:
+            session.close()
+        for rid in request_ids:
+            if _snapshot_is_stale(st.session_state.get(_snapshot_key(rid)), rid):
+                st.session_state[_snapshot_key(rid)] = _new_snapshot(rid, versions[rid], progress.get(rid), None)
+        snap = {
+            "ids": request_ids,
+            "versions": versions,
+            "fetched_at": time.monotonic(),
+            "settling": any(cache.settling(rid) for rid in request_ids),
+            "progress": progress,
+        }
+        st.session_state[key] = snap
+
+    if len(snap["progress"]) > 1:
+        st.markdown("#### 📋 Resumen")
+        st.dataframe(
+            _summary_frame(snap["progress"]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Documentos (%)": st.column_config.ProgressColumn(
+                    "Documentos (%)", min_value=0, max_value=100, format="%d%%"
+                ),
+            },
+        )
+
+# ==========================
+#   BÚSQUEDA GLOBAL
+# ==========================
+
+def show_search_results(session, query: str, email_filter: str | None) -> int | None:
+    """Resultados paginados de la búsqueda; retorna la solicitud elegida (o None)."""
+    if st.session_state.get("progress_search_last") != query:
+        st.session_state["progress_search_last"] = query
+        st.session_state["progress_search_page"] = 1
+        st.session_state.pop("progress_search_selected", None)
+
+    page = st.session_state.get("progress_search_page", 1)
+    results, total = search_requests(session, query, only_for_email=email_filter, page=page)
+    if not total:
+        st.info("Sin resultados para esta búsqueda.")
+        return None
+
+    pages = -(-total // SEARCH_PAGE_SIZE)
+    selected = st.session_state.get("progress_search_selected")
+    with st.expander(f"🔎 {total} resultado(s) · página {page} de {pages}", expanded=selected is None):
+        for r in results:
+            col1, col2 = st.columns([6, 1])
+            with col1:
+                st.markdown(
+                    f"**{r['company_name'] or 'Sin nombre'}** · {r['profile_name'] or '—'} · "
+                    f"{r['trading'] or '—'} · ID {r['request_id']}"
+                )
+                if r["snippet"]:
+                    st.caption(r["snippet"])
+            with col2:
+                st.button(
+                    "Ver",
+                    key=f"progress_search_view_{r['request_id']}",
+                    on_click=lambda rid=r["request_id"]: st.session_state.update(progress_search_selected=rid),
+                )
+
+        col1, col2, _ = st.columns([1, 1, 6])
+        with col1:
+            st.button("◀ Anterior", key="progress_search_prev", disabled=page <= 1,
+                      on_click=lambda: st.session_state.update(progress_search_page=page - 1))
+        with col2:
+            st.button("Siguiente ▶", key="progress_search_next", disabled=page >= pages,
+                      on_click=lambda: st.session_state.update(progress_search_page=page + 1))
+
+    return selected
 
 # ==========================
 #   VISTA DE PROGRESO
@@ -25,125 +343,91 @@ def show_progress_view(current_user_email: str | None = None, is_admin: bool = F
     st.set_page_config(page_title="📊 Progreso de Solicitudes", layout="wide")
     st.subheader("📊 Visualización del Progreso de Solicitudes")
 
+    cache.start_listener()
     session = SessionLocal()
 
     try:
         email_filter = None if is_admin else (current_user_email or None)
-        requests = get_requests_for_progress(session, only_for_email=email_filter)
-        if not requests:
-            st.info("No hay solicitudes para mostrar.")
+
+        if st.toggle("📦 Ver solicitudes archivadas", key="progress_show_archived"):
+            show_archived_view(session, email_filter)
             return
-        
 
-        companies = sorted({r.get("company_name") for r in requests if r.get("company_name")})
+        query = st.text_input(
+            "🔎 Buscar solicitud",
+            key="progress_search",
+            placeholder="Compañía, razón social, correo, commodity, aduana, puerto, naviera o comentario..."
+        ).strip()
+        if query:
+            selected_id = show_search_results(session, query, email_filter)
+            if selected_id is None:
+                return
+            request_ids = [selected_id]
+        else:
+            request_ids = _pick_requests(session, email_filter)
+            if not request_ids:
+                return
 
-        all_profile_names = get_profiles_list(session) or []  # Ejemplo: ["Cliente", "Proveedor"]
-        name_to_id = {}
-        for name in all_profile_names:
-            pid = get_profile_id_by_name(session, name)
-            if pid:
-                name_to_id[name] = pid
+    finally:
+        session.close()
 
-        present_profile_ids = {r.get("profile_id") for r in requests if r.get("profile_id") is not None}
-        available_profiles = [(name, pid) for name, pid in name_to_id.items() if pid in present_profile_ids]
-        available_profiles.sort(key=lambda x: x[0])
+    # Resumen + cada solicitud como fragmentos independientes: se actualizan sin re-ejecutar la página
+    render_summary(request_ids)
+    for request_id in request_ids:
+        render_request_section(request_id, is_admin)
 
-        col1, col2 = st.columns(2)
 
-        with col1:
-            company_name = st.selectbox(
-                "Empresa",
-                companies,
-                index=None,
-                placeholder="Selecciona una compañía..."
-            )
+def _pick_requests(session, email_filter: str | None) -> list[int]:
+    """Selección clásica por compañía y perfil; retorna los IDs a mostrar."""
+    requests = get_requests_for_progress(session, only_for_email=email_filter)
+    if not requests:
+        st.info("No hay solicitudes para mostrar.")
+        return []
+    
 
-        with col2:
-            profile_name = st.selectbox(
-                "Perfil",
-                [name for (name, _) in available_profiles],
-                index=None,
-                placeholder="Selecciona un perfil..."
-            )
-
-        if not company_name or not profile_name:
-            st.info("Selecciona una compañía y un perfil para ver el progreso.")
-            return
-        
-        profile_id = get_profile_id_by_name(session, profile_name)
-        filtered_requests = [
-            r for r in requests
-            if r.get("company_name") == company_name and r.get("profile_id") == profile_id
-        ]
-
-        if not filtered_requests:
-            st.warning("No hay solicitudes registradas para esta combinación.")
-            return
+    companies = sorted({r.get("company_name") for r in requests if r.get("company_name")})
 
-        status_map = {v: k for k, v in get_all_statuses(session).items()}
+    all_profile_names = get_profiles_list(session) or []  # Ejemplo: ["Cliente", "Proveedor"]
+    name_to_id = {}
+    for name in all_profile_names:
+        pid = get_profile_id_by_name(session, name)
+        if pid:
+            name_to_id[name] = pid
 
-        for r in filtered_requests:
-            request_id = r["id"]
+    present_profile_ids = {r.get("profile_id") for r in requests if r.get("profile_id") is not None}
+    available_profiles = [(name, pid) for name, pid in name_to_id.items() if pid in present_profile_ids]
+    available_profiles.sort(key=lambda x: x[0])
 
-            st.markdown(f"---\n### Solicitud {company_name}")
+    col1, col2 = st.columns(2)
 
-            registro = get_razon_social_by_request(session, request_id)
+    with col1:
+        company_name = st.selectbox(
+            "Empresa",
+            companies,
+            index=None,
+            placeholder="Selecciona una compañía..."
+        )
 
-            colA, colB = st.columns(2)
-            if registro:
-                with colA:
-                    st.write(f"**Razón Social:** {registro.get('razon_social') or '—'}")
-                with colB:
-                    fecha_creacion = registro.get("fecha_creacion")
-                    if fecha_creacion:
-                        st.write(f"**Fecha de Creación:** {fecha_creacion.strftime('%Y-%m-%d')}")
-                    else:
-                        st.write("**Fecha de Creación:** —")
-            else:
-                with colA:
-                    st.write("**Razón Social:** —")
-                with colB:
-                    st.write("**Fecha de Creación:** —")
-
-            internal_status_id = get_internal_status(session, request_id)
-            internal_status = status_map.get(internal_status_id, "Sin estado")
-            st.write(f"**Registro Interno:** {internal_status}")
-
-            lines = get_shipping_lines_status(session, request_id)
-            if lines:
-                with st.expander("🚢 Líneas Navieras", expanded=True):
-                    for l in lines:
-                        st.write(f"- {l.line_name}: **{status_map.get(l.status_id, 'Sin estado')}**")
-
-            ports = get_ports_status(session, request_id)
-            if ports:
-                with st.expander("⚓ Puertos y Terminales", expanded=True):
-                    grouped_ports = {}
-                    for p in ports:
-                        grouped_ports.setdefault(p.port_name, []).append(p)
-
-                    for port, terminals in grouped_ports.items():
-                        st.write(f"**{port}**")
-                        for term in terminals:
-                            terminal_label = f" ({term.terminal_name})" if term.terminal_name else ""
-                            st.write(f" - Terminal{terminal_label}: **{status_map.get(term.status_id, 'Sin estado')}**")
-
-            # === Aduanas
-            customs = get_customs_status(session, request_id)
-            if customs:
-                with st.expander("🧾 Aduanas", expanded=True):
-                    for c in customs:
-                        st.write(f"- {c.customs_name}: **{status_map.get(c.status_id, 'Sin estado')}**")
-
-        comments_data = get_comments_by_request(session, request_id)
-        st.markdown("#### 🗒️ Comentarios y Seguimiento")
-        if comments_data:
-            st.write(f"**Comentarios:**")
-            st.write(f"{comments_data['comments'] or '—'}")
-            st.write(f"**Seguimiento / Notificaciones:**")
-            st.write(f"{comments_data['notifications'] or '—'}")
-        else:
-            st.caption("Sin comentarios registrados para esta solicitud.")
+    with col2:
+        profile_name = st.selectbox(
+            "Perfil",
+            [name for (name, _) in available_profiles],
+            index=None,
+            placeholder="Selecciona un perfil..."
+        )
 
-    finally:
-        session.close()
+    if not company_name or not profile_name:
+        st.info("Selecciona una compañía y un perfil para ver el progreso.")
+        return []
+    
+    profile_id = name_to_id.get(profile_name)
+    filtered_requests = [
+        r for r in requests
+        if r.get("company_name") == company_name and r.get("profile_id") == profile_id
+    ]
+
+    if not filtered_requests:
+        st.warning("No hay solicitudes registradas para esta combinación.")
+        return []
+
+    return [r["id"] for r in filtered_requests]
@@ -47,7 +47,7 @@ CREATE TABLE requests (
     has_customs BOOLEAN DEFAULT FALSE,
     has_port BOOLEAN DEFAULT FALSE,
     has_shipping_line BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 -- =====================
@@ -133,3 +133,544 @@ CREATE TABLE internal_registration (
 -- requests        1 ───< shipping_line_registration
 -- document_type   1 ───< registration
 -- comments        1 ───< registration (opcional, id_comments)  
+
+-- =========================================================
+-- 🔄 Sincronización Drive ↔ registration
+-- =========================================================
+-- Copia local de la metadata de Drive bajo las carpetas base
+-- CLIENTE / PROVEEDOR. Se llena con un listado completo la primera vez
+-- y luego se mantiene con el feed incremental de cambios (changes.list).
+
+CREATE TABLE IF NOT EXISTS drive_files (
+    file_id VARCHAR(128) PRIMARY KEY,
+    name VARCHAR(512),
+    mime_type VARCHAR(255),
+    parent_id VARCHAR(128),
+    company_folder_id VARCHAR(128),        -- carpeta de la empresa (hija directa de la carpeta base)
+    entity_type VARCHAR(20) NOT NULL,      -- 'cliente' o 'proveedor'
+    web_view_link TEXT,
+    modified_time TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_drive_files_parent ON drive_files (parent_id);
+CREATE INDEX IF NOT EXISTS idx_drive_files_company_folder ON drive_files (company_folder_id);
+
+-- Token del feed de cambios (una fila por unidad / carpeta raíz sincronizada)
+CREATE TABLE IF NOT EXISTS drive_sync_state (
+    sync_key VARCHAR(128) PRIMARY KEY,
+    page_token VARCHAR(255) NOT NULL,
+    full_sync_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- El ID de archivo se extrae del drive_link (https://drive.google.com/file/d/<id>/view)
+CREATE INDEX IF NOT EXISTS idx_registration_drive_file_id
+    ON registration ((substring(drive_link from '/d/([^/?]+)')));
+
+-- =========================================================
+-- ⏰ Recordatorios (requests.reminder_frequency)
+-- =========================================================
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS next_reminder_at TIMESTAMP;
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS last_reminder_at TIMESTAMP;
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS reminders_stopped_at TIMESTAMP;
+-- Envíos fallidos seguidos: cada falla aplaza el próximo intento (backoff) y al tope se detiene
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS reminder_failures INTEGER NOT NULL DEFAULT 0;
+
+-- Índice parcial: solo las solicitudes con recordatorio pendiente
+CREATE INDEX IF NOT EXISTS idx_requests_next_reminder
+    ON requests (next_reminder_at)
+    WHERE next_reminder_at IS NOT NULL;
+
+-- Búsquedas por solicitud en los bloques de estado
+CREATE INDEX IF NOT EXISTS idx_internal_registration_request ON internal_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_customs_registration_request ON customs_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_port_registration_request ON port_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_shipping_line_registration_request ON shipping_line_registration (request_id);
+
+-- =========================================================
+-- 🕓 Historial de estados (append-only, particionado por mes)
+-- =========================================================
+-- Una fila por cada cambio de status_id en internal/customs/port/shipping_line_registration.
+-- Sin FK a requests: el historial sobrevive a borrados/archivado y las particiones
+-- viejas se pueden desprender (DETACH) sin tocar las tablas de registro.
+
+CREATE TABLE IF NOT EXISTS status_events (
+    id BIGSERIAL,
+    request_id INTEGER NOT NULL,
+    table_name VARCHAR(64) NOT NULL,
+    record_id INTEGER,
+    entity_name VARCHAR(255),
+    terminal_name VARCHAR(150),
+    old_status_id INTEGER,
+    new_status_id INTEGER,
+    changed_by VARCHAR(255),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+
+-- Línea de tiempo por solicitud (se propaga a cada partición)
+CREATE INDEX IF NOT EXISTS idx_status_events_request ON status_events (request_id, changed_at);
+
+CREATE TABLE IF NOT EXISTS status_events_default PARTITION OF status_events DEFAULT;
+
+-- Crea (si no existe) la partición mensual que contiene `p_month`.
+-- Si el mantenimiento se atrasó y ese mes ya tiene filas en la partición DEFAULT,
+-- CREATE ... PARTITION OF fallaría: se crea la tabla suelta, se mueven las filas
+-- y se adjunta (con la DEFAULT bloqueada para que no lleguen filas nuevas del mes).
+CREATE OR REPLACE FUNCTION create_status_events_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end   DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::date;
+    v_name  TEXT := 'status_events_' || to_char(v_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    LOCK TABLE status_events_default IN EXCLUSIVE MODE;
+
+    IF EXISTS (
+        SELECT 1 FROM status_events_default
+        WHERE changed_at >= v_start AND changed_at < v_end
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE status_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name
+        );
+        EXECUTE format(
+            'WITH moved AS (
+                 DELETE FROM status_events_default
+                 WHERE changed_at >= %L AND changed_at < %L
+                 RETURNING *
+             )
+             INSERT INTO %I SELECT * FROM moved',
+            v_start, v_end, v_name
+        );
+        EXECUTE format(
+            'ALTER TABLE status_events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF status_events FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+    END IF;
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_status_events_partition(CURRENT_DATE);
+SELECT create_status_events_partition((CURRENT_DATE + INTERVAL '1 month')::date);
+
+-- =========================================================
+-- 🔌 API HTTP: lecturas en lote por request_id
+-- =========================================================
+CREATE INDEX IF NOT EXISTS idx_registration_request ON registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_comments_request ON comments (request_id);
+
+-- =========================================================
+-- 📦 Archivo de solicitudes cerradas (esquema `archive`)
+-- =========================================================
+-- Solicitudes completamente aprobadas y antiguas se mueven aquí con todas sus filas hijas
+-- (workers/archive.py). Mismas columnas que las tablas activas + archived_at, sin FKs.
+CREATE SCHEMA IF NOT EXISTS archive;
+
+CREATE TABLE IF NOT EXISTS archive.requests (LIKE public.requests);
+CREATE TABLE IF NOT EXISTS archive.registration (LIKE public.registration);
+CREATE TABLE IF NOT EXISTS archive.comments (LIKE public.comments);
+CREATE TABLE IF NOT EXISTS archive.customs_registration (LIKE public.customs_registration);
+CREATE TABLE IF NOT EXISTS archive.port_registration (LIKE public.port_registration);
+CREATE TABLE IF NOT EXISTS archive.shipping_line_registration (LIKE public.shipping_line_registration);
+CREATE TABLE IF NOT EXISTS archive.internal_registration (LIKE public.internal_registration);
+
+ALTER TABLE archive.requests ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_archive_requests_id ON archive.requests (id);
+CREATE INDEX IF NOT EXISTS idx_archive_requests_company ON archive.requests (company_name, profile_id);
+CREATE INDEX IF NOT EXISTS idx_archive_registration_request ON archive.registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_archive_comments_request ON archive.comments (request_id);
+CREATE INDEX IF NOT EXISTS idx_archive_customs_request ON archive.customs_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_archive_port_request ON archive.port_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_archive_shipping_line_request ON archive.shipping_line_registration (request_id);
+CREATE INDEX IF NOT EXISTS idx_archive_internal_request ON archive.internal_registration (request_id);
+
+-- =========================================================
+-- 📬 Resúmenes (digest) para solicitantes
+-- =========================================================
+-- Marca de agua por job: el digest cubre los cambios en (last_run_at, ahora - margen]
+-- (el margen cubre transacciones que empezaron antes y confirman después de la consulta)
+CREATE TABLE IF NOT EXISTS digest_state (
+    job_name VARCHAR(64) PRIMARY KEY,
+    last_run_at TIMESTAMP NOT NULL
+);
+
+-- Solicitantes cuyo resumen no se pudo enviar: el próximo les cubre desde since_at
+CREATE TABLE IF NOT EXISTS digest_retries (
+    job_name VARCHAR(64) NOT NULL,
+    user_email VARCHAR(255) NOT NULL,
+    since_at TIMESTAMP NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    last_error TEXT,
+    PRIMARY KEY (job_name, user_email)
+);
+
+CREATE INDEX IF NOT EXISTS idx_status_events_changed_at ON status_events (changed_at);
+CREATE INDEX IF NOT EXISTS idx_registration_uploaded_at ON registration (uploaded_at);
+CREATE INDEX IF NOT EXISTS idx_requests_user_email ON requests (LOWER(user_email));
+
+-- =========================================================
+-- ⬆️ Sesiones de subida reanudable a Drive
+-- =========================================================
+-- upload_key = hash(carpeta + nombre + contenido): la misma subida interrumpida se retoma
+-- desde bytes_sent con su resumable_uri; si ya terminó, se reutiliza el enlace sin volver a subir.
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id SERIAL PRIMARY KEY,
+    upload_key VARCHAR(64) NOT NULL UNIQUE,
+    folder_id TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    staged_path TEXT NOT NULL,
+    total_bytes BIGINT NOT NULL,
+    bytes_sent BIGINT NOT NULL DEFAULT 0,
+    resumable_uri TEXT,
+    drive_link TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',   -- pending | uploading | done
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_updated ON upload_sessions (updated_at);
+
+-- =========================================================
+-- 🧵 Cola de trabajos en segundo plano (workers.queue_worker)
+-- =========================================================
+-- queued → running → done; si falla vuelve a queued con run_after (backoff)
+-- hasta max_attempts, y luego queda en dead (dead-letter) para revisión manual.
+CREATE TABLE IF NOT EXISTS job_queue (
+    id BIGSERIAL PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    request_id INTEGER,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',   -- queued | running | done | dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by TEXT,
+    locked_at TIMESTAMP,
+    last_error TEXT,
+    created_by TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Solo los pendientes: el claim recorre un índice pequeño aunque la tabla crezca
+CREATE INDEX IF NOT EXISTS idx_job_queue_ready ON job_queue (run_after, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_job_queue_running ON job_queue (locked_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_job_queue_request ON job_queue (request_id, created_at);
+
+-- =========================================================
+-- 📊 Completitud documental (get_document_completeness)
+-- =========================================================
+CREATE INDEX IF NOT EXISTS idx_registration_request_doc_type
+    ON registration (request_id, doc_type_id) WHERE drive_link IS NOT NULL;
+
+-- =========================================================
+-- 🔎 Detección de compañías duplicadas (similitud de trigramas)
+-- =========================================================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Minúsculas, sin tildes, sin puntuación y sin sufijos societarios:
+-- "ACME S.A.S." y "Acme SAS" quedan ambos como "acme".
+-- IMMUTABLE (unaccent con diccionario explícito) para poder indexarla.
+CREATE OR REPLACE FUNCTION normalize_company_name(name TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT btrim(regexp_replace(
+        regexp_replace(
+            regexp_replace(
+                replace(lower(public.unaccent('public.unaccent'::regdictionary, name)), '.', ''),
+                '[^a-z0-9]+', ' ', 'g'
+            ),
+            '\m(sas|sa|sac|saa|ltda|limitada|srl|s de rl|de cv|sa de cv|inc|llc|ltd|corp|cia|gmbh|bv)\M', ' ', 'g'
+        ),
+        '\s+', ' ', 'g'
+    ))
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_requests_company_name_trgm
+    ON requests USING gin (normalize_company_name(company_name) gin_trgm_ops);
+
+-- =========================================================
+-- ⏳ Antigüedad de solicitudes y bloques abiertos
+-- =========================================================
+-- created_at siempre poblado: default en la base (los inserts no lo envían) y
+-- backfill de las filas viejas con la primera evidencia disponible. Sin evidencia
+-- (solicitudes antiguas sin eventos ni cargas) se usa la fecha más antigua conocida de
+-- la base y se marca created_at_estimated: son las más viejas, no las más nuevas.
+ALTER TABLE requests ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS created_at_estimated BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE archive.requests ADD COLUMN IF NOT EXISTS created_at_estimated BOOLEAN NOT NULL DEFAULT FALSE;
+
+WITH legacy AS (
+    SELECT COALESCE(
+        LEAST(
+            (SELECT MIN(created_at) FROM requests),
+            (SELECT MIN(changed_at) FROM status_events),
+            (SELECT MIN(uploaded_at) FROM registration)
+        ),
+        CURRENT_TIMESTAMP
+    ) AS marker
+),
+evidence AS (
+    SELECT r.id,
+           COALESCE(
+               (SELECT MIN(e.changed_at) FROM status_events e WHERE e.request_id = r.id),
+               (SELECT MIN(g.uploaded_at) FROM registration g WHERE g.request_id = r.id)
+           ) AS first_seen
+    FROM requests r
+    WHERE r.created_at IS NULL
+)
+UPDATE requests r
+SET created_at = COALESCE(ev.first_seen, legacy.marker),
+    created_at_estimated = ev.first_seen IS NULL
+FROM evidence ev, legacy
+WHERE r.id = ev.id;
+
+ALTER TABLE requests ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE archive.requests r
+SET created_at = COALESCE(
+        (SELECT MIN(g.uploaded_at) FROM archive.registration g WHERE g.request_id = r.id),
+        r.archived_at
+    ),
+    created_at_estimated = NOT EXISTS (SELECT 1 FROM archive.registration g WHERE g.request_id = r.id)
+WHERE r.created_at IS NULL;
+
+-- Agrupación por trading / comercial y orden por antigüedad
+CREATE INDEX IF NOT EXISTS idx_requests_trading_created ON requests (trading, created_at);
+CREATE INDEX IF NOT EXISTS idx_requests_commercial_created ON requests (commercial, created_at);
+
+-- Bloques por estado (los abiertos son los que no están aprobados)
+CREATE INDEX IF NOT EXISTS idx_internal_registration_status ON internal_registration (status_id, request_id);
+CREATE INDEX IF NOT EXISTS idx_customs_registration_status ON customs_registration (status_id, request_id);
+CREATE INDEX IF NOT EXISTS idx_port_registration_status ON port_registration (status_id, request_id);
+CREATE INDEX IF NOT EXISTS idx_shipping_line_registration_status ON shipping_line_registration (status_id, request_id);
+
+-- Último cambio de estado de cada bloque (tiempo en el estado actual)
+CREATE INDEX IF NOT EXISTS idx_status_events_record
+    ON status_events (table_name, record_id, changed_at DESC);
+
+-- =========================================================
+-- 🔎 Búsqueda global de solicitudes (tsvector + GIN)
+-- =========================================================
+-- Un documento por solicitud con el texto de requests, registration, comments y
+-- los *_registration, mantenido por triggers. Pesos: A = nombre / razón social,
+-- B = correos, commodity, aduanas, puertos y navieras, C = comentarios.
+CREATE TABLE IF NOT EXISTS request_search (
+    request_id INTEGER PRIMARY KEY REFERENCES requests(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    document TSVECTOR NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_request_search_document ON request_search USING gin (document);
+
+CREATE OR REPLACE FUNCTION search_text(value TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, COALESCE(value, '')))
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_request_search(p_request_id INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_a TEXT;
+    v_b TEXT;
+    v_c TEXT;
+BEGIN
+    -- Serializa las reconstrucciones de una misma solicitud: quien espera vuelve a leer
+    -- (cada sentencia toma snapshot nuevo) y no pisa request_search con datos viejos.
+    -- NO KEY UPDATE no choca con el KEY SHARE de las FKs de las tablas hijas.
+    PERFORM 1 FROM requests WHERE id = p_request_id FOR NO KEY UPDATE;
+
+    SELECT concat_ws(' ', r.company_name,
+                     (SELECT string_agg(DISTINCT g.razon_social, ' ') FROM registration g WHERE g.request_id = r.id)),
+           concat_ws(' ', r.email, r.user_email, r.commodity, r.trading, r.country, r.commercial,
+                     (SELECT string_agg(c.customs_name, ' ') FROM customs_registration c WHERE c.request_id = r.id),
+                     (SELECT string_agg(concat_ws(' ', p.port_name, p.terminal_name), ' ')
+                      FROM port_registration p WHERE p.request_id = r.id),
+                     (SELECT string_agg(concat_ws(' ', s.line_name, s.pol, s.pod, s.shipper_bl, s.product), ' ')
+                      FROM shipping_line_registration s WHERE s.request_id = r.id)),
+           (SELECT string_agg(concat_ws(' ', m.comments, m.notifications), ' ') FROM comments m WHERE m.request_id = r.id)
+    INTO v_a, v_b, v_c
+    FROM requests r
+    WHERE r.id = p_request_id;
+
+    IF NOT FOUND THEN
+        -- La solicitud se borró (o se archivó) en esta misma sentencia
+        DELETE FROM request_search WHERE request_id = p_request_id;
+        RETURN;
+    END IF;
+
+    INSERT INTO request_search (request_id, content, document, updated_at)
+    VALUES (
+        p_request_id,
+        concat_ws(' · ', NULLIF(v_a, ''), NULLIF(v_b, ''), NULLIF(v_c, '')),
+        setweight(to_tsvector('simple', search_text(v_a)), 'A')
+            || setweight(to_tsvector('simple', search_text(v_b)), 'B')
+            || setweight(to_tsvector('simple', search_text(v_c)), 'C'),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (request_id) DO UPDATE
+    SET content = EXCLUDED.content, document = EXCLUDED.document, updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION request_search_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'requests' THEN
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM refresh_request_search(NEW.id);
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_request_search(OLD.request_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.request_id IS DISTINCT FROM OLD.request_id) THEN
+        PERFORM refresh_request_search(NEW.request_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Solo cuando cambia una columna indexada: los cambios de estado y de recordatorios no
+-- reindexan, y un UPDATE que reescribe el mismo valor (p. ej. razon_social en cada guardado)
+-- no reconstruye el documento una vez por fila.
+DROP TRIGGER IF EXISTS trg_requests_search ON requests;
+CREATE TRIGGER trg_requests_search
+    AFTER INSERT
+    ON requests FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_requests_search_update ON requests;
+CREATE TRIGGER trg_requests_search_update
+    AFTER UPDATE OF company_name, email, user_email, commodity, trading, country, commercial
+    ON requests FOR EACH ROW
+    WHEN ((OLD.company_name, OLD.email, OLD.user_email, OLD.commodity, OLD.trading, OLD.country, OLD.commercial)
+          IS DISTINCT FROM (NEW.company_name, NEW.email, NEW.user_email, NEW.commodity, NEW.trading, NEW.country, NEW.commercial))
+    EXECUTE FUNCTION request_search_trigger();
+
+DROP TRIGGER IF EXISTS trg_registration_search ON registration;
+CREATE TRIGGER trg_registration_search
+    AFTER INSERT OR DELETE
+    ON registration FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_registration_search_update ON registration;
+CREATE TRIGGER trg_registration_search_update
+    AFTER UPDATE OF razon_social, request_id
+    ON registration FOR EACH ROW
+    WHEN ((OLD.razon_social, OLD.request_id)
+          IS DISTINCT FROM (NEW.razon_social, NEW.request_id))
+    EXECUTE FUNCTION request_search_trigger();
+
+DROP TRIGGER IF EXISTS trg_comments_search ON comments;
+CREATE TRIGGER trg_comments_search
+    AFTER INSERT OR DELETE
+    ON comments FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_comments_search_update ON comments;
+CREATE TRIGGER trg_comments_search_update
+    AFTER UPDATE OF comments, notifications, request_id
+    ON comments FOR EACH ROW
+    WHEN ((OLD.comments, OLD.notifications, OLD.request_id)
+          IS DISTINCT FROM (NEW.comments, NEW.notifications, NEW.request_id))
+    EXECUTE FUNCTION request_search_trigger();
+
+DROP TRIGGER IF EXISTS trg_customs_registration_search ON customs_registration;
+CREATE TRIGGER trg_customs_registration_search
+    AFTER INSERT OR DELETE
+    ON customs_registration FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_customs_registration_search_update ON customs_registration;
+CREATE TRIGGER trg_customs_registration_search_update
+    AFTER UPDATE OF customs_name, request_id
+    ON customs_registration FOR EACH ROW
+    WHEN ((OLD.customs_name, OLD.request_id)
+          IS DISTINCT FROM (NEW.customs_name, NEW.request_id))
+    EXECUTE FUNCTION request_search_trigger();
+
+DROP TRIGGER IF EXISTS trg_port_registration_search ON port_registration;
+CREATE TRIGGER trg_port_registration_search
+    AFTER INSERT OR DELETE
+    ON port_registration FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_port_registration_search_update ON port_registration;
+CREATE TRIGGER trg_port_registration_search_update
+    AFTER UPDATE OF port_name, terminal_name, request_id
+    ON port_registration FOR EACH ROW
+    WHEN ((OLD.port_name, OLD.terminal_name, OLD.request_id)
+          IS DISTINCT FROM (NEW.port_name, NEW.terminal_name, NEW.request_id))
+    EXECUTE FUNCTION request_search_trigger();
+
+DROP TRIGGER IF EXISTS trg_shipping_line_registration_search ON shipping_line_registration;
+CREATE TRIGGER trg_shipping_line_registration_search
+    AFTER INSERT OR DELETE
+    ON shipping_line_registration FOR EACH ROW EXECUTE FUNCTION request_search_trigger();
+DROP TRIGGER IF EXISTS trg_shipping_line_registration_search_update ON shipping_line_registration;
+CREATE TRIGGER trg_shipping_line_registration_search_update
+    AFTER UPDATE OF line_name, pol, pod, shipper_bl, product, request_id
+    ON shipping_line_registration FOR EACH ROW
+    WHEN ((OLD.line_name, OLD.pol, OLD.pod, OLD.shipper_bl, OLD.product, OLD.request_id)
+          IS DISTINCT FROM (NEW.line_name, NEW.pol, NEW.pod, NEW.shipper_bl, NEW.product, NEW.request_id))
+    EXECUTE FUNCTION request_search_trigger();
+
+-- Carga inicial (o reconstrucción) del índice
+SELECT refresh_request_search(r.id)
+FROM requests r
+WHERE NOT EXISTS (SELECT 1 FROM request_search s WHERE s.request_id = r.id);
+
+-- =========================================================
+-- 📦 Exportación incremental a Parquet (workers.parquet_export)
+-- =========================================================
+-- updated_at en las tablas exportadas, mantenido por trigger (las escrituras no lo envían).
+-- Al agregar la columna las filas existentes toman la hora actual: la primera exportación es completa.
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'requests', 'registration', 'comments', 'customs_registration',
+        'port_registration', 'shipping_line_registration', 'internal_registration'
+    ] LOOP
+        EXECUTE format(
+            'ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP', t);
+        EXECUTE format('ALTER TABLE archive.%I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_updated_at ON public.%I', t, t);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_updated_at BEFORE UPDATE ON public.%I FOR EACH ROW EXECUTE FUNCTION set_updated_at()',
+            t, t);
+        -- Lectura por keyset (updated_at, id) desde la marca de agua
+        EXECUTE format('CREATE INDEX IF NOT EXISTS idx_%s_updated_at ON public.%I (updated_at, id)', t, t);
+    END LOOP;
+END;
+$$;
+
+-- status_events es append-only: se exporta por (changed_at, id)
+CREATE INDEX IF NOT EXISTS idx_status_events_changed_id ON status_events (changed_at, id);
+
+-- Marca de agua por tabla: última (marca de tiempo, id) exportada
+CREATE TABLE IF NOT EXISTS export_watermarks (
+    table_name VARCHAR(64) PRIMARY KEY,
+    last_ts TIMESTAMP NOT NULL,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    rows_exported BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,26 +1,58 @@
+import os
+
 import streamlit as st
 
+
+class SessionUser:
+    """
+    Usuario falso guardado en st.session_state["fake_user"] ({"email": ..., "name": ...}).
+    Solo se usa con auth_backend = "fake" (pruebas de carga con AppTest, sin OIDC).
+    """
+
+    def __init__(self, data: dict | None):
+        data = data or {}
+        self.email = data.get("email")
+        self.name = data.get("name") or self.email
+        self.is_logged_in = bool(self.email)
+
+
+def _auth_backend() -> str:
+    try:
+        backend = st.secrets.get("auth_backend")
+    except Exception:
+        backend = None
+    return (backend or os.getenv("AUTH_BACKEND") or "streamlit").lower()
+
+
+def current_user():
+    """st.user, o el usuario de session_state cuando auth_backend = "fake"."""
+    if _auth_backend() == "fake":
+        return SessionUser(st.session_state.get("fake_user"))
+    return st.user
+
+
 def check_authentication():
+    user = current_user()
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
 
     if not st.session_state.authenticated:
-        if not st.user.is_logged_in:
+        if not user.is_logged_in:
             st.warning("Por favor, inicia sesión primero.")
             if st.button("Log in ➡️"):
                 st.login()
             st.stop()
         else:
-            st.header(f"Hello, {st.user.name}!")
+            st.header(f"Hello, {user.name}!")
             st.session_state.authenticated = True
 
-    if st.user.is_logged_in:
+    if user.is_logged_in:
         col1, col2, col3 = st.columns([1, 1.55, 0.3])
         with col3:
             if st.button("Log out"):
                 st.logout()
                 st.session_state.authenticated = False
-                st.rerun() 
+                st.rerun()
     else:
         st.session_state.authenticated = False
-        st.stop()
\ No newline at end of file
+        st.stop()
@@ -0,0 +1,280 @@
+# services/cache.py
+#
+# Caché en memoria (por proceso) para lecturas CRUD, invalidada entre procesos con
+# LISTEN/NOTIFY de Postgres.
+#
+# - Las escrituras emiten `pg_notify('compliance_changes', '<tabla>:<request_id>')`
+#   en su misma transacción (Postgres solo entrega la notificación si hay commit).
+# - Cada proceso tiene un hilo que escucha el canal y borra solo las entradas afectadas.
+# - El proceso que escribe invalida localmente justo después del commit, sin esperar al listener.
+# - Mientras el listener no esté conectado la caché se omite (podrían perderse notificaciones).
+#
+# Configuración: CACHE_TTL_SECONDS (secrets o env, 0 = desactivada; por defecto 300).
+
+import functools
+import inspect
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+from database.replica import get_replica_url, READ_YOUR_WRITES_SECONDS
+
+log = logging.getLogger("cache")
+
+CHANNEL = "compliance_changes"
+ANY_TABLE = "*"
+
+_lock = threading.RLock()
+_entries: dict = {}                 # key -> (expires_at, tags, value)
+_recent: deque = deque()            # (monotonic, table, request_id) de invalidaciones recientes
+_versions: dict[int, int] = {}      # request_id -> versión (sube con cada cambio de esa solicitud)
+_global_version = 0                 # sube con cambios que no son de una solicitud concreta
+_disabled = False
+
+_listener: threading.Thread | None = None
+_listening = threading.Event()
+
+
+def _setting(name: str, default: str) -> str:
+    try:
+        import streamlit as st
+        return str(st.secrets[name])
+    except Exception:
+        return os.getenv(name, default)
+
+
+def _ttl() -> float:
+    return 0.0 if _disabled else float(_setting("CACHE_TTL_SECONDS", "300"))
+
+
+def disable():
+    """Apaga la caché en este proceso (benchmarks, scripts puntuales)."""
+    global _disabled
+    _disabled = True
+    clear()
+
+# ==========================
+# 🔹 PAYLOAD
+# ==========================
+
+def payload(table: str, request_id: int | None = None) -> str:
+    return f"{table}:{'' if request_id is None else int(request_id)}"
+
+
+def parse_payload(raw: str) -> tuple[str, int | None]:
+    table, _, rid = raw.partition(":")
+    return table, (int(rid) if rid.strip().isdigit() else None)
+
+# ==========================
+# 🔹 INVALIDACIÓN
+# ==========================
+
+def _matches(tag: tuple, table: str, request_id: int | None) -> bool:
+    """
+    tag = (tabla, request_id o None). Un tag con request_id None depende de toda la tabla;
+    una invalidación con request_id None afecta a toda la tabla; ANY_TABLE a todas las tablas.
+    """
+    tag_table, tag_rid = tag
+    if table != ANY_TABLE and table != tag_table:
+        return False
+    return request_id is None or tag_rid is None or tag_rid == request_id
+
+
+def invalidate(table: str, request_id: int | None = None):
+    global _global_version
+    now = time.monotonic()
+    with _lock:
+        stale = [k for k, (_, tags, _) in _entries.items() if any(_matches(t, table, request_id) for t in tags)]
+        for key in stale:
+            del _entries[key]
+
+        if request_id is None:
+            _global_version += 1
+        else:
+            _versions[request_id] = _versions.get(request_id, 0) + 1
+
+        _recent.append((now, table, request_id))
+        horizon = now - _hold_seconds() - 60
+        while _recent and _recent[0][0] < horizon:
+            _recent.popleft()
+
+
+def invalidate_many(changes):
+    for table, request_id in changes:
+        invalidate(table, request_id)
+
+
+def clear():
+    global _global_version
+    with _lock:
+        _entries.clear()
+        _global_version += 1
+
+
+def request_version(request_id: int) -> tuple[int, int]:
+    """Versión en memoria de una solicitud; cambia cuando llega una notificación que la afecta."""
+    with _lock:
+        return _global_version, _versions.get(int(request_id), 0)
+
+
+def is_live() -> bool:
+    """True si la caché está activa y el listener conectado (las versiones son confiables)."""
+    return _ttl() > 0 and _listening.is_set()
+
+
+def settling(request_id: int) -> bool:
+    """True si la solicitud cambió hace menos de la ventana de read-your-writes (la réplica puede ir atrasada)."""
+    hold = _hold_seconds()
+    if not hold:
+        return False
+    cutoff = time.monotonic() - hold
+    with _lock:
+        return any(ts >= cutoff and (rid is None or rid == request_id) for ts, _, rid in _recent)
+
+
+def _hold_seconds() -> float:
+    # Con réplica, un valor leído justo después de un cambio puede venir atrasado:
+    # no se guarda hasta que pase la ventana de read-your-writes.
+    return READ_YOUR_WRITES_SECONDS if get_replica_url() else 0.0
+
+
+def _invalidated_since(tags, since: float) -> bool:
+    cutoff = min(since, time.monotonic() - _hold_seconds())
+    return any(
+        ts >= cutoff and any(_matches(t, table, rid) for t in tags)
+        for ts, table, rid in _recent
+    )
+
+# ==========================
+# 🔹 LISTENER (LISTEN/NOTIFY)
+# ==========================
+
+def _database_url() -> str | None:
+    return _setting("DATABASE_URL", "") or None
+
+
+def _listen_forever():
+    backoff = 1.0
+    while True:
+        url = _database_url()
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn=url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL};")
+            # Lo que haya cambiado mientras no escuchábamos ya no es confiable
+            clear()
+            _listening.set()
+            backoff = 1.0
+
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    # Sin tráfico: ping para detectar conexiones muertas
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    invalidate(*parse_payload(note.payload))
+        except Exception as e:
+            log.warning("Listener de caché desconectado (%s); reintento en %.0fs", e, backoff)
+        finally:
+            _listening.clear()
+            clear()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60.0)
+
+
+def start_listener():
+    """Arranca (una vez por proceso) el hilo que escucha las invalidaciones."""
+    global _listener
+    with _lock:
+        if _listener is None or not _listener.is_alive():
+            if not _database_url():
+                return
+            _listener = threading.Thread(target=_listen_forever, name="cache-listener", daemon=True)
+            _listener.start()
+
+# ==========================
+# 🔹 DECORADOR
+# ==========================
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _copy(value):
+    """Copia listas/dicts para que quien llama pueda mutarlos; las filas (Row) son inmutables."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def cached(tables=(), request_tables=(), request_arg: str = "request_id"):
+    """
+    Cachea una función CRUD `fn(session, ...)`.
+    - tables: tablas de las que depende completa (cualquier cambio la invalida).
+    - request_tables: tablas de las que depende solo para la(s) solicitud(es) en `request_arg`
+      (un int o una lista de IDs; None = todas las solicitudes).
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(session, *args, **kwargs):
+            ttl = _ttl()
+            if ttl <= 0:
+                return fn(session, *args, **kwargs)
+            start_listener()
+            if not _listening.is_set():
+                return fn(session, *args, **kwargs)
+
+            bound = sig.bind(session, *args, **kwargs)
+            bound.apply_defaults()
+            call_args = dict(list(bound.arguments.items())[1:])
+            key = (fn.__module__, fn.__qualname__, _freeze(call_args))
+
+            now = time.monotonic()
+            with _lock:
+                hit = _entries.get(key)
+                if hit and hit[0] > now:
+                    return _copy(hit[2])
+
+            tags = [(t, None) for t in tables]
+            if request_tables:
+                rids = call_args.get(request_arg)
+                if rids is None:
+                    # Sin filtro de solicitudes: depende de las tablas completas
+                    tags += [(t, None) for t in request_tables]
+                else:
+                    rids = rids if isinstance(rids, (list, tuple, set)) else [rids]
+                    tags += [(t, int(r)) for t in request_tables for r in rids if r is not None]
+
+            value = fn(session, *args, **kwargs)
+            with _lock:
+                if _listening.is_set() and not _invalidated_since(tags, now):
+                    _entries[key] = (time.monotonic() + ttl, tags, value)
+            return _copy(value)
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
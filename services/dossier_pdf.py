@@ -0,0 +1,219 @@
+# services/dossier_pdf.py
+#
+# Expediente de auditoría: una página PDF por socio comercial (razón social, fechas,
+# estados por bloque, documentos con enlace y comentarios).
+#
+# Este módulo solo depende de reportlab/PyPDF2 (sin base de datos ni streamlit):
+# los procesos del pool lo importan al arrancar y debe ser liviano.
+
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+# Por debajo de esto no compensa arrancar procesos
+PARALLEL_MIN_DOSSIERS = 8
+
+_styles = getSampleStyleSheet()
+_title = ParagraphStyle("DossierTitle", parent=_styles["Heading1"], fontSize=15, spaceAfter=2)
+_heading = ParagraphStyle("DossierHeading", parent=_styles["Heading3"], fontSize=10, spaceBefore=6, spaceAfter=2)
+_cell = ParagraphStyle("DossierCell", parent=_styles["BodyText"], fontSize=7.5, leading=9)
+_small = ParagraphStyle("DossierSmall", parent=_cell, textColor=colors.grey)
+
+_table_style = TableStyle([
+    ("FONTSIZE", (0, 0), (-1, -1), 7.5),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8edf3")),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#b0b8c4")),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("TOPPADDING", (0, 0), (-1, -1), 1.5),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 1.5),
+])
+
+
+def _p(value, style=_cell) -> Paragraph:
+    return Paragraph(escape("—" if value in (None, "") else str(value)), style)
+
+
+def _link(url: str, label: str) -> Paragraph:
+    href = escape(url, {'"': "&quot;"})
+    return Paragraph(f'<link href="{href}" color="blue">{escape(label)}</link>', _cell)
+
+
+def _date(value) -> str:
+    return value.strftime("%Y-%m-%d") if value else "—"
+
+
+def _table(header: list[str], rows: list[list], widths: list[float]) -> Table:
+    t = Table([[_p(h) for h in header]] + rows, colWidths=widths, repeatRows=1)
+    t.setStyle(_table_style)
+    return t
+
+
+def dossier_file_name(dossier: dict) -> str:
+    name = re.sub(r"[^\w\-]+", "_", dossier.get("company_name") or "sin_nombre").strip("_")
+    return f"{dossier['id']:05d}_{name[:60]}.pdf"
+
+# ==========================
+# 🔹 RENDER
+# ==========================
+
+def render_dossier(d: dict) -> bytes:
+    """Renderiza el expediente de una solicitud (dict de get_dossiers) y devuelve el PDF."""
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=14 * mm, rightMargin=14 * mm, topMargin=12 * mm, bottomMargin=12 * mm,
+        title=f"Expediente {d.get('company_name') or ''}", author="Compliance",
+    )
+    width = doc.width
+    story = [
+        Paragraph(escape(d.get("company_name") or "Sin nombre"), _title),
+        Paragraph(escape(f"Solicitud ID {d['id']} · {d.get('profile_name') or '—'}"), _small),
+        Spacer(0, 4),
+    ]
+
+    info = [
+        ("Razón social", d.get("razon_social")),
+        ("Fecha de creación (empresa)", _date(d.get("fecha_creacion"))),
+        ("Fecha de la solicitud", _date(d.get("created_at"))),
+        ("Trading", d.get("trading")),
+        ("Comercial", d.get("commercial")),
+        ("País", d.get("country")),
+        ("Solicitante", d.get("user_email")),
+    ]
+    t = Table([[_p(k), _p(v)] for k, v in info], colWidths=[width * 0.3, width * 0.7])
+    t.setStyle(TableStyle([
+        ("FONTSIZE", (0, 0), (-1, -1), 7.5),
+        ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#f3f5f8")),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#b0b8c4")),
+        ("TOPPADDING", (0, 0), (-1, -1), 1.5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1.5),
+    ]))
+    story.append(t)
+
+    completeness = d.get("completeness")
+    if completeness:
+        text = f"Documentos: {completeness['uploaded']} de {completeness['required']} ({completeness['percent']}%)"
+        if completeness["missing"]:
+            text += " · Faltan: " + ", ".join(completeness["missing"])
+        story += [Spacer(0, 3), _p(text, _small)]
+
+    # Estados por bloque
+    blocks = [["Registro interno", "—", _p(d.get("internal_status"))]]
+    blocks += [["Línea naviera", l["line_name"], l["status"]] for l in d.get("shipping_lines", [])]
+    blocks += [
+        ["Puerto", f"{p['port_name']} / {p['terminal_name'] or '—'}", p["status"]]
+        for p in d.get("ports", [])
+    ]
+    blocks += [["Aduana", c["customs_name"], c["status"]] for c in d.get("customs", [])]
+    story += [
+        Paragraph("Estados por bloque", _heading),
+        _table(
+            ["Bloque", "Detalle", "Estado"],
+            [[_p(b), _p(x), s if isinstance(s, Paragraph) else _p(s)] for b, x, s in blocks],
+            [width * 0.2, width * 0.5, width * 0.3],
+        ),
+    ]
+
+    # Documentos con enlace
+    docs = d.get("documents", [])
+    story.append(Paragraph("Documentos", _heading))
+    if docs:
+        story.append(_table(
+            ["Tipo", "Archivo", "Cargado", "Por"],
+            [
+                [
+                    _p(doc["doc_type"]),
+                    _link(doc["drive_link"], doc["file_name"] or "archivo"),
+                    _p(_date(doc["uploaded_at"])),
+                    _p(doc["uploaded_by"]),
+                ]
+                for doc in docs
+            ],
+            [width * 0.25, width * 0.43, width * 0.12, width * 0.2],
+        ))
+    else:
+        story.append(_p("Sin documentos cargados.", _small))
+
+    story.append(Paragraph("Comentarios", _heading))
+    story.append(_p(d.get("comments") or "Sin comentarios."))
+
+    doc.build(story)
+    return buf.getvalue()
+
+
+def render_pool(workers: int | None = None, total: int | None = None) -> ProcessPoolExecutor | None:
+    """
+    Pool de procesos para render_dossiers (el render de reportlab es CPU puro y no se
+    beneficia de hilos), o None si no vale la pena. Crearlo una vez por paquete: cada
+    proceso nuevo paga el arranque y el import de reportlab.
+    """
+    workers = workers or os.cpu_count() or 1
+    if total is not None:
+        if total < PARALLEL_MIN_DOSSIERS:
+            return None
+        workers = min(workers, total)
+    if workers <= 1:
+        return None
+    # spawn: no hereda conexiones a la base ni hilos (listener de caché) del proceso padre
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+
+
+def render_dossiers(dossiers: list[dict], pool: ProcessPoolExecutor | None = None) -> list[bytes]:
+    """Renderiza varios expedientes (en `pool` si se da y el lote lo amerita). Retorna los PDF en orden."""
+    if not dossiers:
+        return []
+    if pool is None or len(dossiers) < PARALLEL_MIN_DOSSIERS:
+        return [render_dossier(d) for d in dossiers]
+
+    chunksize = max(1, len(dossiers) // ((os.cpu_count() or 1) * 4))
+    return list(pool.map(render_dossier, dossiers, chunksize=chunksize))
+
+# ==========================
+# 🔹 PAQUETES (ZIP / PDF ÚNICO)
+# ==========================
+
+class DossierPack:
+    """
+    Acumula expedientes renderizados en un zip (un PDF por solicitud) o en un único PDF.
+    En zip cada lote se escribe al archivo y se descarta. En "pdf" las páginas se
+    acumulan en un PdfWriter hasta close(): la memoria crece con el paquete; para
+    paquetes grandes conviene el zip.
+    """
+
+    def __init__(self, out, fmt: str = "zip"):
+        if fmt not in ("zip", "pdf"):
+            raise ValueError(f"Formato no soportado: {fmt}")
+        self.fmt = fmt
+        self.out = out
+        self.count = 0
+        if fmt == "zip":
+            self._zip = zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            from PyPDF2 import PdfWriter
+            self._writer = PdfWriter()
+
+    def add(self, dossiers: list[dict], pdfs: list[bytes]):
+        for d, pdf in zip(dossiers, pdfs):
+            if self.fmt == "zip":
+                self._zip.writestr(dossier_file_name(d), pdf)
+            else:
+                from PyPDF2 import PdfReader
+                for page in PdfReader(io.BytesIO(pdf)).pages:
+                    self._writer.add_page(page)
+            self.count += 1
+
+    def close(self):
+        if self.fmt == "zip":
+            self._zip.close()
+        else:
+            self._writer.write(self.out)
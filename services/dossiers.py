@@ -0,0 +1,49 @@
+# services/dossiers.py
+#
+# Paquetes de expedientes para auditoría: selecciona las solicitudes (trading, perfil,
+# rango de fechas), carga los datos por lotes con un número fijo de consultas y
+# renderiza cada lote en paralelo (services.dossier_pdf).
+
+import logging
+from datetime import date
+
+from database.db import SessionLocal
+from database.crud.reports import find_dossier_request_ids, get_dossiers
+from services.dossier_pdf import DossierPack, render_dossiers, render_pool
+
+log = logging.getLogger("dossiers")
+
+BATCH_SIZE = 200
+
+
+def build_dossier_pack(out, fmt: str = "zip", *, trading: str | None = None, profile_id: int | None = None,
+                       date_from: date | None = None, date_to: date | None = None,
+                       workers: int | None = None, batch_size: int = BATCH_SIZE, on_progress=None) -> int:
+    """
+    Escribe en `out` (ruta o archivo binario) un zip con un PDF por solicitud, o un único PDF
+    (fmt="pdf"). on_progress(hechos, total) se llama tras cada lote. Retorna el número de expedientes.
+    """
+    session = SessionLocal()
+    try:
+        ids = find_dossier_request_ids(session, trading, profile_id, date_from, date_to)
+        pack = DossierPack(out, fmt)
+        if on_progress:
+            on_progress(0, len(ids))
+        # Un solo pool para todos los lotes (no uno por lote)
+        pool = render_pool(workers, total=len(ids))
+        try:
+            for start in range(0, len(ids), batch_size):
+                dossiers = get_dossiers(session, ids[start:start + batch_size])
+                # La sesión no se usa mientras se renderiza: se libera la conexión
+                session.commit()
+                pack.add(dossiers, render_dossiers(dossiers, pool))
+                log.info("Expedientes %d-%d de %d", start + 1, min(start + batch_size, len(ids)), len(ids))
+                if on_progress:
+                    on_progress(min(start + batch_size, len(ids)), len(ids))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        pack.close()
+        return pack.count
+    finally:
+        session.close()
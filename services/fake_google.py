@@ -0,0 +1,595 @@
+# services/fake_google.py
+#
+# Backends falsos (en memoria o en disco) de las llamadas de Drive y Sheets que usa la app,
+# para pruebas, benchmarks y pruebas de carga sin red ni credenciales.
+#
+# Se eligen por configuración:
+#   google_backend = "google" | "memory" | "filesystem"      (secrets o GOOGLE_BACKEND)
+#   [fake_google] root_dir, latency_ms, error_rate, error_status
+#   (o FAKE_GOOGLE_ROOT, FAKE_GOOGLE_LATENCY_MS, FAKE_GOOGLE_ERROR_RATE, FAKE_GOOGLE_ERROR_STATUS)
+
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo proceso por root_dir)
+    fcntl = None
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaUploadProgress
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+
+def _config() -> dict:
+    cfg = {}
+    try:
+        import streamlit as st
+        cfg["backend"] = st.secrets.get("google_backend")
+        cfg.update(dict(st.secrets.get("fake_google", {})))
+    except Exception:
+        pass
+
+    return {
+        "backend": (cfg.get("backend") or os.getenv("GOOGLE_BACKEND") or "google").lower(),
+        "root_dir": cfg.get("root_dir") or os.getenv("FAKE_GOOGLE_ROOT") or ".fake_google",
+        "latency_ms": float(cfg.get("latency_ms") or os.getenv("FAKE_GOOGLE_LATENCY_MS") or 0),
+        "error_rate": float(cfg.get("error_rate") or os.getenv("FAKE_GOOGLE_ERROR_RATE") or 0),
+        "error_status": int(cfg.get("error_status") or os.getenv("FAKE_GOOGLE_ERROR_STATUS") or 503),
+    }
+
+
+def get_backend() -> str:
+    return _config()["backend"]
+
+
+def is_fake() -> bool:
+    return get_backend() in ("memory", "filesystem")
+
+
+def _now_rfc3339() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class FaultInjector:
+    """Latencia fija + errores HTTP aleatorios en cada execute()."""
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0, error_status: int = 503, seed=None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+
+    def __call__(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            resp = httplib2.Response({"status": self.error_status})
+            raise HttpError(resp, json.dumps({"error": {"message": "fake injected error"}}).encode())
+
+
+class _FakeRequest:
+    def __init__(self, fn, faults: FaultInjector):
+        self._fn = fn
+        self._faults = faults
+
+    def execute(self, num_retries: int = 0):
+        self._faults()
+        return self._fn()
+
+# ==========================
+# 🔹 DRIVE
+# ==========================
+
+class _FileLock:
+    """flock exclusivo sobre un archivo: serializa a los procesos que comparten root_dir."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class FakeDriveStore:
+    """
+    Metadata + contenido de archivos. Con `root_dir` persiste en disco: blobs por archivo y
+    un journal (journal.jsonl) de solo-agregar con cada cambio de metadata. Cada mutación
+    agrega una línea bajo flock después de aplicar lo que otros procesos escribieron, así
+    que app, workers y la prueba de carga pueden compartir el mismo directorio.
+    """
+
+    def __init__(self, root_dir: str | None = None):
+        self.root_dir = root_dir
+        self.files: dict[str, dict] = {}
+        self.permissions: dict[str, list[dict]] = {}
+        self.changes: list[dict] = []
+        self.uploads: dict[str, dict] = {}
+        self._partials: dict[str, bytes] = {}
+        self._offset = 0
+        self._lock = threading.RLock()
+        if root_dir:
+            os.makedirs(os.path.join(root_dir, "drive", "blobs"), exist_ok=True)
+            self._refresh()
+
+    @property
+    def _journal_path(self):
+        return os.path.join(self.root_dir, "drive", "journal.jsonl")
+
+    def _apply(self, rec: dict):
+        op = rec["op"]
+        if op == "file":
+            f = rec["file"]
+            self.files[f["id"]] = f
+            self.changes.append({"fileId": f["id"], "removed": False})
+        elif op == "permission":
+            self.permissions.setdefault(rec["fileId"], []).append(rec["permission"])
+        elif op == "upload_start":
+            self.uploads[rec["id"]] = rec["info"]
+        elif op == "upload_end":
+            self.uploads.pop(rec["id"], None)
+            self._partials.pop(rec["id"], None)
+
+    def _refresh(self):
+        """Aplica las líneas del journal que otros procesos agregaron desde la última lectura."""
+        if not self.root_dir or not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # solo líneas completas
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._offset += end
+
+    def _record(self, rec: dict):
+        """Aplica una mutación y, con root_dir, la agrega al journal (bajo flock)."""
+        if not self.root_dir:
+            self._apply(rec)
+            return
+        with _FileLock(self._journal_path + ".lock"):
+            self._refresh()
+            line = (json.dumps(rec) + "\n").encode("utf-8")
+            with open(self._journal_path, "ab") as f:
+                f.write(line)
+            self._offset += len(line)
+            self._apply(rec)
+
+    def put(self, metadata: dict, content: bytes | None = None) -> dict:
+        with self._lock:
+            file_id = metadata.get("id") or uuid.uuid4().hex
+            f = {
+                "id": file_id,
+                "name": metadata.get("name"),
+                "mimeType": metadata.get("mimeType") or "application/pdf",
+                "parents": list(metadata.get("parents") or []),
+                "trashed": False,
+                "modifiedTime": _now_rfc3339(),
+                "webViewLink": f"https://drive.google.com/file/d/{file_id}/view",
+                "size": len(content) if content is not None else None,
+            }
+            if metadata.get("upload_id"):
+                f["upload_id"] = metadata["upload_id"]
+            if content is not None and self.root_dir:
+                with open(os.path.join(self.root_dir, "drive", "blobs", file_id), "wb") as out:
+                    out.write(content)
+            self._record({"op": "file", "file": f})
+            return dict(f)
+
+    # --- Subidas reanudables: {upload_id: {"metadata", "total"}} + bytes en uploads/<id>
+
+    def _upload_path(self, upload_id: str) -> str | None:
+        return os.path.join(self.root_dir, "drive", "uploads", upload_id) if self.root_dir else None
+
+    def start_upload(self, metadata: dict, total: int) -> str:
+        with self._lock:
+            upload_id = uuid.uuid4().hex
+            self._partials[upload_id] = b""
+            if self.root_dir:
+                os.makedirs(os.path.dirname(self._upload_path(upload_id)), exist_ok=True)
+                open(self._upload_path(upload_id), "wb").close()
+            self._record({"op": "upload_start", "id": upload_id,
+                          "info": {"metadata": dict(metadata), "total": total}})
+            return f"https://fake.googleapis.com/upload/drive/v3/files?upload_id={upload_id}"
+
+    def _upload_id(self, uri: str) -> str:
+        self._refresh()
+        upload_id = uri.rsplit("upload_id=", 1)[-1]
+        if upload_id not in self.uploads:
+            raise HttpError(httplib2.Response({"status": 404}), b'{"error": {"message": "Upload session not found"}}')
+        return upload_id
+
+    def _received(self, upload_id: str) -> bytes:
+        if self.root_dir:
+            # Otro proceso pudo haber agregado trozos: el disco manda
+            with open(self._upload_path(upload_id), "rb") as f:
+                return f.read()
+        return self._partials.get(upload_id, b"")
+
+    def upload_offset(self, uri: str) -> int:
+        with self._lock:
+            return len(self._received(self._upload_id(uri)))
+
+    def append_upload(self, uri: str, offset: int, chunk: bytes) -> int:
+        """Agrega un trozo en `offset` (lo ya recibido se ignora, como el servidor real)."""
+        with self._lock:
+            upload_id = self._upload_id(uri)
+            data = self._received(upload_id)
+            if offset > len(data):
+                raise HttpError(httplib2.Response({"status": 400}), b'{"error": {"message": "Invalid offset"}}')
+            data = data[:offset] + chunk
+            if self.root_dir:
+                with open(self._upload_path(upload_id), "wb") as f:
+                    f.write(data)
+            else:
+                self._partials[upload_id] = data
+            return len(data)
+
+    def finish_upload(self, uri: str) -> dict:
+        with self._lock:
+            upload_id = self._upload_id(uri)
+            data = self._received(upload_id)
+            info = self.uploads[upload_id]
+            self._record({"op": "upload_end", "id": upload_id})
+            if self.root_dir:
+                os.remove(self._upload_path(upload_id))
+            return self.put({**info["metadata"], "upload_id": upload_id}, data)
+
+    def add_permission(self, file_id: str, body: dict) -> dict:
+        with self._lock:
+            self._refresh()
+            if file_id not in self.files:
+                raise HttpError(httplib2.Response({"status": 404}), b'{"error": {"message": "File not found"}}')
+            perm = {"id": uuid.uuid4().hex, **body}
+            self._record({"op": "permission", "fileId": file_id, "permission": perm})
+            return perm
+
+    def list_permissions(self, file_id: str) -> list[dict]:
+        with self._lock:
+            self._refresh()
+            return [dict(p) for p in self.permissions.get(file_id, [])]
+
+    def query(self, q: str | None) -> list[dict]:
+        with self._lock:
+            self._refresh()
+            return [dict(f) for f in self.files.values() if _matches(f, q)]
+
+    def changes_since(self, start: int) -> tuple[list[dict], int]:
+        """(cambios desde la posición `start` del feed, nueva posición)."""
+        with self._lock:
+            self._refresh()
+            changes = []
+            for c in self.changes[start:]:
+                f = self.files.get(c["fileId"])
+                changes.append({"fileId": c["fileId"], "removed": f is None, "file": dict(f) if f else None})
+            return changes, len(self.changes)
+
+
+# Literal entre comillas simples con escapes \' y \\ (como los arma la app)
+_LITERAL = r"'((?:[^'\\]|\\.)*)'"
+_QUERY_TOKEN_RE = re.compile(_LITERAL + r"|\s+|[^\s']+")
+
+_CLAUSES = [
+    (re.compile(rf"^name\s*=\s*{_LITERAL}$"), lambda f, m: f.get("name") == _unquote(m)),
+    (re.compile(rf"^mimeType\s*=\s*{_LITERAL}$"), lambda f, m: f.get("mimeType") == _unquote(m)),
+    (re.compile(rf"^mimeType\s*!=\s*{_LITERAL}$"), lambda f, m: f.get("mimeType") != _unquote(m)),
+    (re.compile(r"^trashed\s*=\s*(true|false)$"), lambda f, m: f.get("trashed") == (m.group(1) == "true")),
+    (re.compile(rf"^{_LITERAL}\s+in\s+parents$"), lambda f, m: _unquote(m) in (f.get("parents") or [])),
+]
+
+
+def _unquote(m: re.Match) -> str:
+    return re.sub(r"\\(.)", r"\1", m.group(1))
+
+
+def _split_clauses(q: str) -> list[str]:
+    """Separa por `and` fuera de los literales: 'Smith and Sons' es un solo valor."""
+    clauses, current, pos = [], [], 0
+    while pos < len(q):
+        m = _QUERY_TOKEN_RE.match(q, pos)
+        if m is None:
+            raise ValueError(f"Literal sin cerrar en la consulta del Drive falso: {q}")
+        token = m.group(0)
+        pos = m.end()
+        if token.lower() == "and":
+            clauses.append("".join(current).strip())
+            current = []
+        else:
+            current.append(token)
+    clauses.append("".join(current).strip())
+    return clauses
+
+
+def _matches(f: dict, q: str | None) -> bool:
+    """Subconjunto de la sintaxis `q` de Drive que usa la app (cláusulas unidas con `and`)."""
+    if not q:
+        return True
+    for clause in _split_clauses(q.strip()):
+        for pattern, check in _CLAUSES:
+            m = pattern.match(clause)
+            if m:
+                if not check(f, m):
+                    return False
+                break
+        else:
+            raise ValueError(f"Cláusula no soportada por el Drive falso: {clause}")
+    return True
+
+
+def _read_media(media_body) -> bytes | None:
+    if media_body is None:
+        return None
+    size = media_body.size()
+    return media_body.getbytes(0, size) if size else b""
+
+
+class _FakeUploadHttp:
+    """El `http` de un request de subida: responde la consulta de offset (PUT bytes */total)."""
+
+    def __init__(self, store: FakeDriveStore, faults: FaultInjector):
+        self._store = store
+        self._faults = faults
+
+    def request(self, uri, method="GET", body=None, headers=None, **_):
+        self._faults()
+        with self._store._lock:
+            self._store._refresh()
+            upload_id = uri.rsplit("upload_id=", 1)[-1]
+            if upload_id not in self._store.uploads:
+                # Terminada: Drive responde 200 con el archivo
+                done = next((f for f in self._store.files.values() if f.get("upload_id") == upload_id), None)
+                if done:
+                    return httplib2.Response({"status": 200}), json.dumps(done).encode()
+                return httplib2.Response({"status": 404}), b'{"error": {"message": "Upload session not found"}}'
+            received = self._store.upload_offset(uri)
+        headers = {"status": 308}
+        if received:
+            headers["range"] = f"bytes=0-{received - 1}"
+        return httplib2.Response(headers), b""
+
+
+class _FakeUploadRequest(_FakeRequest):
+    """
+    files.create con media resumable: soporta execute(), next_chunk() y la consulta de offset
+    por `http` con los mismos atributos públicos que googleapiclient (resumable_uri,
+    resumable_progress). Tras un error, como la librería, re-sincroniza el offset solo.
+    """
+
+    def __init__(self, store: FakeDriveStore, metadata: dict, media_body, faults: FaultInjector):
+        super().__init__(lambda: store.put(metadata, _read_media(media_body)), faults)
+        self._store = store
+        self._metadata = metadata
+        self._media = media_body
+        self.http = _FakeUploadHttp(store, faults)
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self._in_error_state = False
+
+    def next_chunk(self, http=None, num_retries: int = 0):
+        total = self._media.size()
+        if self.resumable_uri is None:
+            self.resumable_uri = self._store.start_upload(self._metadata, total)
+        if self._in_error_state:
+            self.resumable_progress = self._store.upload_offset(self.resumable_uri)
+            self._in_error_state = False
+
+        try:
+            self._faults()
+        except HttpError:
+            self._in_error_state = True
+            raise
+
+        chunk = self._media.getbytes(self.resumable_progress, self._media.chunksize())
+        self.resumable_progress = self._store.append_upload(self.resumable_uri, self.resumable_progress, chunk)
+        if self.resumable_progress >= total:
+            return None, self._store.finish_upload(self.resumable_uri)
+        return MediaUploadProgress(self.resumable_progress, total), None
+
+
+class _FakeFiles:
+    def __init__(self, store: FakeDriveStore, faults: FaultInjector):
+        self._store = store
+        self._faults = faults
+
+    def list(self, q=None, pageSize=100, pageToken=None, **_):
+        def run():
+            matches = sorted(self._store.query(q), key=lambda f: f["id"])
+            start = int(pageToken or 0)
+            page = matches[start:start + pageSize]
+            res = {"files": page}
+            if start + pageSize < len(matches):
+                res["nextPageToken"] = str(start + pageSize)
+            return res
+        return _FakeRequest(run, self._faults)
+
+    def create(self, body=None, media_body=None, **_):
+        if media_body is not None and media_body.resumable():
+            return _FakeUploadRequest(self._store, body or {}, media_body, self._faults)
+        return _FakeRequest(lambda: self._store.put(body or {}, _read_media(media_body)), self._faults)
+
+
+class _FakePermissions:
+    def __init__(self, store: FakeDriveStore, faults: FaultInjector):
+        self._store = store
+        self._faults = faults
+
+    def create(self, fileId=None, body=None, **_):
+        return _FakeRequest(lambda: self._store.add_permission(fileId, body or {}), self._faults)
+
+    def list(self, fileId=None, **_):
+        return _FakeRequest(lambda: {"permissions": self._store.list_permissions(fileId)}, self._faults)
+
+
+class _FakeChanges:
+    def __init__(self, store: FakeDriveStore, faults: FaultInjector):
+        self._store = store
+        self._faults = faults
+
+    def getStartPageToken(self, **_):
+        return _FakeRequest(lambda: {"startPageToken": str(self._store.changes_since(0)[1])}, self._faults)
+
+    def list(self, pageToken=None, **_):
+        def run():
+            changes, end = self._store.changes_since(int(pageToken or 0))
+            return {"changes": changes, "newStartPageToken": str(end)}
+        return _FakeRequest(run, self._faults)
+
+
+class FakeDriveService:
+    """Imita `build("drive", "v3")` para files.list/create (con next_chunk), permissions.create/list y changes.*"""
+
+    def __init__(self, store: FakeDriveStore | None = None, faults: FaultInjector | None = None):
+        self.store = store or FakeDriveStore()
+        self.faults = faults or FaultInjector()
+
+    def files(self):
+        return _FakeFiles(self.store, self.faults)
+
+    def permissions(self):
+        return _FakePermissions(self.store, self.faults)
+
+    def changes(self):
+        return _FakeChanges(self.store, self.faults)
+
+# ==========================
+# 🔹 SHEETS
+# ==========================
+
+class FakeWorksheet:
+    """Filas en memoria o, con `csv_path`, en un CSV compartido (se lee en cada consulta)."""
+
+    def __init__(self, title: str, faults: FaultInjector, csv_path: str | None = None):
+        self.title = title
+        self.rows: list[list] = []
+        self._faults = faults
+        self._csv_path = csv_path
+        self._lock = threading.Lock()
+        if csv_path and not os.path.exists(csv_path):
+            open(csv_path, "a", encoding="utf-8").close()
+
+    def append_row(self, values, value_input_option=None, **_):
+        self.append_rows([values], value_input_option=value_input_option)
+
+    def append_rows(self, values, value_input_option=None, **_):
+        self._faults()
+        with self._lock:
+            if self._csv_path:
+                with _FileLock(self._csv_path + ".lock"):
+                    with open(self._csv_path, "a", newline="", encoding="utf-8") as f:
+                        csv.writer(f).writerows(values)
+            else:
+                self.rows.extend(list(v) for v in values)
+
+    def get_all_values(self):
+        if self._csv_path:
+            with open(self._csv_path, newline="", encoding="utf-8") as f:
+                return [[str(v) for v in r] for r in csv.reader(f)]
+        return [[str(v) for v in r] for r in self.rows]
+
+    def row_values(self, row: int):
+        rows = self.get_all_values()
+        return rows[row - 1] if 0 < row <= len(rows) else []
+
+    def col_values(self, col: int):
+        return [r[col - 1] if col <= len(r) else "" for r in self.get_all_values()]
+
+
+class FakeSpreadsheet:
+    def __init__(self, key: str, faults: FaultInjector, root_dir: str | None = None):
+        self.id = key
+        self._faults = faults
+        self._dir = os.path.join(root_dir, "sheets", key) if root_dir else None
+        self._worksheets: dict[str, FakeWorksheet] = {}
+        self._lock = threading.Lock()
+        if self._dir:
+            os.makedirs(self._dir, exist_ok=True)
+
+    def _csv_path(self, title: str) -> str | None:
+        return os.path.join(self._dir, f"{title}.csv") if self._dir else None
+
+    def worksheet(self, title: str):
+        import gspread
+        self._faults()
+        with self._lock:
+            if title not in self._worksheets:
+                # Hoja creada antes (o por otro proceso): existe si existe su CSV
+                if not (self._dir and os.path.exists(self._csv_path(title))):
+                    raise gspread.exceptions.WorksheetNotFound(title)
+                self._worksheets[title] = FakeWorksheet(title, self._faults, self._csv_path(title))
+            return self._worksheets[title]
+
+    def add_worksheet(self, title: str, rows=None, cols=None, **_):
+        self._faults()
+        with self._lock:
+            if title not in self._worksheets:
+                self._worksheets[title] = FakeWorksheet(title, self._faults, self._csv_path(title))
+            return self._worksheets[title]
+
+
+class FakeSheetsClient:
+    """Imita el cliente de gspread: open_by_key → worksheet/add_worksheet → append_row(s)."""
+
+    def __init__(self, faults: FaultInjector | None = None, root_dir: str | None = None):
+        self.faults = faults or FaultInjector()
+        self.root_dir = root_dir
+        self._spreadsheets: dict[str, FakeSpreadsheet] = {}
+        self._lock = threading.Lock()
+
+    def open_by_key(self, key: str):
+        self.faults()
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = FakeSpreadsheet(key, self.faults, self.root_dir)
+            return self._spreadsheets[key]
+
+# ==========================
+# 🔹 FÁBRICAS (una instancia por proceso)
+# ==========================
+
+_drive: FakeDriveService | None = None
+_sheets: FakeSheetsClient | None = None
+_lock = threading.Lock()
+
+
+def _faults_from_config(cfg: dict) -> FaultInjector:
+    return FaultInjector(cfg["latency_ms"], cfg["error_rate"], cfg["error_status"])
+
+
+def fake_drive_service() -> FakeDriveService:
+    global _drive
+    with _lock:
+        if _drive is None:
+            cfg = _config()
+            root = cfg["root_dir"] if cfg["backend"] == "filesystem" else None
+            _drive = FakeDriveService(FakeDriveStore(root), _faults_from_config(cfg))
+        return _drive
+
+
+def fake_sheets_client() -> FakeSheetsClient:
+    global _sheets
+    with _lock:
+        if _sheets is None:
+            cfg = _config()
+            root = cfg["root_dir"] if cfg["backend"] == "filesystem" else None
+            _sheets = FakeSheetsClient(_faults_from_config(cfg), root)
+        return _sheets
@@ -0,0 +1,269 @@
+# services/google_api.py
+#
+# Envoltura común para las llamadas a Google Drive y Google Sheets:
+#   - token bucket dimensionado a la cuota
+#   - reintentos con backoff exponencial + jitter en errores reintentables (429 / 5xx / red)
+#     solo para llamadas idempotentes; creates y appends van por call_once()
+#   - deadline por llamada (incluye los reintentos)
+#   - circuit breaker: ante una caída de Google se falla rápido en vez de colgar cada sesión
+
+import random
+import threading
+import time
+
+DEFAULTS = {
+    "drive": {
+        "requests_per_second": 10.0,
+        "burst": 20,
+        "max_retries": 5,
+        "deadline_seconds": 60.0,
+        "http_timeout": 30.0,
+        "breaker_failures": 5,
+        "breaker_reset_seconds": 30.0,
+    },
+    "sheets": {
+        "requests_per_second": 1.0,
+        "burst": 5,
+        "max_retries": 5,
+        "deadline_seconds": 30.0,
+        "http_timeout": 20.0,
+        "breaker_failures": 5,
+        "breaker_reset_seconds": 30.0,
+    },
+}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 16.0
+
+
+class CircuitOpenError(RuntimeError):
+    """El circuito está abierto: Google viene fallando y no se intenta la llamada."""
+
+
+class DeadlineExceededError(RuntimeError):
+    """Se agotó el tiempo total de la llamada (incluyendo reintentos)."""
+
+
+def settings(api: str) -> dict:
+    """Valores de [google_api.<api>] en secrets sobre los DEFAULTS."""
+    cfg = dict(DEFAULTS[api])
+    try:
+        import streamlit as st
+        cfg.update(dict(st.secrets.get("google_api", {}).get(api, {})))
+    except Exception:
+        pass
+    return cfg
+
+
+def _status_of(exc: Exception) -> int | None:
+    resp = getattr(exc, "resp", None)  # googleapiclient.errors.HttpError
+    if resp is not None and getattr(resp, "status", None):
+        return int(resp.status)
+    response = getattr(exc, "response", None)  # gspread.exceptions.APIError
+    if response is not None and getattr(response, "status_code", None):
+        return int(response.status_code)
+    return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+
+    try:
+        import httplib2
+        if isinstance(exc, httplib2.HttpLib2Error):
+            return True
+    except ImportError:
+        pass
+
+    status = _status_of(exc)
+    if status in RETRYABLE_STATUS:
+        return True
+    if status == 403:
+        return any(reason in str(exc) for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Espera un token hasta `timeout` segundos. False si no alcanzó."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """closed → open tras N fallas seguidas; tras `reset_seconds` deja pasar una prueba (half-open)."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open":
+                raise CircuitOpenError("Google API no disponible temporalmente (circuito abierto).")
+            if state == "half-open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError("Google API no disponible temporalmente (probando reconexión).")
+                self._trial_in_flight = True
+
+    def cancel_trial(self):
+        """La llamada de prueba no llegó a hacerse (p. ej. sin cuota a tiempo)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class GoogleApiClient:
+    def __init__(self, name: str, requests_per_second: float, burst: int, max_retries: int,
+                 deadline_seconds: float, http_timeout: float, breaker_failures: int,
+                 breaker_reset_seconds: float):
+        self.name = name
+        self.max_retries = int(max_retries)
+        self.deadline_seconds = float(deadline_seconds)
+        self.http_timeout = float(http_timeout)
+        self.bucket = TokenBucket(float(requests_per_second), int(burst))
+        self.breaker = CircuitBreaker(int(breaker_failures), float(breaker_reset_seconds))
+
+    def call(self, fn, *args, deadline: float | None = None, retry: bool = True, **kwargs):
+        """
+        Ejecuta `fn(*args, **kwargs)` con rate limit, reintentos, deadline y circuit breaker.
+        retry=False: rate limit y circuito, sin reintentos (llamadas no idempotentes).
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline_seconds)
+        attempt = 0
+
+        while True:
+            self.breaker.before_call()
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0 or not self.bucket.acquire(timeout=remaining):
+                self.breaker.cancel_trial()
+                raise DeadlineExceededError(f"Google {self.name}: tiempo agotado esperando cuota.")
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Error del request (404, 400...): Google responde, el circuito sigue cerrado
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if not retry:
+                    raise
+
+                attempt += 1
+                remaining = deadline_at - time.monotonic()
+                if attempt > self.max_retries or remaining <= 0:
+                    raise
+
+                backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                if backoff >= remaining:
+                    raise
+                time.sleep(backoff)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def call_once(self, fn, *args, applied, deadline: float | None = None, **kwargs):
+        """
+        Para llamadas no idempotentes (crear carpeta, permiso, hoja; agregar filas).
+        Un timeout o un 5xx no dice si Google aplicó la llamada: antes de repetirla se
+        consulta `applied()`, que retorna el resultado si ya quedó hecha o None si no.
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline_seconds)
+        attempt = 0
+
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"Google {self.name}: tiempo agotado.")
+            try:
+                return self.call(fn, *args, deadline=remaining, retry=False, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                attempt += 1
+                remaining = deadline_at - time.monotonic()
+                backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                if attempt > self.max_retries or backoff >= remaining:
+                    raise
+                time.sleep(backoff)
+
+                result = applied()
+                if result is not None:
+                    return result
+
+    def execute(self, request, deadline: float | None = None):
+        """Para requests de googleapiclient: los reintentos los hace este wrapper, no la librería."""
+        return self.call(request.execute, num_retries=0, deadline=deadline)
+
+    def execute_once(self, request, applied, deadline: float | None = None):
+        """execute() para requests no idempotentes (ver call_once)."""
+        return self.call_once(request.execute, num_retries=0, applied=applied, deadline=deadline)
+
+
+_clients: dict[str, GoogleApiClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api: str) -> GoogleApiClient:
+    """Cliente compartido por proceso (el rate limit y el circuito son globales)."""
+    with _clients_lock:
+        if api not in _clients:
+            _clients[api] = GoogleApiClient(api, **settings(api))
+        return _clients[api]
+
+
+def drive_api() -> GoogleApiClient:
+    return get_client("drive")
+
+
+def sheets_api() -> GoogleApiClient:
+    return get_client("sheets")
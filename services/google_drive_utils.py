@@ -1,21 +1,120 @@
 # services/google_drive_utils.py
 
+import json
+import os
+import threading
+
+import httplib2
 import streamlit as st
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 
+from services.google_api import drive_api
+from services import fake_google
+
 DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# ==========================
+# 🔹 POOL DE CLIENTES
+# ==========================
+# El cliente httplib2 de googleapiclient no es thread-safe: cada hilo usa el suyo,
+# construido una sola vez. Las credenciales (y su token) se comparten en el proceso.
+
+class SharedCredentials:
+    """
+    Credenciales de la cuenta de servicio compartidas entre hilos: el refresh del token
+    se hace una sola vez, bajo lock, en lugar de que cada cliente refresque por su cuenta.
+    Implementa la parte de la interfaz que usa AuthorizedHttp.
+    """
+
+    def __init__(self, credentials):
+        self._credentials = credentials
+        self._lock = threading.Lock()
+
+    def _refresh(self, request, stale_token):
+        with self._lock:
+            # Otro hilo pudo haberlo refrescado mientras esperábamos el lock
+            if self._credentials.valid and self._credentials.token != stale_token:
+                return
+            self._credentials.refresh(request)
+
+    def before_request(self, request, method, url, headers):
+        token = self._credentials.token
+        if not self._credentials.valid:
+            self._refresh(request, token)
+        self._credentials.apply(headers)
+
+    def refresh(self, request):
+        # AuthorizedHttp lo llama ante un 401: el token en uso quedó inválido
+        self._refresh(request, self._credentials.token)
+
+    @property
+    def valid(self):
+        return self._credentials.valid
+
+
+_pool_lock = threading.Lock()
+_shared_credentials: SharedCredentials | None = None
+_local = threading.local()
+
+
+def _credentials() -> SharedCredentials:
+    global _shared_credentials
+    with _pool_lock:
+        if _shared_credentials is None:
+            sa_info = dict(st.secrets['google_drive_credentials'])
+            _shared_credentials = SharedCredentials(
+                service_account.Credentials.from_service_account_info(sa_info, scopes=DRIVE_SCOPES)
+            )
+        return _shared_credentials
+
+
 def init_drive():
-    sa_info = dict(st.secrets['google_drive_credentials'])
-    credentials = service_account.Credentials.from_service_account_info(sa_info, scopes=DRIVE_SCOPES)
-    service = build("drive", "v3", credentials=credentials)
+    """
+    Cliente de Drive del hilo actual: se construye la primera vez que el hilo lo pide
+    y se reutiliza después. No compartir el objeto devuelto con otros hilos.
+    """
+    # Backend falso (memory / filesystem) para pruebas y carga sin credenciales
+    if fake_google.is_fake():
+        return fake_google.fake_drive_service()
+
+    service = getattr(_local, "service", None)
+    if service is None:
+        # Timeout de socket por request; el deadline total y los reintentos los maneja drive_api()
+        http = AuthorizedHttp(_credentials(), http=httplib2.Http(timeout=drive_api().http_timeout))
+        service = build("drive", "v3", http=http, cache_discovery=False)
+        _local.service = service
     return service
 
+
 from googleapiclient.errors import HttpError
 
+
+def _drive_literal(value: str) -> str:
+    """Escapa un valor para ponerlo entre comillas simples en una consulta `q` de Drive."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _find_folder(service, folder_name: str, base_folder_id: str) -> str | None:
+    query = (
+        f"name = '{_drive_literal(folder_name)}' and mimeType = 'application/vnd.google-apps.folder' "
+        f"and trashed = false and '{base_folder_id}' in parents"
+    )
+    res = drive_api().execute(service.files().list(
+        q=query,
+        corpora="allDrives",
+        includeItemsFromAllDrives=True,
+        supportsAllDrives=True,
+        fields="files(id, name)",
+        pageSize=5,
+    ))
+    existing_folders = res.get("files", [])
+    return existing_folders[0]["id"] if existing_folders else None
+
+
 def find_or_create_folder(
     service,
     folder_name: str,
@@ -39,24 +138,10 @@ def find_or_create_folder(
         folder_name = folder_name.strip()
 
         # 2️⃣ Buscar la subcarpeta dentro de la carpeta base
-        query = (
-            f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' "
-            f"and trashed = false and '{base_folder_id}' in parents"
-        )
-
-        res = service.files().list(
-            q=query,
-            corpora="allDrives",
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
-            fields="files(id, name)",
-            pageSize=5,
-        ).execute()
-
-        existing_folders = res.get("files", [])
-        if existing_folders:
+        existing_id = _find_folder(service, folder_name, base_folder_id)
+        if existing_id:
             # ✅ Ya existe la carpeta del cliente/proveedor
-            return existing_folders[0]["id"]
+            return existing_id
 
         # 3️⃣ Crear la carpeta si no existe
         metadata = {
@@ -65,11 +150,16 @@ def find_or_create_folder(
             "parents": [base_folder_id],
         }
 
-        folder = service.files().create(
+        def created():
+            # Un create que "falló" por timeout pudo haber creado la carpeta
+            folder_id = _find_folder(service, folder_name, base_folder_id)
+            return {"id": folder_id} if folder_id else None
+
+        folder = drive_api().execute_once(service.files().create(
             body=metadata,
             supportsAllDrives=True,
             fields="id"
-        ).execute()
+        ), applied=created)
 
         return folder["id"]
 
@@ -77,26 +167,93 @@ def find_or_create_folder(
         raise RuntimeError(f"Error buscando/creando carpeta en Drive: {e}")
 
 
-def upload_to_drive(service, folder_id: str, file_path: str, file_name: str) -> str:
+# Drive exige trozos múltiplos de 256 KiB (salvo el último)
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_MB = 4
+
+
+def upload_chunk_size() -> int:
+    """Tamaño de trozo en bytes: [drive] upload_chunk_mb o DRIVE_UPLOAD_CHUNK_MB (por defecto 4 MB)."""
+    try:
+        mb = float(st.secrets["drive"].get("upload_chunk_mb") or DEFAULT_CHUNK_MB)
+    except Exception:
+        mb = float(os.getenv("DRIVE_UPLOAD_CHUNK_MB", DEFAULT_CHUNK_MB))
+    size = int(mb * 1024 * 1024) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT
+    return max(size, CHUNK_ALIGNMENT)
+
+
+def _next_chunk(request):
+    # Tras un error, la librería misma consulta al servidor el offset antes del siguiente trozo
+    return request.next_chunk(num_retries=0)
+
+
+def _query_upload_progress(request, total_bytes: int):
+    """
+    Pregunta a Drive cuántos bytes tiene una sesión de subida (PUT vacío con
+    Content-Range: bytes */total). Retorna (bytes_recibidos, archivo), con archivo != None
+    si la subida ya había terminado. 404/410: la sesión venció (HttpError).
+    """
+    resp, content = request.http.request(
+        request.resumable_uri, method="PUT",
+        headers={"Content-Length": "0", "Content-Range": f"bytes */{total_bytes}"},
+    )
+    if resp.status in (200, 201):
+        return total_bytes, json.loads(content)
+    if resp.status == 308:
+        # Range: bytes=0-N (sin el header: no llegó nada)
+        received = resp.get("range")
+        return (int(received.rsplit("-", 1)[1]) + 1 if received else 0), None
+    raise HttpError(resp, content, uri=request.resumable_uri)
+
+
+def upload_to_drive(service, folder_id: str, file_path: str, file_name: str, *,
+                    chunk_size: int | None = None, resumable_uri: str | None = None,
+                    bytes_sent: int = 0, on_chunk=None) -> str:
+    """
+    Sube `file_path` por trozos (subida reanudable de Drive).
+    - resumable_uri: retoma una subida interrumpida en vez de empezar de cero (el offset
+      se le pregunta al servidor; bytes_sent queda solo como referencia del llamador).
+    - on_chunk(resumable_uri, bytes_sent, total_bytes): se llama tras cada trozo confirmado
+      (para persistir el avance y mostrar progreso).
+    """
     try:
-        media = MediaFileUpload(file_path, mimetype="application/pdf", resumable=True)
+        media = MediaFileUpload(
+            file_path, mimetype="application/pdf",
+            chunksize=chunk_size or upload_chunk_size(), resumable=True
+        )
         metadata = {"name": file_name, "parents": [folder_id]}
-        file = service.files().create(
+        request = service.files().create(
             body=metadata,
             media_body=media,
             supportsAllDrives=True,
             fields="id, webViewLink"
-        ).execute()
+        )
+        file = None
+        try:
+            if resumable_uri:
+                # Retomar: el servidor dice desde qué byte continuar (bytes_sent puede ir atrás)
+                request.resumable_uri = resumable_uri
+                request.resumable_progress, file = drive_api().call(
+                    _query_upload_progress, request, media.size()
+                )
+
+            while file is None:
+                status, file = drive_api().call(_next_chunk, request)
+                if on_chunk:
+                    sent = media.size() if file is not None else status.resumable_progress
+                    on_chunk(request.resumable_uri, sent, media.size())
+        except HttpError as e:
+            if resumable_uri and e.resp.status in (404, 410):
+                # La sesión venció (Drive la guarda alrededor de una semana): de cero
+                return upload_to_drive(service, folder_id, file_path, file_name,
+                                       chunk_size=chunk_size, on_chunk=on_chunk)
+            raise
 
         file_id = file["id"]
 
         # Dar permiso de lectura por enlace
         try:
-            service.permissions().create(
-                fileId=file_id,
-                supportsAllDrives=True,
-                body={"type": "anyone", "role": "reader"},
-            ).execute()
+            _share_with_link(service, file_id)
         except HttpError:
             pass
 
@@ -104,3 +261,102 @@ def upload_to_drive(service, folder_id: str, file_path: str, file_name: str) ->
 
     except HttpError as e:
         raise RuntimeError(f"Error subiendo archivo a Drive: {e}")
+
+
+def _share_with_link(service, file_id: str):
+    """Permiso "cualquiera con el enlace puede leer"; ante un error de red revisa si ya quedó antes de repetir."""
+    def shared():
+        res = drive_api().execute(service.permissions().list(
+            fileId=file_id,
+            supportsAllDrives=True,
+            fields="permissions(id, type, role)",
+        ))
+        for perm in res.get("permissions", []):
+            if perm.get("type") == "anyone" and perm.get("role") == "reader":
+                return perm
+        return None
+
+    return drive_api().execute_once(service.permissions().create(
+        fileId=file_id,
+        supportsAllDrives=True,
+        body={"type": "anyone", "role": "reader"},
+    ), applied=shared)
+
+
+# ==========================
+# 🔹 LISTADOS Y FEED DE CAMBIOS
+# ==========================
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+DRIVE_FILE_FIELDS = "id, name, mimeType, parents, webViewLink, modifiedTime, trashed"
+
+
+def list_folder_children(service, folder_id: str):
+    """
+    Itera (con paginación) los archivos y carpetas directamente dentro de `folder_id`.
+    Solo se usa en el listado completo inicial del sync.
+    """
+    page_token = None
+    try:
+        while True:
+            res = drive_api().execute(service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                corpora="allDrives",
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                fields=f"nextPageToken, files({DRIVE_FILE_FIELDS})",
+                pageSize=1000,
+                pageToken=page_token,
+            ))
+
+            yield from res.get("files", [])
+
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                break
+
+    except HttpError as e:
+        raise RuntimeError(f"Error listando carpeta en Drive: {e}")
+
+
+def get_changes_start_token(service, drive_id: str | None = None) -> str:
+    """Token de inicio del feed de cambios (se pide ANTES del listado completo)."""
+    try:
+        kwargs = {"supportsAllDrives": True}
+        if drive_id:
+            kwargs["driveId"] = drive_id
+        res = drive_api().execute(service.changes().getStartPageToken(**kwargs))
+        return res["startPageToken"]
+    except HttpError as e:
+        raise RuntimeError(f"Error obteniendo token de cambios de Drive: {e}")
+
+
+def list_changes(service, page_token: str, drive_id: str | None = None):
+    """
+    Lee el feed incremental de cambios desde `page_token`.
+    Retorna (cambios, nuevo_token_de_inicio).
+    """
+    changes = []
+    try:
+        while True:
+            kwargs = {
+                "pageToken": page_token,
+                "includeItemsFromAllDrives": True,
+                "supportsAllDrives": True,
+                "includeRemoved": True,
+                "spaces": "drive",
+                "pageSize": 1000,
+                "fields": f"nextPageToken, newStartPageToken, changes(fileId, removed, file({DRIVE_FILE_FIELDS}))",
+            }
+            if drive_id:
+                kwargs["driveId"] = drive_id
+
+            res = drive_api().execute(service.changes().list(**kwargs))
+            changes.extend(res.get("changes", []))
+
+            if res.get("newStartPageToken"):
+                return changes, res["newStartPageToken"]
+            page_token = res["nextPageToken"]
+
+    except HttpError as e:
+        raise RuntimeError(f"Error leyendo cambios de Drive: {e}")
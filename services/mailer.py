@@ -0,0 +1,152 @@
+# services/mailer.py
+
+import os
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+
+def _smtp_settings() -> dict:
+    """Lee [smtp] de los secrets de Streamlit o, si no existen, de variables de entorno."""
+    try:
+        import streamlit as st
+        cfg = dict(st.secrets["smtp"])
+    except Exception:
+        cfg = {
+            "host": os.getenv("SMTP_HOST"),
+            "port": os.getenv("SMTP_PORT"),
+            "username": os.getenv("SMTP_USER"),
+            "password": os.getenv("SMTP_PASSWORD"),
+            "starttls": os.getenv("SMTP_STARTTLS"),
+            "sender": os.getenv("SMTP_FROM"),
+            "pool_size": os.getenv("SMTP_POOL_SIZE"),
+        }
+
+    if not cfg.get("host"):
+        raise ValueError("SMTP no está configurado. Revisa [smtp] en secrets o SMTP_HOST en el entorno.")
+
+    return {
+        "host": cfg["host"],
+        "port": int(cfg.get("port") or 25),
+        "username": cfg.get("username") or None,
+        "password": cfg.get("password") or None,
+        "starttls": str(cfg.get("starttls") or "").lower() in ("1", "true", "yes"),
+        "sender": cfg.get("sender") or "compliance@tradingsolutions.com",
+        "pool_size": int(cfg.get("pool_size") or 2),
+    }
+
+
+class SMTPPool:
+    """
+    Pool pequeño de conexiones SMTP reutilizables.
+    Evita abrir una conexión (y hacer STARTTLS/LOGIN) por cada correo.
+    """
+
+    def __init__(self, host: str, port: int = 25, username: str | None = None,
+                 password: str | None = None, starttls: bool = False,
+                 sender: str = "", pool_size: int = 2, timeout: int = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        return conn
+
+    @staticmethod
+    def _is_alive(conn: smtplib.SMTP) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+            if not self._is_alive(conn):
+                conn = self._connect()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            conn.close()
+            raise
+        except smtplib.SMTPException:
+            # Rechazo del servidor (p. ej. SMTPRecipientsRefused por una dirección inválida):
+            # la conexión sigue sana; RSET descarta la transacción a medias y vuelve al pool
+            try:
+                conn.rset()
+            except (smtplib.SMTPException, OSError):
+                conn.close()
+            else:
+                self._release(conn)
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        else:
+            self._release(conn)
+
+    def _release(self, conn: smtplib.SMTP):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                conn.close()
+
+    def send(self, to: str | list[str], subject: str, body: str):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = to if isinstance(to, str) else ", ".join(to)
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        try:
+            with self.connection() as conn:
+                conn.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # La conexión reutilizada murió entre el NOOP y el envío: un reintento
+            with self.connection() as conn:
+                conn.send_message(msg)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+_pool: SMTPPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_mailer() -> SMTPPool:
+    """Pool compartido por todo el proceso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(**_smtp_settings())
+        return _pool
@@ -1,65 +1,97 @@
 import gspread
 from google.oauth2.service_account import Credentials
 import streamlit as st
-from googleapiclient.discovery import build
 from datetime import datetime
 import pytz
 
-credentials = Credentials.from_service_account_info(
-    st.secrets["google_sheets_credentials"],
-    scopes=[
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-)
+from services.google_api import sheets_api
+from services import fake_google
 
-client_gcp = gspread.authorize(credentials)
-sheets_service = build("sheets", "v4", credentials=credentials)
-COMPLIANCE_ID = st.secrets["general"]["compliance_id"]
 colombia_timezone = pytz.timezone('America/Bogota')
 
+_client_gcp = None
+
+
+def get_sheets_client():
+    """Cliente de gspread (o el falso si google_backend lo indica), creado al primer uso."""
+    global _client_gcp
+    if _client_gcp is None:
+        if fake_google.is_fake():
+            _client_gcp = fake_google.fake_sheets_client()
+        else:
+            credentials = Credentials.from_service_account_info(
+                st.secrets["google_sheets_credentials"],
+                scopes=[
+                    "https://www.googleapis.com/auth/spreadsheets",
+                    "https://www.googleapis.com/auth/drive",
+                ]
+            )
+            _client_gcp = gspread.authorize(credentials)
+            if hasattr(_client_gcp, "set_timeout"):
+                _client_gcp.set_timeout(sheets_api().http_timeout)
+    return _client_gcp
+
+
+def get_compliance_id() -> str:
+    if fake_google.is_fake():
+        try:
+            return st.secrets["general"]["compliance_id"]
+        except Exception:
+            return "fake-compliance"
+    return st.secrets["general"]["compliance_id"]
+
+def _existing_worksheet(sheet, sheet_name: str):
+    try:
+        return sheets_api().call(sheet.worksheet, sheet_name)
+    except gspread.exceptions.WorksheetNotFound:
+        return None
+
+
 def get_or_create_worksheet(sheet_name: str, headers: list = None):
     try:
-        sheet = client_gcp.open_by_key(COMPLIANCE_ID)
+        sheet = sheets_api().call(get_sheets_client().open_by_key, get_compliance_id())
         try:
-            worksheet = sheet.worksheet(sheet_name)
+            worksheet = sheets_api().call(sheet.worksheet, sheet_name)
         except gspread.exceptions.WorksheetNotFound:
-            worksheet = sheet.add_worksheet(title=sheet_name, rows="1000", cols="30")
+            worksheet = sheets_api().call_once(
+                sheet.add_worksheet, title=sheet_name, rows="1000", cols="30",
+                applied=lambda: _existing_worksheet(sheet, sheet_name),
+            )
             if headers:
-                worksheet.append_row(headers)
+                sheets_api().call_once(
+                    worksheet.append_row, headers,
+                    applied=lambda: sheets_api().call(worksheet.row_values, 1) or None,
+                )
             st.warning(f"Worksheet '{sheet_name}' was created.")
         return worksheet
     except gspread.exceptions.SpreadsheetNotFound:
         st.error("No se encontró la hoja de cálculo.")
         return None
 
-def save_request(request_info: dict):
+REQUEST_HEADERS = [
+    "Fecha",
+    "Solicitante",
+    "Tipo de solicitud",
+    "Nombre Compañía",
+    "Correo",
+    "Cuenta Trading",
+    "País / Ubicación",
+    "Idioma",
+    "Frecuencia Recordatorio",
+    "Tipo de Operación",
+    "Commodity",
+    "Aduana",
+    "Puerto",
+    "Línea Naviera",
+    "ID Solicitud",
+]
 
-    headers = [
-        "Fecha",
-        "Solicitante",
-        "Tipo de solicitud",
-        "Nombre Compañía",
-        "Correo",
-        "Cuenta Trading",
-        "País / Ubicación",
-        "Idioma",
-        "Frecuencia Recordatorio",
-        "Tipo de Operación",
-        "Commodity",
-        "Aduana",
-        "Puerto",
-        "Línea Naviera"
-    ]
+# Columna (1-based) con el ID: permite saber si un append que dio timeout sí quedó
+REQUEST_ID_COLUMN = len(REQUEST_HEADERS)
 
-    ws = get_or_create_worksheet("Solicitudes de Creacion", headers)
-    if not ws:
-        return
-
-    colombia_timezone = pytz.timezone("America/Bogota")
-    fecha_creacion = datetime.now(pytz.utc).astimezone(colombia_timezone).strftime("%Y-%m-%d %H:%M:%S")
 
-    row = [
+def _request_row(request_info: dict, fecha_creacion: str) -> list:
+    return [
         fecha_creacion,
         request_info.get("requested_by", ""),                # Comercial o solicitante
         request_info.get("tipo_solicitud", ""),              # Cliente / Proveedor
@@ -73,8 +105,52 @@ def save_request(request_info: dict):
         request_info.get("commodity", ""),                    # Producto
         request_info.get("aduana", ""),                       # Sí/No + detalle de aduana
         request_info.get("puerto", ""),                       # Sí/No + detalle de puerto
-        request_info.get("linea_naviera", "")                 # Sí/No + detalle de línea naviera
+        request_info.get("linea_naviera", ""),                # Sí/No + detalle de línea naviera
+        request_info.get("request_id", ""),                   # ID en la base
     ]
 
+
+def _now_colombia() -> str:
+    return datetime.now(pytz.utc).astimezone(colombia_timezone).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _append_request_rows(ws, rows: list[list]):
+    """
+    append_rows sin duplicar: un append es atómico, así que si el de la primera fila
+    ya figura por ID en la hoja, el lote completo quedó escrito y no se repite.
+    Sin ID no hay cómo comprobarlo: se intenta una sola vez.
+    """
+    first_id = str(rows[0][REQUEST_ID_COLUMN - 1])
+    if not first_id:
+        return sheets_api().call(ws.append_rows, rows, value_input_option="USER_ENTERED", retry=False)
+
+    def appended():
+        ids = sheets_api().call(ws.col_values, REQUEST_ID_COLUMN)
+        return True if first_id in ids else None
+
+    return sheets_api().call_once(ws.append_rows, rows, value_input_option="USER_ENTERED", applied=appended)
+
+
+def save_request(request_info: dict):
+    ws = get_or_create_worksheet("Solicitudes de Creacion", REQUEST_HEADERS)
+    if not ws:
+        return
+
+    row = _request_row(request_info, _now_colombia())
+
     # 🔹 Agregar la fila
-    ws.append_row(row, value_input_option="USER_ENTERED")
+    _append_request_rows(ws, [row])
+
+
+def save_requests(requests_info: list[dict]):
+    """Varias solicitudes en una sola llamada a la API (append_rows)."""
+    if not requests_info:
+        return
+
+    ws = get_or_create_worksheet("Solicitudes de Creacion", REQUEST_HEADERS)
+    if not ws:
+        return
+
+    fecha_creacion = _now_colombia()
+    rows = [_request_row(info, fecha_creacion) for info in requests_info]
+    _append_request_rows(ws, rows)
@@ -0,0 +1,249 @@
+# services/sql_profiler.py
+#
+# Perfil de SQL por corrida de Streamlit (rerun completo o fragmento; panel lateral para compliance).
+# Apagado por defecto: se activa con `sql_profiler = true` en secrets o SQL_PROFILER=1.
+# Si está apagado no se registra ningún hook, así que el costo es nulo.
+
+import os
+import re
+import time
+
+import psycopg2.extensions
+
+REPEATED_QUERY_THRESHOLD = 3
+SLOWEST_SHOWN = 10
+PANEL_REFRESH_SECONDS = 5
+
+# En st.session_state: {"main": corrida, "fragments": {fragment_id: corrida}}
+# corrida = {"token": ..., "records": [...], "at": epoch}
+_STATE_KEY = "_sql_profiler_runs"
+
+_enabled: bool | None = None
+
+
+def is_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        try:
+            import streamlit as st
+            value = st.secrets.get("sql_profiler", False)
+        except Exception:
+            value = os.getenv("SQL_PROFILER", "")
+        _enabled = str(value).lower() in ("1", "true", "yes")
+    return _enabled
+
+
+def _script_run_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+def _run_token(ctx):
+    """
+    Identifica la corrida actual (completa o de un fragmento): ScriptRunContext.reset()
+    crea un set nuevo de widget_ids_this_run al empezar cada una, en el hilo que sea.
+    """
+    return getattr(ctx, "widget_ids_this_run", ctx)
+
+
+def _new_run(token) -> dict:
+    return {"token": token, "records": [], "at": time.time()}
+
+
+def _record(source: str, statement: str, duration_ms: float, rows: int | None):
+    ctx = _script_run_ctx()
+    if ctx is None:
+        # Fuera de Streamlit (workers, scripts): no hay panel
+        return
+    import streamlit as st
+    state = st.session_state.setdefault(_STATE_KEY, {"main": None, "fragments": {}})
+    token = _run_token(ctx)
+    fragment_id = getattr(ctx, "current_fragment_id", None)
+    if fragment_id:
+        run = state["fragments"].get(fragment_id)
+        if run is None or run["token"] is not token:
+            run = state["fragments"][fragment_id] = _new_run(token)
+    else:
+        run = state["main"]
+        if run is None or run["token"] is not token:
+            run = state["main"] = _new_run(token)
+    run["records"].append({
+        "source": source,
+        "statement": statement,
+        "duration_ms": duration_ms,
+        "rows": rows if rows is not None and rows >= 0 else None,
+    })
+
+
+def start_rerun():
+    """Se llama al inicio de cada rerun completo de app.py: reinicia lo registrado en la sesión."""
+    if not is_enabled():
+        return
+    ctx = _script_run_ctx()
+    if ctx is not None:
+        import streamlit as st
+        st.session_state[_STATE_KEY] = {"main": _new_run(_run_token(ctx)), "fragments": {}}
+
+
+def get_runs() -> dict:
+    """
+    Corridas registradas en esta sesión: {etiqueta: registros}. El rerun completo incluye
+    los fragmentos que corrieron dentro de él; cada fragmento aparece además con su
+    última corrida propia (los `run_every` y los bloques de carga se re-ejecutan solos).
+    """
+    ctx = _script_run_ctx()
+    if ctx is None:
+        return {}
+    import streamlit as st
+    state = st.session_state.get(_STATE_KEY) or {"main": None, "fragments": {}}
+    main = state["main"]
+    runs = {}
+    if main is not None:
+        runs["Rerun completo"] = main["records"] + [
+            r for f in state["fragments"].values() if f["token"] is main["token"] for r in f["records"]
+        ]
+    fragments = sorted(state["fragments"].items(), key=lambda kv: kv[1]["at"], reverse=True)
+    for fragment_id, run in fragments:
+        if main is None or run["token"] is not main["token"]:
+            label = f"Fragmento {fragment_id[:8]} ({time.strftime('%H:%M:%S', time.localtime(run['at']))})"
+            runs[label] = run["records"]
+    return runs
+
+# ==========================
+# 🔹 HOOKS
+# ==========================
+
+def install(engine):
+    """Registra los eventos de SQLAlchemy en `engine` (solo si el perfil está activo)."""
+    if not is_enabled():
+        return
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["_profiler_start"].pop()
+        _record("sqlalchemy", statement, (time.perf_counter() - started) * 1000, cursor.rowcount)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # Sin after_cursor_execute: sacar el inicio pendiente para no desfasar las
+        # duraciones siguientes en esta conexión del pool
+        conn = exception_context.connection
+        starts = conn.info.get("_profiler_start") if conn is not None else None
+        if starts:
+            starts.pop()
+
+
+class ProfilingCursor(psycopg2.extensions.cursor):
+    """Cursor psycopg2 que registra cada sentencia (camino crudo de clientes.py)."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record("psycopg2", query if isinstance(query, str) else str(query),
+                    (time.perf_counter() - started) * 1000, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record("psycopg2", query if isinstance(query, str) else str(query),
+                    (time.perf_counter() - started) * 1000, self.rowcount)
+
+
+def cursor_factory():
+    """Para psycopg2.connect(cursor_factory=...): None si el perfil está apagado."""
+    return ProfilingCursor if is_enabled() else None
+
+# ==========================
+# 🔹 PANEL
+# ==========================
+
+def _normalize(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def summarize(records: list[dict]) -> dict:
+    groups: dict[str, dict] = {}
+    for r in records:
+        key = _normalize(r["statement"])
+        g = groups.setdefault(key, {"statement": key, "count": 0, "total_ms": 0.0})
+        g["count"] += 1
+        g["total_ms"] += r["duration_ms"]
+
+    repeated = sorted(
+        (g for g in groups.values() if g["count"] >= REPEATED_QUERY_THRESHOLD),
+        key=lambda g: g["count"], reverse=True
+    )
+    slowest = sorted(records, key=lambda r: r["duration_ms"], reverse=True)[:SLOWEST_SHOWN]
+
+    return {
+        "query_count": len(records),
+        "total_ms": sum(r["duration_ms"] for r in records),
+        "slowest": slowest,
+        "repeated": repeated,
+    }
+
+
+def render_panel():
+    """Panel en el sidebar con las queries del rerun actual y de los fragmentos que se re-ejecutan solos."""
+    if not is_enabled():
+        return
+
+    import streamlit as st
+
+    with st.sidebar:
+        if not st.checkbox("🔍 Perfil SQL", value=False, key="sql_profiler_panel"):
+            return
+        _panel_fragment()()
+
+
+_panel = None
+
+
+def _panel_fragment():
+    """El panel es un fragmento: se refresca solo y muestra las corridas de fragmentos posteriores."""
+    global _panel
+    if _panel is None:
+        import streamlit as st
+        _panel = st.fragment(run_every=PANEL_REFRESH_SECONDS)(_render_summary)
+    return _panel
+
+
+def _render_summary():
+    import streamlit as st
+    import pandas as pd
+
+    runs = get_runs()
+    if not runs:
+        st.caption("Sin queries registradas.")
+        return
+    label = st.selectbox("Corrida", list(runs), key="sql_profiler_run")
+    summary = summarize(runs.get(label, []))
+    col1, col2 = st.columns(2)
+    col1.metric("Queries", summary["query_count"])
+    col2.metric("Tiempo BD", f"{summary['total_ms']:.1f} ms")
+
+    if summary["repeated"]:
+        st.warning(f"⚠️ {len(summary['repeated'])} sentencia(s) repetida(s) (posible N+1)")
+        st.dataframe(
+            pd.DataFrame(summary["repeated"]).round({"total_ms": 2}),
+            hide_index=True, use_container_width=True
+        )
+
+    if summary["slowest"]:
+        st.caption("Sentencias más lentas")
+        df = pd.DataFrame(summary["slowest"])
+        df["statement"] = df["statement"].map(_normalize)
+        st.dataframe(df.round({"duration_ms": 2}), hide_index=True, use_container_width=True)
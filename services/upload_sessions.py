@@ -0,0 +1,146 @@
+# services/upload_sessions.py
+#
+# Subidas a Drive que sobreviven fallos:
+#   1. El archivo se guarda en un directorio de staging estable (no en un temporal que se pierde).
+#   2. Cada trozo confirmado actualiza upload_sessions (resumable_uri + bytes_sent).
+#   3. Si la subida se corta (red, reinicio del proceso), volver a guardar el mismo archivo
+#      retoma desde el último trozo; si ya había terminado, se reutiliza el enlace.
+#   4. El archivo en staging se borra recién cuando el trabajo que lo registra hizo commit
+#      y ningún otro trabajo pendiente usa la misma llave (release_staged_file).
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from database.db import SessionLocal
+from database.crud.jobs import upload_key_in_use
+from database.crud.uploads import (
+    get_upload_session,
+    get_or_create_upload_session,
+    save_upload_progress,
+    finish_upload_session,
+    get_stale_upload_sessions,
+    delete_upload_sessions,
+)
+from services.google_drive_utils import upload_to_drive
+
+log = logging.getLogger("upload_sessions")
+
+
+def staging_dir() -> str:
+    """[drive] staging_dir o UPLOAD_STAGING_DIR; por defecto <tmp>/compliance_uploads."""
+    try:
+        import streamlit as st
+        path = st.secrets["drive"].get("staging_dir")
+    except Exception:
+        path = None
+    path = path or os.getenv("UPLOAD_STAGING_DIR") or os.path.join(tempfile.gettempdir(), "compliance_uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def staged_path(upload_key: str) -> str:
+    """Ruta del archivo en staging de este proceso (app y workers comparten el directorio)."""
+    return os.path.join(staging_dir(), f"{upload_key}.pdf")
+
+
+def stage_file(content: bytes, file_name: str, destination: str) -> tuple[str, str]:
+    """
+    Guarda el contenido en staging y devuelve (ruta, upload_key).
+    La llave depende de destino (ID de carpeta o "<tipo>:<empresa>") + nombre + contenido:
+    el mismo archivo siempre cae en la misma sesión de subida.
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+    upload_key = hashlib.sha256(f"{destination}\0{file_name}\0{content_hash}".encode()).hexdigest()
+    path = staged_path(upload_key)
+    if not os.path.exists(path):
+        tmp = f"{path}.part"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    return path, upload_key
+
+
+def upload_staged_file(service, folder_id: str, staged_path: str, file_name: str, upload_key: str,
+                       on_progress=None) -> str:
+    """
+    Sube (o retoma) un archivo en staging y devuelve el webViewLink.
+    on_progress(bytes_sent, total_bytes) se llama al retomar y tras cada trozo.
+    """
+    total = os.path.getsize(staged_path)
+    with SessionLocal() as db:
+        state = get_or_create_upload_session(db, upload_key, folder_id, file_name, staged_path, total)
+        db.commit()
+
+    if state["status"] == "done" and state["drive_link"]:
+        if on_progress:
+            on_progress(total, total)
+        return state["drive_link"]
+
+    if state["resumable_uri"]:
+        log.info("Retomando subida de %s desde el byte %d de %d", file_name, state["bytes_sent"], total)
+    if on_progress:
+        on_progress(state["bytes_sent"] if state["resumable_uri"] else 0, total)
+
+    def on_chunk(resumable_uri, bytes_sent, total_bytes):
+        with SessionLocal() as db:
+            save_upload_progress(db, state["id"], resumable_uri, bytes_sent)
+            db.commit()
+        if on_progress:
+            on_progress(bytes_sent, total_bytes)
+
+    drive_link = upload_to_drive(
+        service, folder_id, staged_path, file_name,
+        resumable_uri=state["resumable_uri"],
+        bytes_sent=state["bytes_sent"],
+        on_chunk=on_chunk,
+    )
+
+    with SessionLocal() as db:
+        finish_upload_session(db, state["id"], drive_link)
+        db.commit()
+    return drive_link
+
+
+def finished_upload_link(upload_key: str) -> str | None:
+    """webViewLink si la subida de `upload_key` ya terminó (no hace falta el archivo en staging)."""
+    with SessionLocal() as db:
+        state = get_upload_session(db, upload_key)
+    if state and state["status"] == "done" and state["drive_link"]:
+        return state["drive_link"]
+    return None
+
+
+def release_staged_file(upload_key: str, job_id: int) -> bool:
+    """
+    Borra el archivo en staging una vez registrado el documento del trabajo `job_id`,
+    salvo que otro trabajo pendiente use la misma llave (el mismo PDF con otro tipo de
+    documento, por ejemplo). Retorna True si lo borró.
+    """
+    with SessionLocal() as db:
+        if upload_key_in_use(db, upload_key, job_id):
+            return False
+    _remove(staged_path(upload_key))
+    return True
+
+
+def purge_stale_uploads(older_than_hours: int = 24 * 8) -> int:
+    """
+    Borra sesiones (y archivos en staging) sin avance reciente. Por defecto 8 días:
+    Drive ya no acepta un resumable_uri de más de una semana.
+    """
+    with SessionLocal() as db:
+        stale = get_stale_upload_sessions(db, older_than_hours)
+        for s in stale:
+            _remove(s["staged_path"])
+        delete_upload_sessions(db, [s["id"] for s in stale])
+        db.commit()
+    return len(stale)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
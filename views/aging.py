@@ -0,0 +1,4 @@
+from forms.aging_report import show_aging_report
+
+def show():
+    show_aging_report()
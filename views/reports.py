@@ -0,0 +1,4 @@
+from forms.audit_reports import show_audit_reports
+
+def show():
+    show_audit_reports()
@@ -0,0 +1,61 @@
+# workers/archive.py
+#
+# Mueve solicitudes cerradas (todos los bloques aprobados) a las tablas `archive.*`.
+# Cada lote es una transacción: o se mueve la solicitud completa con sus hijas, o nada.
+#
+#   python -m workers.archive --older-than-days 365 --batch-size 200
+
+import argparse
+import logging
+
+from database.db import SessionLocal
+from database.crud.archive import find_archivable_request_ids, archive_requests
+
+log = logging.getLogger("archive")
+
+
+def run(older_than_days: int, batch_size: int, max_batches: int = 0) -> int:
+    total = 0
+    after_id = 0
+    batches = 0
+    session = SessionLocal()
+    try:
+        while True:
+            ids = find_archivable_request_ids(session, older_than_days, after_id, batch_size)
+            if not ids:
+                session.commit()
+                break
+
+            moved = archive_requests(session, ids)
+            session.commit()
+
+            total += len(ids)
+            after_id = ids[-1]
+            batches += 1
+            log.info("Lote %d: %d solicitud(es) archivada(s) %s", batches, len(ids), moved)
+
+            if max_batches and batches >= max_batches:
+                break
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    log.info("Total archivado: %d solicitud(es)", total)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivado de solicitudes cerradas")
+    parser.add_argument("--older-than-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--max-batches", type=int, default=0, help="0 = sin límite")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    run(args.older_than_days, args.batch_size, args.max_batches)
+
+
+if __name__ == "__main__":
+    main()
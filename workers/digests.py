@@ -0,0 +1,127 @@
+# workers/digests.py
+#
+# Un correo por solicitante (requests.user_email) con los cambios de estado y los
+# documentos nuevos de sus solicitudes desde la última corrida.
+#
+#   python -m workers.digests                 # una corrida
+#   python -m workers.digests --loop 3600     # cada hora
+
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+from database.db import SessionLocal
+from database.crud.digests import (
+    get_last_run,
+    save_last_run,
+    get_horizon,
+    get_retries,
+    save_retry,
+    delete_retry,
+    get_changes_by_requester,
+)
+from services.mailer import get_mailer
+
+log = logging.getLogger("digests")
+
+JOB_NAME = "requester_digest"
+FIRST_RUN_LOOKBACK = timedelta(days=1)
+# Margen para transacciones en curso: su changed_at es la hora en que EMPEZARON
+HORIZON_LAG = timedelta(minutes=5)
+MAX_SEND_ATTEMPTS = 10
+
+
+def render_digest(requests: dict) -> tuple[str, str]:
+    lines = ["Hola,", "", "Estos son los cambios en tus solicitudes de creación desde el último resumen:", ""]
+    for request_id, data in sorted(requests.items()):
+        lines.append(f"■ {data['company_name']} (ID {request_id})")
+        for c in data["status_changes"]:
+            entity = c["entity_name"] or ""
+            if c["terminal_name"]:
+                entity += f" / {c['terminal_name']}"
+            lines.append(
+                f"   - {c['block']} {entity}: {c['old_status'] or 'Sin estado'} → {c['new_status'] or 'Sin estado'}"
+            )
+        for d in data["documents"]:
+            lines.append(f"   - Documento cargado: {d['file_name']} ({d['doc_type'] or '—'})")
+        lines.append("")
+    lines += ["Puedes ver el detalle en la sección \"Progreso\" de la plataforma de Compliance.", "",
+              "Equipo de Compliance - Trading Solutions"]
+
+    count = len(requests)
+    subject = f"Resumen de Compliance: {count} solicitud(es) con cambios"
+    return subject, "\n".join(lines)
+
+
+def run_once():
+    mailer = get_mailer()
+    session = SessionLocal()
+    try:
+        # FOR UPDATE sobre la marca: dos workers no envían el mismo resumen
+        until = get_horizon(session, HORIZON_LAG)
+        since = get_last_run(session, JOB_NAME, until - FIRST_RUN_LOOKBACK)
+        if since >= until:
+            # Otro worker corrió mientras esperábamos el bloqueo
+            session.commit()
+            log.info("Resúmenes ya enviados hasta %s", since)
+            return
+
+        digests = get_changes_by_requester(session, since, until)
+
+        # Quien no recibió el anterior recibe todo desde su último resumen enviado
+        retries = get_retries(session, JOB_NAME)
+        starts = {email: since for email in digests}
+        for email, retry in retries.items():
+            if retry["attempts"] >= MAX_SEND_ATTEMPTS:
+                log.warning("Se descarta el resumen de %s tras %d intentos", email, retry["attempts"])
+                delete_retry(session, JOB_NAME, email)
+                continue
+            pending = get_changes_by_requester(session, retry["since_at"], until, emails=[email])
+            digests[email] = pending.get(email, {})
+            starts[email] = retry["since_at"]
+
+        sent = 0
+        for email, requests in digests.items():
+            if not requests:
+                delete_retry(session, JOB_NAME, email)
+                continue
+            subject, body = render_digest(requests)
+            try:
+                mailer.send(email, subject, body)
+                sent += 1
+                if email in retries:
+                    delete_retry(session, JOB_NAME, email)
+            except Exception as e:
+                log.exception("No se pudo enviar el resumen a %s", email)
+                save_retry(session, JOB_NAME, email, starts[email], str(e))
+
+        save_last_run(session, JOB_NAME, until)
+        session.commit()
+        log.info("Resúmenes enviados: %d de %d (cambios entre %s y %s)", sent, len(digests), since, until)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resúmenes por solicitante")
+    parser.add_argument("--loop", type=int, default=0, metavar="SEGUNDOS",
+                        help="Repetir cada N segundos (0 = una sola corrida)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    run_once()
+    while args.loop:
+        time.sleep(args.loop)
+        try:
+            run_once()
+        except Exception:
+            log.exception("Error generando resúmenes")
+
+
+if __name__ == "__main__":
+    main()
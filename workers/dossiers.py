@@ -0,0 +1,52 @@
+# workers/dossiers.py
+#
+# Genera el paquete de expedientes para auditoría fuera de la app (lotes grandes).
+#
+#   python -m workers.dossiers --trading "Trading Solutions" --out expedientes.zip
+#   python -m workers.dossiers --profile Proveedor --from 2025-01-01 --to 2025-12-31 --format pdf --out 2025.pdf
+
+import argparse
+import logging
+from datetime import date
+
+from database.db import SessionLocal
+from database.crud.documents import get_profile_id_by_name
+from services import cache
+from services.dossiers import build_dossier_pack, BATCH_SIZE
+
+log = logging.getLogger("dossiers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expedientes PDF para auditoría")
+    parser.add_argument("--trading")
+    parser.add_argument("--profile", help="Nombre del perfil (Cliente, Proveedor, ...)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, metavar="AAAA-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, metavar="AAAA-MM-DD")
+    parser.add_argument("--format", choices=["zip", "pdf"], default="zip")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de render (por defecto, uno por CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    # Corrida puntual: sin caché ni listener
+    cache.disable()
+
+    profile_id = None
+    if args.profile:
+        with SessionLocal() as session:
+            profile_id = get_profile_id_by_name(session, args.profile)
+        if profile_id is None:
+            parser.error(f"Perfil desconocido: {args.profile}")
+
+    count = build_dossier_pack(
+        args.out, args.format,
+        trading=args.trading, profile_id=profile_id, date_from=args.date_from, date_to=args.date_to,
+        workers=args.workers, batch_size=args.batch_size,
+    )
+    log.info("%d expediente(s) escritos en %s", count, args.out)
+
+
+if __name__ == "__main__":
+    main()
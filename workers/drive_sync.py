@@ -0,0 +1,214 @@
+# workers/drive_sync.py
+#
+# Mantiene la tabla `drive_files` sincronizada con las carpetas base CLIENTE/PROVEEDOR
+# y reporta inconsistencias con `registration`.
+#
+#   python -m workers.drive_sync                 # una pasada (listado completo si no hay token)
+#   python -m workers.drive_sync --loop 300      # cada 5 minutos
+#   python -m workers.drive_sync --full          # fuerza un listado completo
+
+import argparse
+import logging
+import time
+from collections import deque
+
+import streamlit as st
+
+from database.db import SessionLocal
+from database.crud.drive_sync import (
+    get_sync_state,
+    save_sync_token,
+    get_folder_index,
+    upsert_drive_files,
+    delete_drive_subtrees,
+    clear_drive_files,
+    get_broken_drive_links,
+    get_unregistered_drive_files,
+)
+from services.google_drive_utils import (
+    init_drive,
+    list_folder_children,
+    get_changes_start_token,
+    list_changes,
+    FOLDER_MIME_TYPE,
+)
+
+log = logging.getLogger("drive_sync")
+
+UPSERT_BATCH = 500
+
+
+def _base_folders() -> dict[str, str]:
+    """{base_folder_id: entity_type}"""
+    drive_cfg = st.secrets["drive"]
+    bases = {}
+    if drive_cfg.get("clients_folder_id"):
+        bases[drive_cfg["clients_folder_id"]] = "cliente"
+    if drive_cfg.get("providers_folder_id"):
+        bases[drive_cfg["providers_folder_id"]] = "proveedor"
+    return bases
+
+
+def _sync_key(drive_id: str | None) -> str:
+    return f"drive:{drive_id or 'my-drive'}"
+
+
+def _to_row(f: dict, company_folder_id: str | None, entity_type: str) -> dict:
+    return {
+        "file_id": f["id"],
+        "name": f.get("name"),
+        "mime_type": f.get("mimeType"),
+        "parent_id": (f.get("parents") or [None])[0],
+        "company_folder_id": company_folder_id,
+        "entity_type": entity_type,
+        "web_view_link": f.get("webViewLink"),
+        "modified_time": f.get("modifiedTime"),
+    }
+
+
+def _walk(service, root_id: str, company_folder_id: str | None, entity_type: str, is_base: bool):
+    """
+    Recorre (BFS) el árbol bajo `root_id` y retorna las filas para drive_files.
+    Si `is_base`, los hijos directos son carpetas de empresa.
+    """
+    rows = []
+    queue = deque([(root_id, company_folder_id, is_base)])
+    while queue:
+        folder_id, company_id, base_level = queue.popleft()
+        for f in list_folder_children(service, folder_id):
+            is_folder = f.get("mimeType") == FOLDER_MIME_TYPE
+            child_company = f["id"] if (base_level and is_folder) else company_id
+            rows.append(_to_row(f, child_company, entity_type))
+            if is_folder:
+                queue.append((f["id"], child_company, False))
+    return rows
+
+
+def _upsert_in_batches(session, rows: list[dict]):
+    for i in range(0, len(rows), UPSERT_BATCH):
+        upsert_drive_files(session, rows[i:i + UPSERT_BATCH])
+
+
+def full_sync(service, session, drive_id: str | None):
+    """Listado completo inicial. El token se pide antes para no perder cambios concurrentes."""
+    start_token = get_changes_start_token(service, drive_id)
+
+    for base_id, entity_type in _base_folders().items():
+        rows = _walk(service, base_id, None, entity_type, is_base=True)
+        clear_drive_files(session, entity_type)
+        _upsert_in_batches(session, rows)
+        log.info("Listado completo %s: %d elementos", entity_type, len(rows))
+
+    save_sync_token(session, _sync_key(drive_id), start_token, full_sync=True)
+    session.commit()
+
+
+def incremental_sync(service, session, drive_id: str | None, page_token: str):
+    """Aplica el feed de cambios desde el último token guardado."""
+    changes, new_token = list_changes(service, page_token, drive_id)
+
+    bases = _base_folders()
+    folders = get_folder_index(session)
+    upserts: dict[str, dict] = {}
+    removed = set()
+
+    for change in changes:
+        file_id = change.get("fileId")
+        f = change.get("file")
+
+        if change.get("removed") or not f or f.get("trashed"):
+            removed.add(file_id)
+            upserts.pop(file_id, None)
+            continue
+
+        parent_id = (f.get("parents") or [None])[0]
+        is_folder = f.get("mimeType") == FOLDER_MIME_TYPE
+
+        if parent_id in bases:
+            entity_type = bases[parent_id]
+            company_id = f["id"] if is_folder else None
+        elif parent_id in folders:
+            company_id, entity_type = folders[parent_id]
+        else:
+            # Fuera de las carpetas base (o movido fuera de ellas)
+            removed.add(file_id)
+            upserts.pop(file_id, None)
+            continue
+
+        removed.discard(file_id)
+        upserts[file_id] = _to_row(f, company_id, entity_type)
+
+        if is_folder:
+            is_new_folder = file_id not in folders
+            folders[file_id] = (company_id, entity_type)
+            # Carpeta que entra al árbol: su contenido no aparece en el feed
+            if is_new_folder:
+                for row in _walk(service, file_id, company_id, entity_type, is_base=False):
+                    upserts[row["file_id"]] = row
+                    if row["mime_type"] == FOLDER_MIME_TYPE:
+                        folders[row["file_id"]] = (row["company_folder_id"], entity_type)
+
+    delete_drive_subtrees(session, list(removed))
+    _upsert_in_batches(session, list(upserts.values()))
+    save_sync_token(session, _sync_key(drive_id), new_token)
+    session.commit()
+
+    log.info("Cambios aplicados: %d (%d actualizados, %d eliminados)", len(changes), len(upserts), len(removed))
+
+
+def report(session):
+    broken = get_broken_drive_links(session)
+    unregistered = get_unregistered_drive_files(session)
+
+    by_request: dict[int, dict] = {}
+    for b in broken:
+        by_request.setdefault(b["request_id"], {"broken": 0, "unregistered": 0})["broken"] += 1
+    for u in unregistered:
+        by_request.setdefault(u["request_id"], {"broken": 0, "unregistered": 0})["unregistered"] += 1
+
+    for request_id, counts in sorted(by_request.items()):
+        log.warning(
+            "Solicitud %s: %d enlace(s) roto(s), %d archivo(s) sin registrar",
+            request_id, counts["broken"], counts["unregistered"]
+        )
+    return by_request
+
+
+def run_once(force_full: bool = False):
+    service = init_drive()
+    drive_id = st.secrets["drive"].get("shared_drive_id")
+    session = SessionLocal()
+    try:
+        state = get_sync_state(session, _sync_key(drive_id))
+        if force_full or not state:
+            full_sync(service, session, drive_id)
+        else:
+            incremental_sync(service, session, drive_id, state["page_token"])
+        report(session)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Drive ↔ registration")
+    parser.add_argument("--full", action="store_true", help="Forzar listado completo")
+    parser.add_argument("--loop", type=int, default=0, metavar="SEGUNDOS",
+                        help="Repetir cada N segundos (0 = una sola pasada)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    run_once(force_full=args.full)
+    while args.loop:
+        time.sleep(args.loop)
+        try:
+            run_once()
+        except Exception:
+            log.exception("Error en la sincronización con Drive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# workers/parquet_export.py
+#
+# Exporta a Parquet (disco local) las filas nuevas o modificadas desde la última corrida,
+# para análisis fuera de la base. Cada tabla lleva su marca de agua (updated_at, id) en
+# `export_watermarks`; los archivos quedan particionados por día de la marca de tiempo:
+#
+#   <raíz>/<tabla>/date=AAAA-MM-DD/part-<corrida>-<n>.parquet
+#
+#   python -m workers.parquet_export                       # una corrida, todas las tablas
+#   python -m workers.parquet_export --tables requests comments
+#   python -m workers.parquet_export --loop 900 --compact  # cada 15 min, compactando
+#
+# La entrega es "al menos una vez": una fila modificada varias veces aparece varias veces.
+# Al leer, quedarse con la de mayor updated_at por id (la compactación ya lo hace por partición).
+# Borrados y solicitudes archivadas no se propagan.
+
+import argparse
+import glob
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from database.db import SessionLocal
+from database.crud.exports import (
+    EXPORT_TABLES,
+    get_watermark,
+    save_watermark,
+    get_export_columns,
+    get_export_horizon,
+    fetch_changed_rows,
+)
+from services import cache
+
+log = logging.getLogger("parquet_export")
+
+BATCH_SIZE = 50000
+LAG_SECONDS = 60
+COMPACT_MIN_FILES = 8
+
+# udt_name de Postgres -> tipo Arrow (lo que no esté aquí se exporta como texto)
+ARROW_TYPES = {
+    "int2": pa.int16(),
+    "int4": pa.int32(),
+    "int8": pa.int64(),
+    "bool": pa.bool_(),
+    "float4": pa.float32(),
+    "float8": pa.float64(),
+    "numeric": pa.float64(),
+    "date": pa.date32(),
+    "timestamp": pa.timestamp("us"),
+    "timestamptz": pa.timestamp("us", tz="UTC"),
+}
+
+
+def export_root() -> str:
+    """[export] root o EXPORT_ROOT; por defecto exports/parquet."""
+    try:
+        import streamlit as st
+        path = st.secrets["export"].get("root")
+    except Exception:
+        path = None
+    path = path or os.getenv("EXPORT_ROOT") or os.path.join("exports", "parquet")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+# ==========================
+# 🔹 ESCRITURA
+# ==========================
+
+def _schema(columns: list[tuple[str, str]]) -> pa.Schema:
+    return pa.schema([(name, ARROW_TYPES.get(udt, pa.string())) for name, udt in columns])
+
+
+def _to_table(rows: list[dict], columns: list[tuple[str, str]], schema: pa.Schema) -> pa.Table:
+    data = {}
+    for name, udt in columns:
+        values = [r[name] for r in rows]
+        if ARROW_TYPES.get(udt) is None:
+            # jsonb, uuid, enums, ...: texto tal cual
+            values = [None if v is None else str(v) for v in values]
+        data[name] = values
+    return pa.Table.from_pydict(data, schema=schema)
+
+
+def _write_atomic(table: pa.Table, path: str):
+    """Escribe a un temporal y renombra: un lector nunca ve un Parquet a medias."""
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _write_partitions(root: str, name: str, ts_column: str, rows: list[dict],
+                      columns: list[tuple[str, str]], schema: pa.Schema, run_id: str, seq: int) -> int:
+    """Reparte un lote por día de `ts_column`; retorna cuántos archivos escribió."""
+    by_day = {}
+    for r in rows:
+        by_day.setdefault(r[ts_column].date().isoformat(), []).append(r)
+
+    for day, day_rows in by_day.items():
+        folder = os.path.join(root, name, f"date={day}")
+        os.makedirs(folder, exist_ok=True)
+        _write_atomic(_to_table(day_rows, columns, schema),
+                      os.path.join(folder, f"part-{run_id}-{seq:05d}.parquet"))
+    return len(by_day)
+
+# ==========================
+# 🔹 EXPORTACIÓN INCREMENTAL
+# ==========================
+
+def export_table(name: str, root: str, batch_size: int = BATCH_SIZE, lag_seconds: float = LAG_SECONDS) -> int:
+    """
+    Exporta las filas de `name` posteriores a su marca de agua, en lotes por keyset.
+    Cada lote escribe sus archivos y luego avanza la marca en la misma transacción que
+    la bloquea: si algo falla, la próxima corrida repite desde el último lote confirmado.
+    """
+    ts_column = EXPORT_TABLES[name]
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    total = 0
+    seq = 0
+
+    session = SessionLocal()
+    try:
+        mark = get_watermark(session, name)
+        since_ts, since_id = mark if mark else (None, 0)
+        until_ts = get_export_horizon(session, lag_seconds)
+        columns = get_export_columns(session, name)
+        schema = _schema(columns)
+
+        while True:
+            rows = fetch_changed_rows(session, name, [c for c, _ in columns],
+                                      since_ts, since_id, until_ts, batch_size)
+            if not rows:
+                break
+
+            seq += 1
+            files = _write_partitions(root, name, ts_column, rows, columns, schema, run_id, seq)
+            since_ts, since_id = rows[-1][ts_column], rows[-1]["id"]
+            save_watermark(session, name, since_ts, since_id, len(rows))
+            session.commit()
+            # Conservar el bloqueo de la marca para el lote siguiente
+            get_watermark(session, name)
+
+            total += len(rows)
+            log.info("%s: lote %d, %d fila(s) en %d archivo(s)", name, seq, len(rows), files)
+            if len(rows) < batch_size:
+                break
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return total
+
+# ==========================
+# 🔹 COMPACTACIÓN
+# ==========================
+
+def compact_table(name: str, root: str, min_files: int = COMPACT_MIN_FILES) -> int:
+    """
+    Une los archivos de cada partición con al menos `min_files` partes en uno solo,
+    dejando la última versión de cada id. Retorna cuántas particiones compactó.
+    Correr con la exportación de esa tabla detenida (el worker lo hace después de exportar).
+    """
+    ts_column = EXPORT_TABLES[name]
+    compacted = 0
+    for folder in sorted(glob.glob(os.path.join(root, name, "date=*"))):
+        parts = sorted(glob.glob(os.path.join(folder, "*.parquet")))
+        if len(parts) < min_files:
+            continue
+
+        frame = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+        before = len(frame)
+        frame = (
+            frame.sort_values([ts_column, "id"], kind="stable")
+            .drop_duplicates("id", keep="last")
+            .sort_values("id")
+        )
+        table = pa.Table.from_pandas(frame, schema=pq.read_schema(parts[-1]), preserve_index=False)
+        target = os.path.join(folder, f"compact-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}.parquet")
+        _write_atomic(table, target)
+        for p in parts:
+            os.remove(p)
+
+        compacted += 1
+        log.info("%s/%s: %d archivo(s), %d → %d fila(s)",
+                 name, os.path.basename(folder), len(parts), before, len(frame))
+    return compacted
+
+# ==========================
+# 🔹 MAIN
+# ==========================
+
+def run_once(tables: list[str], root: str, batch_size: int, lag_seconds: float, compact: bool):
+    for name in tables:
+        try:
+            count = export_table(name, root, batch_size, lag_seconds)
+            log.info("%s: %d fila(s) exportada(s)", name, count)
+            if compact:
+                compact_table(name, root)
+        except Exception:
+            # Una tabla con problemas no frena al resto; su marca de agua no avanzó
+            log.exception("Error exportando %s", name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación incremental a Parquet")
+    parser.add_argument("--tables", nargs="+", choices=sorted(EXPORT_TABLES), default=list(EXPORT_TABLES))
+    parser.add_argument("--root", default=None, help="Directorio de salida (por defecto [export] root / EXPORT_ROOT)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lag-seconds", type=float, default=LAG_SECONDS,
+                        help="Margen extra antes del horizonte (inicio de la transacción abierta más antigua)")
+    parser.add_argument("--compact", action="store_true", help="Compactar particiones después de exportar")
+    parser.add_argument("--loop", type=int, default=0, metavar="SEGUNDOS",
+                        help="Repetir cada N segundos (0 = una sola corrida)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    cache.disable()
+
+    root = args.root or export_root()
+    os.makedirs(root, exist_ok=True)
+
+    run_once(args.tables, root, args.batch_size, args.lag_seconds, args.compact)
+    while args.loop:
+        time.sleep(args.loop)
+        run_once(args.tables, root, args.batch_size, args.lag_seconds, args.compact)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# workers/queue_worker.py
+#
+# Procesa la cola `job_queue` (FOR UPDATE SKIP LOCKED): se pueden correr tantos
+# workers como se quiera en paralelo (docker compose up --scale queue_worker=3).
+#
+#   python -m workers.queue_worker                  # procesa hasta que se detenga
+#   python -m workers.queue_worker --once           # vacía lo listo y termina
+#   python -m workers.queue_worker --threads 4      # 4 trabajos a la vez en este proceso
+#
+# Un trabajo que falla vuelve a la cola con backoff exponencial; al agotar
+# max_attempts (o ante un error permanente) queda en `dead` para revisión.
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import date
+
+import streamlit as st
+
+from database.db import SessionLocal
+from database.crud.documents import upsert_uploaded_document
+from database.crud.jobs import (
+    claim_jobs,
+    complete_job,
+    fail_job,
+    requeue_stale_jobs,
+    touch_job,
+    purge_finished_jobs,
+)
+from services.google_drive_utils import init_drive, find_or_create_folder
+from services.upload_sessions import (
+    staged_path,
+    upload_staged_file,
+    finished_upload_link,
+    release_staged_file,
+    purge_stale_uploads,
+)
+
+log = logging.getLogger("queue_worker")
+
+RETRY_BASE_SECONDS = 30
+RETRY_CAP_SECONDS = 3600
+STALE_RUNNING_MINUTES = 30
+HOUSEKEEPING_SECONDS = 3600
+HEARTBEAT_SECONDS = 60
+
+
+class PermanentJobError(Exception):
+    """Error que no se arregla reintentando: el trabajo va directo a dead-letter."""
+
+
+class JobOwnershipLost(Exception):
+    """El trabajo se dio por muerto y otro worker lo tomó: este no debe registrar nada."""
+
+# ==========================
+# 🔹 HANDLERS
+# ==========================
+
+def handle_upload_document(job: dict):
+    """
+    Sube un documento en staging a la carpeta de la empresa y lo registra.
+    La subida es reanudable (upload_sessions): un reintento continúa desde el último trozo.
+    El registro y el cierre del trabajo van en la misma transacción; el archivo en staging
+    se borra solo después de ese commit.
+    """
+    p = job["payload"]
+    # Subida ya terminada (un intento anterior falló al registrar, u otro trabajo con el
+    # mismo archivo): solo falta el registro, el archivo en staging ya no hace falta.
+    drive_link = finished_upload_link(p["upload_key"])
+    if drive_link is None:
+        drive_link = _upload_document(job)
+
+    fecha_creacion = p.get("fecha_creacion")
+    session = SessionLocal()
+    try:
+        upsert_uploaded_document(
+            session,
+            p["request_id"],
+            p["doc_type_id"],
+            p["file_name"],
+            drive_link,
+            p.get("uploaded_by"),
+            p.get("razon_social"),
+            date.fromisoformat(fecha_creacion) if fecha_creacion else None,
+        )
+        if not complete_job(session, job):
+            # Sin commit: el registro del documento lo hará quien tiene el trabajo ahora
+            raise JobOwnershipLost(f"Trabajo {job['id']} tomado por otro worker")
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    try:
+        release_staged_file(p["upload_key"], job["id"])
+    except Exception:
+        # El trabajo ya está cerrado; el archivo lo limpia purge_stale_uploads
+        log.exception("No se pudo liberar el archivo en staging del trabajo %s", job["id"])
+
+
+def _upload_document(job: dict) -> str:
+    """Sube (o retoma) el archivo en staging del trabajo a la carpeta de la empresa."""
+    p = job["payload"]
+    path = staged_path(p["upload_key"])
+    if not os.path.exists(path):
+        raise PermanentJobError(f"El archivo en staging ya no existe: {p['file_name']}")
+
+    drive_cfg = st.secrets["drive"]
+    base_folder_id = (
+        drive_cfg.get("providers_folder_id") if p["entity_type"] == "proveedor"
+        else drive_cfg.get("clients_folder_id")
+    )
+
+    service = init_drive()
+    folder_id = find_or_create_folder(
+        service, p["company_name"], entity_type=p["entity_type"], base_folder_id=base_folder_id
+    )
+    last_beat = [time.monotonic()]
+
+    def heartbeat(sent, total):
+        if time.monotonic() - last_beat[0] >= HEARTBEAT_SECONDS:
+            with SessionLocal() as db:
+                owned = touch_job(db, job)
+                db.commit()
+            if not owned:
+                # Abortar la subida: otro worker ya está con este trabajo
+                raise JobOwnershipLost(f"Trabajo {job['id']} tomado por otro worker")
+            last_beat[0] = time.monotonic()
+
+    return upload_staged_file(service, folder_id, path, p["file_name"], p["upload_key"],
+                              on_progress=heartbeat)
+
+
+JOB_HANDLERS = {
+    "upload_document": handle_upload_document,
+}
+
+# ==========================
+# 🔹 LOOP
+# ==========================
+
+def _retry_delay(attempts: int) -> float:
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_CAP_SECONDS)
+
+
+def _record_failure(job: dict, exc: Exception):
+    permanent = isinstance(exc, PermanentJobError)
+    error = f"{type(exc).__name__}: {exc}"
+    session = SessionLocal()
+    try:
+        status = fail_job(session, job, error, _retry_delay(job["attempts"]), permanent=permanent)
+        session.commit()
+    finally:
+        session.close()
+    if status is None:
+        log.warning("Trabajo %s (%s) falló, pero ya lo tiene otro worker: %s", job["id"], job["job_type"], error)
+    elif status == "dead":
+        log.error("Trabajo %s (%s) en dead-letter tras %d intento(s): %s",
+                  job["id"], job["job_type"], job["attempts"], error)
+    else:
+        log.warning("Trabajo %s (%s) falló (intento %d de %d), se reintenta: %s",
+                    job["id"], job["job_type"], job["attempts"], job["max_attempts"], error)
+
+
+def process_one(worker_id: str, job_types: list[str] | None = None) -> bool:
+    """Toma y procesa un trabajo. Retorna False si no había nada listo."""
+    session = SessionLocal()
+    try:
+        jobs = claim_jobs(session, worker_id, limit=1, job_types=job_types)
+        session.commit()
+    finally:
+        session.close()
+    if not jobs:
+        return False
+
+    job = jobs[0]
+    handler = JOB_HANDLERS.get(job["job_type"])
+    try:
+        if handler is None:
+            raise PermanentJobError(f"Tipo de trabajo desconocido: {job['job_type']}")
+        handler(job)
+        log.info("Trabajo %s (%s) completado", job["id"], job["job_type"])
+    except JobOwnershipLost as e:
+        log.warning("%s; se descarta el resultado de este intento", e)
+    except Exception as e:
+        log.debug(traceback.format_exc())
+        _record_failure(job, e)
+    return True
+
+
+def housekeeping():
+    session = SessionLocal()
+    try:
+        requeued = requeue_stale_jobs(session, STALE_RUNNING_MINUTES)
+        purged = purge_finished_jobs(session, older_than_days=30)
+        session.commit()
+    finally:
+        session.close()
+    stale_uploads = purge_stale_uploads()
+    if requeued or purged or stale_uploads:
+        log.info("Mantenimiento: %d reencolado(s), %d trabajo(s) y %d subida(s) purgados",
+                 requeued, purged, stale_uploads)
+
+
+def _work_loop(worker_id: str, job_types: list[str] | None, poll: float, once: bool):
+    while True:
+        try:
+            worked = process_one(worker_id, job_types)
+        except Exception:
+            log.exception("Error tomando trabajos de la cola")
+            worked = False
+
+        if not worked:
+            if once:
+                break
+            time.sleep(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola de trabajos")
+    parser.add_argument("--poll", type=float, default=2.0, metavar="SEGUNDOS",
+                        help="Espera cuando la cola está vacía")
+    parser.add_argument("--types", nargs="*", help="Solo estos tipos de trabajo")
+    parser.add_argument("--once", action="store_true", help="Procesar lo que esté listo y terminar")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Trabajos en paralelo en este proceso (cada hilo usa su propio cliente de Drive)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    log.info("Worker %s iniciado con %d hilo(s)", worker_id, args.threads)
+
+    try:
+        housekeeping()
+    except Exception:
+        log.exception("Error en mantenimiento de la cola")
+
+    threads = [
+        threading.Thread(
+            target=_work_loop, args=(f"{worker_id}:{i}", args.types, args.poll, args.once),
+            name=f"queue-worker-{i}", daemon=True,
+        )
+        for i in range(max(args.threads, 1))
+    ]
+    for t in threads:
+        t.start()
+
+    last_housekeeping = time.monotonic()
+    while any(t.is_alive() for t in threads):
+        time.sleep(1.0)
+        if time.monotonic() - last_housekeeping > HOUSEKEEPING_SECONDS:
+            try:
+                housekeeping()
+            except Exception:
+                log.exception("Error en mantenimiento de la cola")
+            last_housekeeping = time.monotonic()
+
+if __name__ == "__main__":
+    main()
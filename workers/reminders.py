@@ -0,0 +1,128 @@
+# workers/reminders.py
+#
+# Envía los recordatorios de documentación según requests.reminder_frequency.
+#
+#   python -m workers.reminders --backfill      # programa solicitudes antiguas sin next_reminder_at
+#   python -m workers.reminders --loop 60       # revisa vencidos cada minuto
+
+import argparse
+import logging
+import time
+
+from database.db import SessionLocal
+from database.crud.reminders import (
+    backfill_reminder_schedule,
+    claim_due_reminders,
+    mark_reminder_sent,
+    mark_reminder_failed,
+    stop_reminders,
+)
+from services.mailer import get_mailer
+
+log = logging.getLogger("reminders")
+
+BATCH_SIZE = 100
+RETRY_BASE_MINUTES = 15
+RETRY_CAP_MINUTES = 24 * 60
+MAX_SEND_FAILURES = 8
+CLAIM_LEASE_MINUTES = 30
+
+TEMPLATES = {
+    "Español": (
+        "Recordatorio: documentación pendiente - {company}",
+        "Estimado equipo de {company}:\n\n"
+        "Les recordamos que aún tenemos pendiente documentación para completar su registro "
+        "como asociado de negocio con Trading Solutions.\n\n"
+        "Por favor envíen los documentos faltantes respondiendo a este correo.\n\n"
+        "Cordialmente,\nEquipo de Compliance - Trading Solutions",
+    ),
+    "Inglés": (
+        "Reminder: pending documentation - {company}",
+        "Dear {company} team,\n\n"
+        "This is a reminder that we are still missing documentation to complete your "
+        "business partner registration with Trading Solutions.\n\n"
+        "Please send the pending documents by replying to this email.\n\n"
+        "Best regards,\nCompliance Team - Trading Solutions",
+    ),
+}
+
+
+def render_reminder(company_name: str | None, language: str | None) -> tuple[str, str]:
+    subject, body = TEMPLATES.get(language or "", TEMPLATES["Español"])
+    company = company_name or ""
+    return subject.format(company=company), body.format(company=company)
+
+
+def process_batch(mailer) -> int:
+    """
+    Procesa un lote de recordatorios vencidos. Retorna cuántos salieron de la cola de vencidos.
+    El lote se toma con lease en una transacción corta; los correos salen sin bloqueos sobre
+    requests y el resultado se registra en otra transacción corta.
+    """
+    with SessionLocal() as session:
+        due = claim_due_reminders(session, BATCH_SIZE, CLAIM_LEASE_MINUTES)
+        session.commit()
+    if not due:
+        return 0
+
+    sent, stopped, failed = [], [], []
+    for r in due:
+        if r["all_approved"] or not r["email"]:
+            stopped.append(r["id"])
+            continue
+
+        subject, body = render_reminder(r["company_name"], r["language"])
+        try:
+            mailer.send(r["email"], subject, body)
+            sent.append(r["id"])
+        except Exception:
+            # Se aplaza con backoff: un correo inválido no bloquea al resto de la cola
+            log.exception("No se pudo enviar el recordatorio de la solicitud %s", r["id"])
+            failed.append(r["id"])
+
+    with SessionLocal() as session:
+        mark_reminder_sent(session, sent)
+        mark_reminder_failed(session, failed, RETRY_BASE_MINUTES, RETRY_CAP_MINUTES, MAX_SEND_FAILURES)
+        stop_reminders(session, stopped)
+        session.commit()
+
+    log.info("Recordatorios: %d enviados, %d fallidos, %d detenidos", len(sent), len(failed), len(stopped))
+    return len(sent) + len(failed) + len(stopped)
+
+
+def run_once():
+    mailer = get_mailer()
+    while process_batch(mailer) == BATCH_SIZE:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recordatorios de documentación")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Programar solicitudes abiertas sin próximo recordatorio")
+    parser.add_argument("--loop", type=int, default=0, metavar="SEGUNDOS",
+                        help="Repetir cada N segundos (0 = una sola pasada)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.backfill:
+        session = SessionLocal()
+        try:
+            count = backfill_reminder_schedule(session)
+            session.commit()
+            log.info("Solicitudes programadas: %d", count)
+        finally:
+            session.close()
+
+    run_once()
+    while args.loop:
+        time.sleep(args.loop)
+        try:
+            run_once()
+        except Exception:
+            log.exception("Error procesando recordatorios")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# workers/status_partitions.py
+#
+# Mantenimiento de las particiones mensuales de status_events.
+#
+#   python -m workers.status_partitions --ahead 3
+#   python -m workers.status_partitions --ahead 3 --detach-older-than 24
+
+import argparse
+import logging
+
+from database.db import SessionLocal, engine
+from database.crud.documents import ensure_status_event_partitions, detach_status_event_partitions
+
+log = logging.getLogger("status_partitions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particiones de status_events")
+    parser.add_argument("--ahead", type=int, default=2,
+                        help="Meses futuros a crear por adelantado")
+    parser.add_argument("--detach-older-than", type=int, default=0, metavar="MESES",
+                        help="Desprender particiones anteriores a N meses (0 = no desprender)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    session = SessionLocal()
+    try:
+        created = ensure_status_event_partitions(session, args.ahead)
+        session.commit()
+        log.info("Particiones vigentes: %s", ", ".join(created))
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    if args.detach_older_than:
+        # Fuera de la transacción: cada DETACH es su propia sentencia en autocommit
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            detached = detach_status_event_partitions(conn, args.detach_older_than)
+        for name in detached:
+            log.info("Partición desprendida: %s", name)
+
+
+if __name__ == "__main__":
+    main()